@@ -63,6 +63,7 @@ def create_app(config_class=Config):
         neo_client = get_client_from_env()
         if neo_client.enabled:
             try:
+                neo_client.initialize_schema()
                 initialize_compliance_rules(neo_client)
                 logging.info("Successfully initialized compliance rules")
             except Exception as neo_error:
@@ -82,4 +83,8 @@ def create_app(config_class=Config):
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
     
+    # Register CLI commands (flask <command>)
+    from app.commands import register_commands
+    register_commands(app)
+    
     return app
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Maintenance commands exposed through the Flask CLI (``flask <command>``).
+"""
+import os
+import json
+
+import click
+from flask import Flask
+
+from app.utils.graph import get_client_from_env, rebuild_fines_trend
+from app.utils.transaction_processor import rebuild_account_month_totals
+from app.utils.query_stats import get_stats_file, format_report
+from app.utils.bulk_import import generate_import_files
+
+
+@click.command('rebuild-fines-trend')
+def rebuild_fines_trend_command():
+    """Recompute the monthly fines-trend rollups from scratch."""
+    neo = get_client_from_env()
+    if not neo.enabled:
+        click.echo('Neo4j is not configured; nothing to rebuild.')
+        return
+    try:
+        months = rebuild_fines_trend(neo)
+        click.echo(f'Rebuilt fines trend rollups for {months} month(s).')
+    finally:
+        neo.close()
+
+
+@click.command('rebuild-account-months')
+def rebuild_account_months_command():
+    """Recompute the per-account monthly transaction totals from scratch."""
+    neo = get_client_from_env()
+    if not neo.enabled:
+        click.echo('Neo4j is not configured; nothing to rebuild.')
+        return
+    try:
+        aggregates = rebuild_account_month_totals(neo)
+        click.echo(f'Rebuilt {aggregates} account-month aggregate(s).')
+    finally:
+        neo.close()
+
+
+@click.command('query-report')
+@click.option('--sort', 'sort_by', default='total_ms',
+              type=click.Choice(['total_ms', 'mean_ms', 'max_ms', 'calls', 'errors', 'rows', 'mean_db_hits']),
+              help='Column to sort by (descending).')
+@click.option('--limit', default=20, show_default=True, help='Number of queries to show (0 for all).')
+@click.option('--file', 'stats_file', default=None, help='Stats file to read (defaults to QUERY_STATS_FILE).')
+def query_report_command(sort_by, limit, stats_file):
+    """Print per-query timing statistics written by the running app."""
+    path = stats_file or get_stats_file()
+    if not os.path.exists(path):
+        click.echo(f'No query statistics found at {path}.')
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    click.echo(f"Profile sample rate: {snapshot.get('profile_sample_rate', 0)}")
+    click.echo(format_report(snapshot, sort_by=sort_by, limit=limit or None))
+
+
+@click.command('bulk-import-csv')
+@click.argument('out_dir')
+@click.option('--kyc', 'kyc_paths', multiple=True, help='KYC CSV/Excel file (repeatable).')
+@click.option('--transactions', 'transaction_paths', multiple=True, help='Transaction CSV/Excel file (repeatable).')
+@click.option('--database', default='neo4j', show_default=True, help='Target database name for the printed command.')
+def bulk_import_csv_command(out_dir, kyc_paths, transaction_paths, database):
+    """Write neo4j-admin import CSVs for an initial historical load."""
+    if not kyc_paths and not transaction_paths:
+        raise click.UsageError('Pass at least one --kyc or --transactions file.')
+    writer = generate_import_files(out_dir, list(kyc_paths), list(transaction_paths))
+    for name, count in writer.counts.items():
+        click.echo(f'{name}: {count} row(s)')
+    click.echo(f'Skipped {writer.duplicates} duplicate id(s).')
+    click.echo('\nStop the database, then load the files into an empty database with:')
+    click.echo(writer.import_command(database))
+    click.echo('\nAfterwards run `flask rebuild-account-months` and `flask rebuild-fines-trend`.')
+
+
+def register_commands(app: Flask) -> None:
+    """Attach the maintenance commands to the application's CLI."""
+    app.cli.add_command(rebuild_fines_trend_command)
+    app.cli.add_command(rebuild_account_months_command)
+    app.cli.add_command(query_report_command)
+    app.cli.add_command(bulk_import_csv_command)
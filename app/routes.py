@@ -11,10 +11,26 @@ import google.generativeai as genai
 import time
 import json
 import re
+import hashlib
 from app.utils.extraction import process_rbi_pdf
-from app.utils.graph import get_client_from_env
-from app.utils.graph import find_violations_by_type, find_violations_by_account
-from typing import Dict, List, Any, Optional, Tuple
+from app.utils.graph import get_client_from_env, get_fines_trend, graph_write_generation
+from app.utils.graph import find_violations_by_type, find_violations_by_accounts
+from app.utils.graph_async import batch_find_violations_by_type
+from app.utils.stats import get_stats_service
+from app.utils.query_stats import get_query_stats
+from app.utils.write_behind import get_write_behind, queue_violation_upsert
+from app.utils.circuit_breaker import get_neo4j_breaker
+from app.utils.excel_stream import get_sheet_names, read_excel_rows
+from app.utils.sheet_cache import convert_workbook
+from app.utils.column_resolver import resolve_columns
+from app.utils.upload_store import get_upload_store, PDF_EXTRACTION
+from app.utils.rule_registry import get_rule_registry
+from app.utils.excel_pipeline import ExcelAnalysisJob, get_excel_jobs, llm_review_enabled
+from app.utils.llm_review import BatchClassifier, analyze_transaction
+from app.utils.deposit_windows import MONTH, parse_window, find_limit_breaches
+from app.utils.fast_json import to_jsonable, json_response, ndjson_response
+from app.utils.result_pages import parse_fields, page_size, decode_cursor, page, project
+from typing import Dict, List, Any, Optional, Tuple, Callable
 
 # Setup logging
 LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app.log')
@@ -34,69 +50,17 @@ def get_database_log():
         neo = get_client_from_env()
         
         # Check if the Neo4j client is properly initialized
-        if not hasattr(neo, '_driver') or not neo._driver:
+        if not neo.enabled:
             current_app.logger.error("Neo4j driver is not initialized")
             return jsonify({
                 'status': 'error',
                 'message': 'Database connection is not properly initialized'
             }), 500
-            
-        current_app.logger.info("Neo4j client initialized successfully")
-        
-        # Get counts for each node type
-        node_query = """
-        UNWIND ['Circular', 'Violation', 'PenaltyRange', 'LegalProvision', 'Reason', 'ComplianceRule'] AS label
-        CALL {
-            WITH label
-            MATCH (n)
-            WHERE label IN labels(n)
-            RETURN count(n) AS count
-        }
-        RETURN label, count
-        """
+        neo.close()
         
-        # Get relationship counts
-        rel_query = """
-        MATCH ()-[r]->()
-        RETURN type(r) AS type, count(*) AS count
-        ORDER BY type
-        """
-        
-        current_app.logger.info("Executing node count query...")
-        node_result = []
-        rel_result = []
-        
-        # Execute queries using session with explicit database name
+        # Counts come from the cached count-store snapshot
         try:
-            current_app.logger.info(f"Attempting to connect to database: {neo._driver}")
-            
-            # First, test a simple query to verify connection
-            with neo._driver.session(database="rbi") as session:
-                current_app.logger.info("Successfully connected to 'rbi' database")
-                
-                # Test a simple query
-                test_result = session.run("RETURN 'Connection test successful' AS message").single()
-                current_app.logger.info(f"Test query result: {test_result['message']}")
-                
-                # Execute node query with error handling
-                try:
-                    current_app.logger.info("Running node query...")
-                    node_result = session.run(node_query).data()
-                    current_app.logger.info(f"Node query returned {len(node_result)} results")
-                    
-                    # Execute relationship query
-                    current_app.logger.info("Running relationship query...")
-                    rel_result = session.run(rel_query).data()
-                    current_app.logger.info(f"Relationship query returned {len(rel_result)} results")
-                    
-                except Exception as query_error:
-                    current_app.logger.error(f"Query execution error: {str(query_error)}", exc_info=True)
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Query execution error: {str(query_error)}',
-                        'query': node_query if 'node' in str(query_error).lower() else rel_query
-                    }), 500
-                
+            stats = get_stats_service().get()
         except Exception as e:
             current_app.logger.error(f"Database query error: {str(e)}", exc_info=True)
             return jsonify({
@@ -104,6 +68,9 @@ def get_database_log():
                 'message': f'Database query error: {str(e)}'
             }), 500
         
+        node_result = [{'label': label, 'count': count} for label, count in stats['nodes'].items()]
+        rel_result = [{'type': rel_type, 'count': count} for rel_type, count in sorted(stats['relationships'].items())]
+        
         # Log the results
         log_message = "\n=== DATABASE STATISTICS ===\n"
         log_message += "=== NODES ===\n"
@@ -119,7 +86,11 @@ def get_database_log():
         return jsonify({
             'status': 'success',
             'nodes': node_result,
-            'relationships': rel_result
+            'relationships': rel_result,
+            'data': {
+                'node_counts': dict(stats['nodes']),
+                'relationship_counts': dict(stats['relationships'])
+            }
         })
         
     except Exception as e:
@@ -130,6 +101,28 @@ def get_database_log():
             'message': error_msg
         }), 500
 
+@bp.route('/api/health', methods=['GET'])
+def health():
+    """Endpoint reporting Neo4j availability and background write queue state"""
+    breaker = get_neo4j_breaker().metrics()
+    write_behind = get_write_behind().metrics()
+    return jsonify({
+        'status': 'ok' if breaker['state'] == 'closed' else 'degraded',
+        'neo4j': breaker,
+        'write_behind': write_behind
+    })
+
+@bp.route('/api/query-stats', methods=['GET'])
+def get_query_statistics():
+    """Endpoint to get per-query timing statistics for this process"""
+    registry = get_query_stats()
+    if request.args.get('reset') == '1':
+        registry.reset()
+    return jsonify({
+        'status': 'success',
+        'data': registry.snapshot()
+    })
+
 @bp.route('/api/graph-data')
 def get_graph_data():
     """Endpoint to fetch data for graphs"""
@@ -142,43 +135,16 @@ def get_graph_data():
         }
         
         if neo.enabled:
-            with neo.get_session() as db_session:
-                # Get fines trend data (example: fines by month)
-                trend_query = """
-                MATCH (v:Violation)-[r:PENALTY_IN_RANGE]->(p:PenaltyRange)
-                RETURN v.date as date, sum(p.max) as total_fine
-                ORDER BY date
-                """
-                result = db_session.run(trend_query).data()
-                data['fines_trend'] = [
-                    {'date': item['date'], 'amount': float(item['total_fine'] or 0)}
-                    for item in result
-                ]
-                
-                # Get violation types distribution
-                violation_query = """
-                MATCH (v:Violation)
-                RETURN v.type as violation_type, count(*) as count
-                ORDER BY count DESC
-                LIMIT 10
-                """
-                result = db_session.run(violation_query).data()
-                data['violation_types'] = [
-                    {'type': item['violation_type'], 'count': item['count']}
-                    for item in result
-                ]
-                
-                # Get relationship distribution
-                rel_query = """
-                MATCH ()-[r]->()
-                RETURN type(r) as rel_type, count(*) as count
-                ORDER BY count DESC
-                """
-                result = db_session.run(rel_query).data()
-                data['relationship_distribution'] = {
-                    item['rel_type']: item['count']
-                    for item in result
-                }
+            # Fines trend is read from the monthly rollup nodes (O(months) rows)
+            data['fines_trend'] = get_fines_trend(neo)
+            neo.close()
+            
+            # Violation types and relationship distribution come from the cached stats
+            stats = get_stats_service().get()
+            data['violation_types'] = list(stats['violation_types'])
+            data['relationship_distribution'] = dict(sorted(
+                stats['relationships'].items(), key=lambda item: item[1], reverse=True
+            ))
                 
         return jsonify(data)
         
@@ -258,98 +224,32 @@ def index():
     }
     
     try:
-        neo = get_client_from_env()
-        
-        if neo.enabled:
-            with neo.get_session() as db_session:
-                # Get all node counts in a single query for better performance
-                node_counts_query = """
-                MATCH (n)
-                WITH 
-                    count(CASE WHEN 'Violation' IN labels(n) THEN 1 ELSE null END) as violations,
-                    count(CASE WHEN 'Circular' IN labels(n) THEN 1 ELSE null END) as circulars,
-                    count(CASE WHEN 'PenaltyRange' IN labels(n) THEN 1 ELSE null END) as penalties,
-                    count(CASE WHEN 'LegalProvision' IN labels(n) THEN 1 ELSE null END) as legal_provisions,
-                    count(CASE WHEN 'Reason' IN labels(n) THEN 1 ELSE null END) as reasons,
-                    count(CASE WHEN 'ComplianceRule' IN labels(n) THEN 1 ELSE null END) as compliance_rules
-                RETURN violations, circulars, penalties, legal_provisions, reasons, compliance_rules
-                """
-                result = db_session.run(node_counts_query).single()
-                
-                if result:
-                    db_counts.update({
-                        'total_violations': result.get('violations', 0),
-                        'total_circulars': result.get('circulars', 0),
-                        'total_penalties': result.get('penalties', 0),
-                        'total_legal_provisions': result.get('legal_provisions', 0),
-                        'total_reasons': result.get('reasons', 0),
-                        'total_compliance_rules': result.get('compliance_rules', 0)
-                    })
-                
-                # Get relationship counts
-                rel_counts_query = """
-                MATCH ()-[r]->()
-                WITH 
-                    sum(CASE WHEN type(r) = 'HAS_REASON' THEN 1 ELSE 0 END) as has_reason,
-                    sum(CASE WHEN type(r) = 'HAS_VIOLATION' THEN 1 ELSE 0 END) as has_violation,
-                    sum(CASE WHEN type(r) = 'INVOKES' THEN 1 ELSE 0 END) as invokes,
-                    sum(CASE WHEN type(r) = 'PENALTY_IN_RANGE' THEN 1 ELSE 0 END) as penalty_in_range
-                RETURN has_reason, has_violation, invokes, penalty_in_range
-                """
-                rel_result = db_session.run(rel_counts_query).single()
-                
-                if rel_result:
-                    db_counts.update({
-                        'total_has_reason': rel_result.get('has_reason', 0),
-                        'total_has_violation': rel_result.get('has_violation', 0),
-                        'total_invokes': rel_result.get('invokes', 0),
-                        'total_penalty_in_range': rel_result.get('penalty_in_range', 0)
-                    })
-                
-                # Log all counts for debugging
-                current_app.logger.info("Database counts: %s", db_counts)
-                
-                # Store counts in session for quick access
-                session['db_counts'] = db_counts
-                
-                # 6. Count all nodes with label 'ComplianceRule'
-                rules_query = """
-                MATCH (n)
-                WHERE 'ComplianceRule' IN labels(n)
-                RETURN count(n) as count
-                """
-                result = db_session.run(rules_query).single()
-                db_counts['total_compliance_rules'] = result['count'] if result and 'count' in result else 0
-                current_app.logger.info(f"ComplianceRules count: {db_counts['total_compliance_rules']}")
-                
-                # Log final counts for debugging
-                current_app.logger.info(f"Final database counts: {db_counts}")
-                
-                # Set default values for other template variables
-                recent_violations = []
-                top_penalties = []
-                total_settlements = 0
-                total_fines = 0
-                monitored_fines = 0
-                non_compliance = 0
-                critical_violations = 0
-                high_risk_violations = 0
-                medium_risk_violations = 0
-                low_risk_violations = 0
-                recent_fines = []
-                trend_labels = []
-                trend_values = []
-                violation_labels = []
-                violation_values = []
+        # Counts come from the cached count-store snapshot, so page render time
+        # does not depend on graph size
+        stats = get_stats_service().get()
+        nodes = stats['nodes']
+        relationships = stats['relationships']
+        db_counts.update({
+            'total_violations': nodes.get('Violation', 0),
+            'total_circulars': nodes.get('Circular', 0),
+            'total_penalties': nodes.get('PenaltyRange', 0),
+            'total_legal_provisions': nodes.get('LegalProvision', 0),
+            'total_reasons': nodes.get('Reason', 0),
+            'total_compliance_rules': nodes.get('ComplianceRule', 0),
+            'total_has_reason': relationships.get('HAS_REASON', 0),
+            'total_has_violation': relationships.get('HAS_VIOLATION', 0),
+            'total_invokes': relationships.get('INVOKES', 0),
+            'total_penalty_in_range': relationships.get('PENALTY_IN_RANGE', 0)
+        })
         
-        # Log all counts for debugging
-        current_app.logger.info(f"Final database counts: {db_counts}")
+        # Store counts in session for quick access
+        session['db_counts'] = db_counts
         
         # Set default values for other template variables
         recent_violations = []
         top_penalties = []
         total_settlements = 0
-        total_fines = 0  # This is used in the template
+        total_fines = stats.get('total_fines', 0)  # This is used in the template
         monitored_fines = 0
         non_compliance = 0
         critical_violations = 0
@@ -362,21 +262,6 @@ def index():
         violation_labels = []
         violation_values = []
         
-        # Get total fines from the database
-        try:
-            if neo._driver:
-                with neo._driver.session() as db_session:
-                    # Query to get the sum of penalty amounts from Violation nodes
-                    fines_query = """
-                    MATCH (v:Violation)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
-                    RETURN sum(p.max) as total_fines
-                    """
-                    result = db_session.run(fines_query).single()
-                    if result and 'total_fines' in result and result['total_fines'] is not None:
-                        total_fines = int(result['total_fines'])
-        except Exception as e:
-            current_app.logger.error(f"Error getting total fines: {str(e)}")
-        
         # Debug log the counts
         current_app.logger.info(f"Database counts: {db_counts}")
         
@@ -418,37 +303,12 @@ def index():
 def get_compliance_rules():
     """Return a list of compliance rules with their details from the database.
     
-    If the database is not available or there's an error, returns a default set of rules.
+    Rules come from the process-wide rule registry, which re-reads the graph
+    at most every COMPLIANCE_RULES_CHECK_INTERVAL seconds. If the database is
+    not available the last loaded rules (or none) are returned.
     """
     try:
-        # Get the Neo4j client
-        neo = get_client_from_env()
-        
-        # Check if we have a valid Neo4j client
-        if not neo or not hasattr(neo, '_driver') or not neo._driver:
-            logging.warning("No valid Neo4j connection available, using default compliance rules")
-            return get_default_compliance_rules()
-            
-        # Import the required functions
-        from app.utils.graph import get_compliance_rules as get_db_rules, initialize_compliance_rules
-        
-        try:
-            # Initialize default rules if they don't exist
-            initialize_compliance_rules(neo)
-            
-            # Fetch rules from the database
-            rules = get_db_rules(neo)
-            if rules:
-                return rules
-                
-        except Exception as e:
-            logging.error(f"Error initializing/fetching compliance rules: {str(e)}")
-            import traceback
-            logging.error(traceback.format_exc())
-            
-        # Fall back to default rules if anything goes wrong
-        return get_default_compliance_rules()
-        
+        return get_rule_registry().get().stored_rules_list()
     except Exception as e:
         logging.error(f"Error in get_compliance_rules: {str(e)}")
         import traceback
@@ -586,12 +446,13 @@ def api_upload():
         return jsonify({'error': 'No file selected'}), 400
     if file and file.filename.lower().endswith('.pdf'):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        logging.info(f'File uploaded: {filename} at {filepath}')
+        stored = get_upload_store(current_app.config['UPLOAD_FOLDER']).save(file.stream, filename)
+        logging.info(f'File uploaded: {filename} at {stored.path}')
         return jsonify({
             'success': True,
             'filename': filename,
+            'content_hash': stored.digest,
+            'duplicate': stored.duplicate,
             'message': 'File uploaded successfully'
         })
     logging.warning(f'Invalid file type attempted: {file.filename}')
@@ -619,9 +480,17 @@ def api_process():
         logging.error(f'File not found for processing: {filepath}')
         return jsonify({'error': 'File not found'}), 404
     try:
-        # Process the PDF
-        logging.info(f'Starting PDF processing for: {filepath}')
-        results = process_rbi_pdf(filepath, current_app.config['GEMINI_API_KEY'])
+        # Reuse the extraction of identical content uploaded before, under any name
+        store = get_upload_store(current_app.config['UPLOAD_FOLDER'])
+        content_hash = store.digest_for(filename)
+        results = store.load_result(PDF_EXTRACTION, content_hash)
+        if results is not None:
+            logging.info(f'Reusing extraction of {content_hash[:12]} for: {filepath}')
+        else:
+            logging.info(f'Starting PDF processing for: {filepath}')
+            results = process_rbi_pdf(filepath, current_app.config['GEMINI_API_KEY'])
+            if not results.empty:
+                store.save_result(PDF_EXTRACTION, content_hash, results)
         # Log the extracted data (first 5 rows for brevity)
         if not results.empty:
             logging.info(f'Extracted data sample: {results.head().to_dict(orient="records")}')
@@ -632,10 +501,12 @@ def api_process():
         # Always write header row for CSV
         results.to_csv(results_file, index=False, header=True)
         logging.info(f'Processing complete. Results saved to: {results_file}')
-        # Write to Neo4j (no-op if env not set)
+        # Queue the Neo4j writes (no-op if env not set); the write-behind
+        # buffer flushes them in batches after the response is sent
         try:
             neo = get_client_from_env()
-            if neo.enabled and not results.empty:
+            # Queued even while the circuit breaker is open; the buffer holds them until Neo4j is back
+            if neo.configured and not results.empty:
                 for row in results.to_dict('records'):
                     # Normalize numeric penalty range if parsable
                     pen_min, pen_max = None, None
@@ -660,8 +531,8 @@ def api_process():
                         'legal': str(row.get('Legal Provision Invoked','')),
                         'reason': str(row.get('Reason / Description','')),
                     }
-                    logging.info(f"Writing to Neo4j: {neo_record}")
-                    neo.upsert_violation(neo_record)
+                    logging.info(f"Queueing Neo4j write: {neo_record}")
+                    queue_violation_upsert(neo_record)
             if 'neo' in locals():
                 neo.close()
         except Exception as neo_err:
@@ -741,11 +612,11 @@ def debug_excel():
         return jsonify({'error': 'File not found'}), 404
         
     try:
-        xls = pd.ExcelFile(filepath)
+        first_rows = read_excel_rows(filepath, sheet=0, nrows=1)
         result = {
-            'sheet_names': xls.sheet_names,
-            'first_sheet_columns': pd.read_excel(filepath, sheet_name=0, nrows=1).columns.tolist(),
-            'first_sheet_first_row': pd.read_excel(filepath, sheet_name=0, nrows=1).iloc[0].to_dict()
+            'sheet_names': get_sheet_names(filepath),
+            'first_sheet_columns': first_rows.columns.tolist(),
+            'first_sheet_first_row': first_rows.iloc[0].to_dict()
         }
         return jsonify(result)
     except Exception as e:
@@ -768,14 +639,15 @@ def api_excel_upload():
         return jsonify({'error': 'Invalid file type. Please upload an Excel (.xlsx/.xls)'}), 400
         
     filename = secure_filename(file.filename)
-    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
+    stored = get_upload_store(current_app.config['UPLOAD_FOLDER']).save(file.stream, filename)
+    filepath = stored.path
     logging.info(f'Excel uploaded: {filename} at {filepath}')
     
     try:
-        # Read the Excel file to get sheet information
-        xls = pd.ExcelFile(filepath)
-        sheet_names = xls.sheet_names
+        # Parse the workbook once; later reads load the cached columns
+        # (identical content uploaded before is already converted)
+        convert_workbook(filepath, digest=stored.digest)
+        sheet_names = get_sheet_names(filepath)
         sheet_count = len(sheet_names)
         
         return jsonify({
@@ -784,7 +656,9 @@ def api_excel_upload():
             'sheet_count': sheet_count,
             'sheet_names': sheet_names,
             'message': f'File uploaded successfully with {sheet_count} sheets',
-            'filepath': filepath
+            'filepath': filepath,
+            'content_hash': stored.digest,
+            'duplicate': stored.duplicate
         })
     except Exception as e:
         # If there's an error reading the Excel file, still return success but with a warning
@@ -800,6 +674,9 @@ def api_excel_upload():
 def _resolve_excel_columns(df: pd.DataFrame, sheet_type='transaction'):
     """Resolve column names for different sheet types.
     
+    Exact synonyms win; unfamiliar headers are matched by token and fuzzy
+    similarity (see app/utils/column_resolver.py).
+    
     Args:
         df: DataFrame to resolve columns for
         sheet_type: Type of sheet ('transaction' or 'kyc')
@@ -807,101 +684,112 @@ def _resolve_excel_columns(df: pd.DataFrame, sheet_type='transaction'):
     Returns:
         dict: Mapping of standardized column names to actual column names
     """
-    # Get all column names in lowercase for case-insensitive matching
-    print(f"DEBUG: Processing sheet type: {sheet_type}")
-    print(f"DEBUG: Raw input columns: {df.columns.tolist()}")
-    
-    # Create a normalized mapping of column names
-    cols = {str(col).strip().lower(): str(col).strip() for col in df.columns}
-    print(f"DEBUG: Normalized column mapping: {cols}")
-    
-    resolved = {}
-    
-    if sheet_type == 'transaction':
-        # Transaction sheet columns
-        resolved['transaction_id'] = next(
-            (cols[c] for c in ['transaction id', 'transaction_id', 'txnid', 'transactionid'] 
-             if c in cols), None)
-        resolved['sender'] = next(
-            (cols[c] for c in ['sender name', 'sender', 'from', 'sender_account', 'from_account'] 
-             if c in cols), None)
-        resolved['receiver'] = next(
-            (cols[c] for c in ['receiver name', 'receiver', 'to', 'receiver_account', 'to_account'] 
-             if c in cols), None)
-        resolved['amount'] = next(
-            (cols[c] for c in ['amount', 'txn_amount', 'transaction amount'] 
-             if c in cols), None)
-        resolved['date'] = next(
-            (cols[c] for c in ['date', 'transaction_date', 'txn_date', 'value_date'] 
-             if c in cols), None)
-    
-    elif sheet_type == 'kyc':
-        # KYC sheet columns - first try to find exact matches
-        resolved['customer_id'] = next(
-            (cols[c] for c in ['customer id', 'customer_id', 'cust_id', 'client_id'] 
-             if c in cols), None)
-        resolved['customer_name'] = next(
-            (cols[c] for c in ['customer name', 'customer_name', 'name', 'customer', 'john smith'] 
-             if c in cols), None)
-        resolved['account_number'] = next(
-            (cols[c] for c in ['account no', 'account no.', 'account number', 'account_number', 'account', 'acct_no'] 
-             if c in cols), None)
-        resolved['violation_type'] = next(
-            (cols[c] for c in ['customer violation', 'violation type', 'violation_type', 'violation', 'rule invoked', 'rule_invoked'] 
-             if c in cols), None)
-        resolved['kyc_status'] = next(
-            (cols[c] for c in ['kyc verified', 'kyc status', 'kyc_status', 'status', 'customer_status'] 
-             if c in cols), None)
-        
-        # If account_number not found, try to find a column that might contain account numbers
-        if not resolved['account_number']:
-            for col_name, actual_name in cols.items():
-                if any(term in col_name for term in ['account', 'acct', 'acc no', 'accno']):
-                    resolved['account_number'] = actual_name
-                    break
-    
-    # Handle different sheet types
-    if sheet_type == 'kyc':
-        # For KYC sheet, we're looking for customer violations
-        kyc_columns = {
-            'transaction_id': ['transaction id', 'transaction_id', 'txnid', 'transactionid', 'transaction id'],
-            'account_number': ['account no', 'account no.', 'account number', 'account_number', 'account', 'acct_no'],
-            'sender_name': ['sender name', 'sender_name', 'customer name', 'name', 'john smith'],
-            'date': ['date', 'transaction date', 'txn_date', 'value date'],
-            'kyc_verified': ['kyc verified', 'kyc_verified', 'kyc status', 'kyc_status', 'kyc'],
-            'violation_type': ['customer violation', 'violation type', 'violation_type', 'rule invoked', 'rule_invoked', 'violation'],
-        }
-        
-        for field, possible_names in kyc_columns.items():
-            for name in possible_names:
-                if name in cols:
-                    resolved[field] = cols[name]
-                    break
-                    
-    else:  # transaction sheet
-        # For transaction sheet, we're looking for transaction details
-        tx_columns = {
-            'transaction_id': ['transaction id', 'transaction_id', 'txnid', 'transactionid'],
-            'date': ['date', 'transaction date', 'txn_date'],
-            'sender_account': ['sender account', 'sender_account', 'from account', 'from_account'],
-            'sender_name': ['sender name', 'sender_name', 'from name', 'from_name'],
-            'receiver_account': ['receiver account', 'receiver_account', 'to account', 'to_account'],
-            'receiver_name': ['receiver name', 'receiver_name', 'to name', 'to_name'],
-            'amount': ['amount', 'transaction amount', 'amt'],
-            'transaction_type': ['transaction type', 'transaction_type', 'type', 'txn_type'],
-            'description': ['description', 'desc', 'details', 'transaction details'],
-            'balance': ['balance', 'account balance', 'current balance']
-        }
-        
-        for field, possible_names in tx_columns.items():
-            for name in possible_names:
-                if name in cols:
-                    resolved[field] = cols[name]
-                    break
-    
-    print(f"DEBUG: All resolved columns: {resolved}")
+    return resolve_columns(df.columns, sheet_type)
+
+
+def _parse_amount_column(values: pd.Series) -> pd.Series:
+    """Parse an amount column to floats.
     
-    return {k: v for k, v in resolved.items() if v is not None}
+    ``₹``, ``$`` and thousands separators are stripped. Blank cells count as 0;
+    cells that still are not numbers come back as NaN.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(float).fillna(0.0)
+    present = values.notna()
+    numeric = present & values.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    parsed = pd.Series(0.0, index=values.index)
+    parsed[numeric] = values[numeric].astype(float).to_numpy()
+    text = present & ~numeric
+    if text.any():
+        parsed[text] = _parse_amount_text(values[text]).to_numpy()
+    return parsed
+
+
+def _parse_amount_text(values: pd.Series) -> pd.Series:
+    cleaned = values.astype(str).str.replace(r'[,₹$]', '', regex=True).str.strip().replace('', '0')
+    try:
+        parsed = cleaned.astype(float)
+    except ValueError:
+        # to_numeric only finds the bad cells; astype(float) rounds exactly like float()
+        valid = pd.to_numeric(cleaned, errors='coerce').notna()
+        parsed = pd.Series(float('nan'), index=cleaned.index)
+        parsed[valid] = cleaned[valid].astype(float).to_numpy()
+    return parsed
+
+
+def _sheet_columns(df: pd.DataFrame, columns: Dict[str, str]) -> Dict[str, Any]:
+    """Map resolved column names (stripped strings) back to the sheet's own labels."""
+    labels = {str(col).strip(): col for col in df.columns}
+    return {field: labels[name] for field, name in columns.items() if name in labels}
+
+
+def _unique_text(values: pd.Series) -> pd.Series:
+    """``str`` of each value, converting every distinct value only once."""
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).map(str).to_numpy()[codes]
+    # Blank cells keep their own spelling ('None', 'nan', 'NaT')
+    blank = codes < 0
+    if blank.any():
+        text[blank] = values[blank].map(str).to_numpy()
+    return pd.Series(text, index=values.index, dtype=object)
+
+
+def _column_text(df: pd.DataFrame, column: Optional[Any], rows) -> List[str]:
+    """Stripped ``str`` of the given rows' cells in ``column``; '' for a missing column."""
+    if column is None:
+        return [''] * len(rows)
+    return _unique_text(df[column].iloc[rows]).str.strip().tolist()
+
+
+def _cell_text(df: pd.DataFrame, column: Optional[str], rows, strip: bool = False) -> List[Optional[str]]:
+    """``str`` of the given rows' cells in ``column``; None for blank cells or a missing column."""
+    if column is None:
+        return [None] * len(rows)
+    values = df[column].iloc[rows]
+    text = _unique_text(values)
+    if strip:
+        text = text.str.strip()
+    return text.where(values.notna().to_numpy(), None).tolist()
+
+
+def _high_value_violation_detail(amount: float) -> Dict[str, Any]:
+    return {
+        'violation_type': 'High Value Transaction',
+        'legal_provision': 'RBI Master Direction on KYC 2016',
+        'circular': 'RBI/2021-22/123',
+        'penalty_min': 50000,
+        'penalty_max': 200000,
+        'reason': f'Transaction amount of ₹{amount:,.2f} exceeds the high-value threshold of ₹9,00,000',
+        'risk_level': 'HIGH'
+    }
+
+
+def _monthly_violation_detail(violation: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'violation_type': 'Monthly Deposit Limit Exceeded',
+        'legal_provision': 'Internal Risk Management Policy',
+        'circular': 'INTERNAL/RISK/2023/001',
+        'penalty_min': 10000,
+        'penalty_max': 50000,
+        'reason': f"Account exceeded deposit limit of ₹{violation['total_deposits'] - violation['excess_amount']:,.0f}. Deposited ₹{violation['total_deposits']:,.2f} in {violation['month']}",
+        'excess_amount': violation['excess_amount'],
+        'risk_level': 'MEDIUM' if violation['excess_amount'] < 100000 else 'HIGH'
+    }
+
+
+def _kyc_violation_details(violation_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Violation details reported for every transaction of a flagged account."""
+    details = violation_info.get('violation_details')
+    if not isinstance(details, list):
+        return []
+    return [{
+        'violation_type': detail.get('violation_type', 'KYC Violation'),
+        'legal_provision': detail.get('legal_provision', 'RBI KYC Master Direction'),
+        'circular': detail.get('circular', 'RBI/2022-23/123'),
+        'penalty_min': detail.get('penalty_min', 5000),
+        'penalty_max': detail.get('penalty_max', 100000),
+        'reason': detail.get('reason', 'KYC/AML violation detected')
+    } for detail in details if isinstance(detail, dict)]
 
 
 def _process_transaction_sheet(df, neo, sheet_name=None, kyc_data=None):
@@ -919,29 +807,37 @@ def _process_transaction_sheet(df, neo, sheet_name=None, kyc_data=None):
     if kyc_data is None:
         kyc_data = {}
         
-    print(f"DEBUG: Processing transaction sheet: {sheet_name}")
-    print(f"DEBUG: Raw DataFrame columns: {df.columns.tolist()}")
-    
     # Resolve column names
     columns = _resolve_excel_columns(df, sheet_type='transaction')
-    print(f"DEBUG: Resolved columns: {columns}")
     
     # Check for required columns
     required_columns = ['transaction_id', 'sender_account', 'amount', 'date']
     missing_columns = [col for col in required_columns if col not in columns]
     if missing_columns:
         error_msg = f"Missing required columns: {', '.join(missing_columns)}. Available columns: {df.columns.tolist()}"
-        print(f"DEBUG: {error_msg}")
+        logging.warning(f"Transaction sheet {sheet_name}: {error_msg}")
         return {'error': error_msg}, 400
     
+    sheet_columns = _sheet_columns(df, columns)
+    
+    # Parse the columns the checks need once, for the whole sheet
+    accounts = df[sheet_columns['sender_account']].map(str).str.strip()
+    amounts = _parse_amount_column(df[sheet_columns['amount']])
+    
     # Check for monthly deposit limit violations
     try:
         logging.info("Checking for monthly deposit limit violations...")
-        monthly_limit_violations = _check_monthly_deposit_limit(df.rename(columns={
-            columns['sender_account']: 'sender_account',
-            columns['amount']: 'amount',
-            columns['date']: 'date'
-        }))
+        transaction_dates = df[sheet_columns['date']]
+        try:
+            breaches, deposit_window = _deposit_limit_breaches(pd.DataFrame({
+                'sender_account': accounts,
+                'amount': amounts,
+                'date': transaction_dates
+            }))
+        except Exception as e:
+            logging.error(f"Error in _deposit_limit_breaches: {str(e)}", exc_info=True)
+            breaches, deposit_window = pd.DataFrame(columns=['sender_account', 'window_end', 'violation']), MONTH
+        monthly_limit_violations = _violations_by_account(breaches)
         
         # Log the number of violations found
         if monthly_limit_violations:
@@ -949,7 +845,9 @@ def _process_transaction_sheet(df, neo, sheet_name=None, kyc_data=None):
         else:
             logging.info("No monthly deposit limit violations found")
             
-        # Add monthly limit violations to kyc_data
+        # Add monthly limit violations to kyc_data so those accounts are
+        # reported; their breaches are attached per window below, not as KYC details
+        monthly_only = set()
         for account, violations in monthly_limit_violations.items():
             if account not in kyc_data:
                 kyc_data[account] = {
@@ -957,120 +855,129 @@ def _process_transaction_sheet(df, neo, sheet_name=None, kyc_data=None):
                     'violation_details': violations,
                     'has_violation': True
                 }
-                logging.info(f"Added monthly deposit limit violation for account {account}: {len(violations)} violations")
+                monthly_only.add(account)
                 
     except Exception as e:
         error_msg = f"Error checking monthly deposit limits: {str(e)}"
         logging.error(error_msg, exc_info=True)
         return {'error': error_msg}, 500
     
-    results = []
-    for idx, row in df.iterrows():
+    # Fetch graph matches for every violation type this sheet can produce in
+    # one concurrent batch instead of one query per row
+    type_matches = {}
+    if neo.enabled:
+        candidate_types = {'High Value Transaction', 'Monthly Deposit Limit Exceeded'}
+        for info in kyc_data.values():
+            for detail in info.get('violation_details') or []:
+                if isinstance(detail, dict):
+                    candidate_types.add(detail.get('violation_type', 'KYC Violation'))
         try:
-            # Get account number (use sender account by default)
-            account_number = str(row.get(columns.get('sender_account', ''))).strip()
-            if not account_number or account_number.lower() == 'nan':
-                continue
-                
-            # Initialize result with basic transaction info
-            amount = float(str(row[columns['amount']]).replace(',', '').replace('₹', '').replace('$', '').strip() or '0') if 'amount' in columns and pd.notna(row[columns['amount']]) else 0
-            result = {
-                'row_id': idx,
-                'sheet': sheet_name or 'transactions',
-                'transaction_id': str(row[columns['transaction_id']]).strip() if 'transaction_id' in columns and pd.notna(row[columns['transaction_id']]) else None,
-                'sender_account': account_number,
-                'receiver': str(row[columns.get('receiver', '')]).strip() if 'receiver' in columns and pd.notna(row[columns.get('receiver', '')]) else None,
-                'amount': amount,
-                'date': str(row[columns.get('date', '')]) if 'date' in columns and pd.notna(row[columns.get('date', '')]) else None,
-                'violation_details': [],
-                'has_violation': False
-            }
-            
-            # Check for high-value transactions (over ₹9,00,000)
-            if amount > 900000:
-                result['violation_details'].append({
-                    'violation_type': 'High Value Transaction',
-                    'legal_provision': 'RBI Master Direction on KYC 2016',
-                    'circular': 'RBI/2021-22/123',
-                    'penalty_min': 50000,
-                    'penalty_max': 200000,
-                    'reason': f'Transaction amount of ₹{amount:,.2f} exceeds the high-value threshold of ₹9,00,000',
-                    'risk_level': 'HIGH'
-                })
-                result['has_violation'] = True
-            
-            # Check for monthly deposit limit violation (only if not already flagged as high value)
-            if account_number in monthly_limit_violations and amount <= 900000:
-                for violation in monthly_limit_violations[account_number]:
-                    result['violation_details'].append({
-                        'violation_type': 'Monthly Deposit Limit Exceeded',
-                        'legal_provision': 'Internal Risk Management Policy',
-                        'circular': 'INTERNAL/RISK/2023/001',
-                        'penalty_min': 10000,
-                        'penalty_max': 50000,
-                        'reason': f"Account exceeded monthly deposit limit of ₹10,000. Deposited ₹{violation['total_deposits']:,.2f} in {violation['month']}",
-                        'excess_amount': violation['excess_amount'],
-                        'risk_level': 'MEDIUM' if violation['excess_amount'] < 100000 else 'HIGH'
-                    })
-                    result['has_violation'] = True
-            
-            # Check for other KYC violations
-            if account_number in kyc_data:
-                violation_info = kyc_data[account_number]
-                if 'violation_details' in violation_info and isinstance(violation_info['violation_details'], list):
-                    for detail in violation_info['violation_details']:
-                        if isinstance(detail, dict):
-                            result['violation_details'].append({
-                                'violation_type': detail.get('violation_type', 'KYC Violation'),
-                                'legal_provision': detail.get('legal_provision', 'RBI KYC Master Direction'),
-                                'circular': detail.get('circular', 'RBI/2022-23/123'),
-                                'penalty_min': detail.get('penalty_min', 5000),
-                                'penalty_max': detail.get('penalty_max', 100000),
-                                'reason': detail.get('reason', 'KYC/AML violation detected')
-                            })
-                            result['has_violation'] = True
-                            # Get additional details from Neo4j if available
-                if neo.enabled and result['has_violation']:
-                    try:
-                        # Get all unique violation types for this transaction
-                        violation_types = list(set([
-                            detail.get('violation_type') 
-                            for detail in result['violation_details'] 
-                            if detail.get('violation_type')
-                        ]))
-                        
-                        for v_type in violation_types:
-                            matches = find_violations_by_type(neo, v_type)
-                            for match in matches:
-                                result['violation_details'].append({
-                                    'violation_type': match.get('violationType') or v_type,
-                                    'legal_provision': match.get('legalProvision', ''),
-                                    'circular': match.get('circular'),
-                                    'penalty_min': match.get('penMin'),
-                                    'penalty_max': match.get('penMax'),
-                                    'reason': match.get('reason'),
-                                    'person': {
-                                        'name': match.get('personName'),
-                                        'id': match.get('personId'),
-                                        'email': match.get('personEmail'),
-                                        'phone': match.get('personPhone')
-                                    } if any(match.get(k) for k in ['personName', 'personId', 'personEmail', 'personPhone']) else None
-                                })
-                    except Exception as qerr:
-                        logging.error(f'Neo4j query error: {qerr}')
-                
-                results.append(result)
-                
-        except Exception as e:
-            print(f"DEBUG: Error processing row {idx+2}: {str(e)}")
-            continue
+            type_matches = batch_find_violations_by_type(candidate_types)
+        except Exception as qerr:
+            logging.error(f'Neo4j batch query error: {qerr}')
+    
+    # Only transactions from accounts with KYC or monthly-limit findings are
+    # reported. Rows without a sender account or with an unparseable amount
+    # are skipped.
+    transactions = pd.DataFrame({
+        'row': range(len(df)),
+        'sender_account': accounts.to_numpy(),
+        'amount': amounts.to_numpy(),
+        'window_end': _transaction_window_ends(transaction_dates, deposit_window).to_numpy()
+    })
+    transactions = transactions[
+        (transactions['sender_account'] != '')
+        & (transactions['sender_account'].str.lower() != 'nan')
+        & transactions['amount'].notna()
+    ]
+    
+    # Violation details are built once per account (KYC) or per breached
+    # window (deposit limit) and joined onto the rows
+    kyc_frame = pd.DataFrame(
+        [(str(account).strip(), [] if account in monthly_only else _kyc_violation_details(info))
+         for account, info in kyc_data.items()],
+        columns=['sender_account', 'kyc_details']
+    ).drop_duplicates('sender_account')
+    monthly_frame = pd.DataFrame({
+        'sender_account': [str(account).strip() for account in breaches['sender_account'].tolist()],
+        'window_end': breaches['window_end'].astype('datetime64[ns]'),
+        'monthly_details': [[_monthly_violation_detail(v)] for v in breaches['violation']]
+    }).drop_duplicates(['sender_account', 'window_end'])
+    matched = (transactions
+               .merge(kyc_frame, on='sender_account', how='inner')
+               .merge(monthly_frame, on=['sender_account', 'window_end'], how='left')
+               .sort_values('row', kind='stable'))
+    
+    rows = matched['row'].to_numpy()
+    high_value = (matched['amount'] > 900000).to_numpy()
+    transaction_ids = _cell_text(df, sheet_columns.get('transaction_id'), rows, strip=True)
+    receivers = _cell_text(df, sheet_columns.get('receiver'), rows, strip=True)
+    dates = _cell_text(df, sheet_columns.get('date'), rows)
+    row_ids = df.index[rows].tolist()
+    
+    graph_details = {}
+    
+    def _graph_details(v_type):
+        # Formatted graph matches for a violation type, fetched at most once
+        if v_type not in graph_details:
+            matches = type_matches[v_type] if v_type in type_matches else find_violations_by_type(neo, v_type)
+            graph_details[v_type] = [{
+                'violation_type': match.get('violationType') or v_type,
+                'legal_provision': match.get('legalProvision', ''),
+                'circular': match.get('circular'),
+                'penalty_min': match.get('penMin'),
+                'penalty_max': match.get('penMax'),
+                'reason': match.get('reason'),
+                'person': {
+                    'name': match.get('personName'),
+                    'id': match.get('personId'),
+                    'email': match.get('personEmail'),
+                    'phone': match.get('personPhone')
+                } if any(match.get(k) for k in ['personName', 'personId', 'personEmail', 'personPhone']) else None
+            } for match in matches]
+        return graph_details[v_type]
+    
+    # Materialise the per-row records for the output only
+    results = []
+    for i, (account_number, amount, kyc_details, monthly_details) in enumerate(zip(
+            matched['sender_account'], matched['amount'], matched['kyc_details'], matched['monthly_details'])):
+        violation_details = []
+        if high_value[i]:
+            violation_details.append(_high_value_violation_detail(amount))
+        elif isinstance(monthly_details, list):
+            # Monthly limit only applies when not already flagged as high value
+            violation_details.extend(dict(detail) for detail in monthly_details)
+        violation_details.extend(dict(detail) for detail in kyc_details)
+        
+        # Get additional details from Neo4j if available
+        if neo.enabled and violation_details:
+            try:
+                violation_types = dict.fromkeys(
+                    detail['violation_type'] for detail in violation_details if detail.get('violation_type')
+                )
+                for v_type in violation_types:
+                    violation_details.extend(dict(detail) for detail in _graph_details(v_type))
+            except Exception as qerr:
+                logging.error(f'Neo4j query error: {qerr}')
+        
+        results.append({
+            'row_id': row_ids[i],
+            'sheet': sheet_name or 'transactions',
+            'transaction_id': transaction_ids[i],
+            'sender_account': account_number,
+            'receiver': receivers[i],
+            'amount': float(amount),
+            'date': dates[i],
+            'violation_details': violation_details,
+            'has_violation': bool(violation_details)
+        })
     
     # Prepare the final result with summary
     summary = {
         'total_transactions': len(df),
         'violations_found': len([r for r in results if r.get('has_violation', False)]),
         'unique_violation_types': list({d['violation_type'] for r in results for d in r.get('violation_details', [])}),
-        'total_amount': sum(float(str(r.get('amount', '0')).replace(',', '').replace('₹', '').replace('$', '').strip() or '0') for r in results if r.get('amount') is not None)
+        'total_amount': sum(r['amount'] for r in results)
     }
     
     return {
@@ -1092,12 +999,8 @@ def _process_kyc_sheet(df, neo, sheet_name=None):
     Returns:
         dict: Contains processed KYC violation data and summary
     """
-    print(f"DEBUG: Processing KYC sheet: {sheet_name}")
-    print(f"DEBUG: Raw DataFrame columns: {df.columns.tolist()}")
-    
     # Resolve column names
     columns = _resolve_excel_columns(df, sheet_type='kyc')
-    print(f"DEBUG: Resolved KYC columns: {columns}")
     
     # Check for required columns
     required_columns = ['account_number', 'violation_type']
@@ -1106,62 +1009,78 @@ def _process_kyc_sheet(df, neo, sheet_name=None):
     if missing_columns:
         error_msg = f"Missing required columns in KYC sheet: {', '.join(missing_columns)}. " \
                   f"Available columns: {df.columns.tolist()}"
-        print(f"DEBUG: {error_msg}")
+        logging.warning(f"KYC sheet {sheet_name}: {error_msg}")
         return {'error': error_msg}, 400
     
-    results = []
-    for idx, row in df.iterrows():
+    sheet_columns = _sheet_columns(df, columns)
+    
+    # Rows without an account number or violation type are skipped
+    account_numbers = df[sheet_columns['account_number']].map(str).str.strip()
+    violation_types = df[sheet_columns['violation_type']].map(str).str.strip()
+    keep = ((account_numbers != '') & (violation_types != '')).to_numpy()
+    rows = keep.nonzero()[0]
+    records = pd.DataFrame({
+        'account_number': account_numbers.to_numpy()[rows],
+        'violation_type': violation_types.to_numpy()[rows]
+    })
+    
+    # Look up all accounts on the sheet in one batched query and join the
+    # formatted details back onto the rows
+    account_violations = {}
+    if neo.enabled:
         try:
-            account_number = str(row[columns['account_number']]).strip()
-            violation_type = str(row[columns['violation_type']]).strip()
-            
-            if not account_number or not violation_type:
-                print(f"DEBUG: Skipping row {idx+2} - missing account number or violation type")
-                continue
-                
-            # Get additional violation details from Neo4j if available
-            violation_details = []
-            if neo.enabled:
-                violations = find_violations_by_account(neo, account_number)
-                if violations:
-                    violation_details = [{
-                        'violation_type': v.get('violationType', violation_type),
-                        'description': v.get('description', ''),
-                        'legal_provision': v.get('legalProvision', ''),
-                        'penalty_range': v.get('penaltyRange', '')
-                    } for v in violations]
-            
-            result = {
-                'account_number': account_number,
-                'violation_type': violation_type,
-                'sender_name': str(row.get(columns.get('sender_name', ''), '')).strip(),
-                'date': str(row.get(columns.get('date', ''), '')).strip(),
-                'kyc_verified': str(row.get(columns.get('kyc_verified', ''), '')).strip(),
-                'sheet_name': sheet_name,
-                'row_index': idx + 2,  # +2 for 1-based index and header row
-                'violation_details': violation_details,
-                'has_violation': bool(violation_details)
-            }
-            
-            # Add any additional columns that might be present
-            for col in df.columns:
-                if col not in ['account_number', 'violation_type', 'sender_name', 'date', 'kyc_verified']:
-                    result[col] = row[col] if pd.notna(row[col]) else ''
-            
-            results.append(result)
-            
-        except Exception as e:
-            print(f"DEBUG: Error processing row {idx+2}: {str(e)}")
-            continue
+            account_violations = find_violations_by_accounts(neo, records['account_number'].unique().tolist())
+        except Exception as qerr:
+            logging.error(f'Neo4j batch query error: {qerr}')
+    details = pd.DataFrame(
+        [(account, [{
+            'violation_type': v.get('violationType'),
+            'description': v.get('description', ''),
+            'legal_provision': v.get('legalProvision', ''),
+            'penalty_range': v.get('penaltyRange', '')
+        } for v in violations]) for account, violations in account_violations.items() if violations],
+        columns=['account_number', 'violation_details']
+    )
+    records = records.merge(details, on='account_number', how='left')
+    
+    sender_names = _column_text(df, sheet_columns.get('sender_name'), rows)
+    dates = _column_text(df, sheet_columns.get('date'), rows)
+    kyc_verified = _column_text(df, sheet_columns.get('kyc_verified'), rows)
+    row_indexes = [label + 2 for label in df.index[rows].tolist()]  # +2 for 1-based index and header row
+    
+    # Any additional columns present on the sheet are copied as-is, blanks as ''
+    extra_columns = [col for col in df.columns
+                     if col not in ['account_number', 'violation_type', 'sender_name', 'date', 'kyc_verified']]
+    extras = df[extra_columns].iloc[rows]
+    extras = extras.astype(object).where(extras.notna(), '').to_dict('records')
+    
+    # Materialise the per-row records for the output only
+    results = []
+    for i, (account_number, violation_type, violation_details) in enumerate(zip(
+            records['account_number'], records['violation_type'], records['violation_details'])):
+        violation_details = [dict(detail) for detail in violation_details] if isinstance(violation_details, list) else []
+        result = {
+            'account_number': account_number,
+            'violation_type': violation_type,
+            'sender_name': sender_names[i],
+            'date': dates[i],
+            'kyc_verified': kyc_verified[i],
+            'sheet_name': sheet_name,
+            'row_index': row_indexes[i],
+            'violation_details': violation_details,
+            'has_violation': bool(violation_details)
+        }
+        result.update(extras[i])
+        results.append(result)
     
     summary = {
         'total_records': len(df),
-        'total_violations': len(results),
-        'unique_accounts': len({r['account_number'] for r in results}),
-        'violation_types': list({r['violation_type'] for r in results if r.get('violation_type')})
+        'total_violations': len(records),
+        'unique_accounts': int(records['account_number'].nunique()),
+        'violation_types': records['violation_type'].unique().tolist()
     }
     
-    print(f"DEBUG: Processed {len(results)} KYC violations from sheet {sheet_name}")
+    logging.info(f"Processed {len(results)} KYC violations from sheet {sheet_name}")
     return {
         'data': results,
         'summary': summary,
@@ -1180,271 +1099,7 @@ def _analyze_transaction_with_rules(transaction_row: Dict[str, Any], model):
     Returns:
         Dictionary with rule analysis results
     """
-    # Extract amount and convert to float for comparison
-    try:
-        amount = float(transaction_row.get('Amount', 0))
-    except (ValueError, TypeError):
-        amount = 0.0
-    
-    # Define compliance rules with more detailed triggers and conditions
-    compliance_rules = [
-        {
-            "name": "High Value Transaction",
-            "description": "Single transaction above ₹9,00,000 requires additional scrutiny",
-            "condition": "isinstance(t.get('amount', 0), (int, float)) and float(t.get('amount', 0)) > 900000",
-            "risk_level": "HIGH",
-            "penalty_min": 50000,
-            "penalty_max": 200000,
-            "legal_provision": "RBI Master Direction on KYC 2016"
-        },
-        {
-            "name": "Non-compliance with KYC norms",
-            "description": "Banks must collect KYC documents, verify customer identity, perform periodic KYC updates.",
-            "condition": "t.get('sender_kyc_status') and (kyc_status := str(t.get('sender_kyc_status', '')).strip().lower()) and kyc_status not in ['', 'completed'] and kyc_status in ['expired', 'rejected', 'incomplete', 'pending']",
-            "risk_level": "HIGH"
-        },
-        {
-            "name": "Violation of customer protection norms",
-            "description": "Banks must follow RBI's Charter of Customer Rights (fair treatment, transparency, grievance redress, etc).",
-            "condition": "any(term in description.lower() for term in ['unauthorized', 'disputed', 'unfair', 'complaint'])",
-            "risk_level": "HIGH"
-        },
-        {
-            "name": "Non-submission or delay in regulatory returns",
-            "description": "Banks must file periodic regulatory returns (NPAs, statutory returns, fraud reports) on time.",
-            "condition": "any(term in description.lower() for term in ['overdue', 'late submission', 'penalty', 'compliance charge'])",
-            "risk_level": "MEDIUM"
-        },
-        {
-            "name": "Inadequate oversight of outsourced activities",
-            "description": "Banks must audit outsourced services, cannot outsource policy formulation or loan sanction.",
-            "condition": "any(term in description.lower() for term in ['third-party', 'outsourced', 'vendor'])",
-            "risk_level": "MEDIUM"
-        },
-        {
-            "name": "Breach of digital lending norms",
-            "description": "Direct loan disbursement, APR disclosures, no automatic credit limit increases without consent.",
-            "condition": "any(term in description.lower() for term in ['fintech', 'lending app', 'lsp']) or 'digital_lending' in transaction_mode.lower()",
-            "risk_level": "HIGH"
-        },
-        {
-            "name": "Lapses in cybersecurity compliance",
-            "description": "Banks must maintain a cybersecurity framework, CISOs, audits; customers must follow safe practices.",
-            "condition": "any(term in description.lower() for term in ['suspicious', 'alert', 'fraud', 'cyber', 'hack'])",
-            "risk_level": "CRITICAL"
-        }
-    ]
-    
-    # Extract transaction details
-    # sender_kyc_status = str(transaction_row.get('Sender_KYC_Status', 'Unknown')).strip()
-    # description = str(transaction_row.get('Description', '')).lower()
-    # transaction_mode = str(transaction_row.get('Transaction_Mode', '')).lower()
-    
-    # Create comprehensive transaction text from all Excel fields
-    transaction_details = f"""
-TRANSACTION DETAILS:
-• Transaction ID: {transaction_row.get('Transaction_ID', 'N/A')}
-• Date: {transaction_row.get('Date', 'N/A')} at {transaction_row.get('Time', 'N/A')}
-• Sender: {transaction_row.get('Sender_Name', 'N/A')} (Account: {transaction_row.get('Sender_Account', 'N/A')})
-• Sender KYC Status: {sender_kyc_status}
-• Receiver: {transaction_row.get('Receiver_Name', 'N/A')} (Account: {transaction_row.get('Receiver_Account', 'N/A')})
-• Amount: ₹{amount:,.2f}
-• Transaction Type: {transaction_row.get('Transaction_Type', 'N/A')}
-• Transaction Mode: {transaction_mode}
-• Channel: {transaction_row.get('Channel', 'N/A')}
-• Branch: {transaction_row.get('Branch_Code', 'N/A')}
-• Location: {transaction_row.get('Location', 'N/A')}
-• Description: {transaction_row.get('Description', 'No description')}
-• Balance After: ₹{float(transaction_row.get('Balance_After', 0)):,.2f}
-• Reference: {transaction_row.get('Reference_Number', 'N/A')}
-"""
-
-    # Prepare rule descriptions for AI prompt
-    rule_descriptions = [
-        f"{i+1}. {rule['name']} → {rule['description']} (Risk: {rule['risk_level']})" 
-        for i, rule in enumerate(compliance_rules)
-    ]
-    
-    # Add additional rules that don't need automated checking
-    additional_rules = [
-        "Misclassification of NPAs → NPAs must be classified correctly after 90+ days of non-payment.",
-        "Non-reporting of large exposures → Large exposures (10%+ Tier 1 capital, or ₹1 lakh+ for reporting) must be reported.",
-        "Penalties under PMLA → Suspicious transactions must be reported and identity verified.",
-        "Non-compliance by Credit Information Companies → CICs must notify customers and secure data.",
-        "Non-cooperation with Ombudsman → Banks must cooperate with Ombudsman rulings."
-    ]
-    
-    rule_descriptions.extend([
-        f"{i+len(compliance_rules)+1}. {rule}" 
-        for i, rule in enumerate(additional_rules)
-    ])
-    
-    # Build the prompt with all rules and transaction details
-    prompt = f"""You are a compliance classification assistant for RBI banking regulations.
-You will receive one complete financial transaction record at a time.
-Your task is to analyze if this transaction violates any of the following RBI compliance rules.
-
-RBI COMPLIANCE RULES (in priority order):
-{chr(10).join(rule_descriptions)}
-
-{transaction_details}
-
-IMPORTANT: Only flag transactions above ₹9,00,000 as high-value. Do not flag transactions below this amount as high-value under any circumstances.
-
-ANALYSIS INSTRUCTIONS:
-1. Review the transaction details carefully against each compliance rule
-2. Pay special attention to:
-   - Transaction amount (CRITICAL: Only flag if amount > ₹9,00,000)
-   - Sender KYC status
-   - Transaction mode and channel
-   - Description text for any red flags
-   - Any unusual patterns or combinations
-
-3. For each rule that is violated, include:
-   - The exact rule name
-   - A clear, concise explanation of the violation without repeating the rule name or amount
-   - The risk level (CRITICAL, HIGH, MEDIUM, or LOW) - include this only once at the end
-   - For high value transactions, only include if amount is above ₹9,00,000
-
-4. If no rules are violated, respond with "No Violation"
-
-RESPONSE FORMAT (strict JSON):
-{{
-  "transaction_id": "{transaction_row.get('Transaction_ID', 'N/A')}",
-  "matched_rules": ["Rule Name 1", "Rule Name 2"],
-  "explanation": "Concise explanation of the specific violation without repeating the rule name or amount.",
-  "kyc_status": "{sender_kyc_status}",
-  "amount": {amount},
-  "risk_level": "HIGHEST_RISK_LEVEL_FOUND"
-}}
-
-EXAMPLE RESPONSE FOR VIOLATION:
-{{
-  "transaction_id": "TXN12345",
-  "matched_rules": ["High Value Transaction", "Lapses in cybersecurity compliance"],
-  "explanation": "Transaction amount of ₹9,50,000 exceeds the ₹9,00,000 threshold for high-value transactions. This transaction requires additional scrutiny as per RBI guidelines.",
-  "kyc_status": "Verified,completed",
-  "amount": 950000.0,
-  "risk_level": "CRITICAL"
-}}
-
-EXAMPLE RESPONSE FOR NO VIOLATION:
-{{
-  "transaction_id": "{transaction_row.get('Transaction_ID', 'N/A')}",
-  "matched_rules": ["No Violation"],
-  "explanation": "This transaction is below the ₹9,00,000 threshold and shows no other signs of suspicious activity.",
-  "kyc_status": "{sender_kyc_status}",
-  "amount": {amount},
-  "risk_level": "LOW"
-}}"""
-
-    try:
-        # Generate analysis from Gemini
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Log the raw response for debugging
-        logging.debug(f"Raw AI response for transaction {transaction_row.get('Transaction_ID', 'UNKNOWN')}:\n{response_text}")
-        
-        # Extract JSON from response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            try:
-                result = json.loads(json_match.group(0))
-                
-                # Check if this is a no-violation response
-                if result.get('matched_rules') == ["No Violation"] or not any(result.get('matched_rules', [])):
-                    return {
-                        'transaction_id': result.get('transaction_id', transaction_row.get('Transaction_ID', 'UNKNOWN')),
-                        'has_violation': False,
-                        'violation_details': [],
-                        'ai_analysis': {
-                            'matched_rules': ['No Violation'],
-                            'explanation': result.get('explanation', 'No compliance violations detected.'),
-                            'risk_level': 'LOW'
-                        }
-                    }
-                
-                # Process violations
-                matched_rules = result.get('matched_rules', [])
-                explanation = result.get('explanation', 'No explanation provided')
-                risk_level = result.get('risk_level', 'MEDIUM')
-                
-                # Format the response with detailed violation information
-                violation_details = []
-                for rule_name in matched_rules:
-                    # Find the rule details from our compliance_rules
-                    rule_details = next(
-                        (r for r in compliance_rules if r['name'] == rule_name),
-                        {'description': 'Rule details not available', 'risk_level': risk_level}
-                    )
-                    
-                    violation_details.append({
-                        'rule_name': rule_name,
-                        'description': rule_details.get('description', ''),
-                        'risk_level': rule_details.get('risk_level', risk_level),
-                        'details': {
-                            'transaction_id': result.get('transaction_id', transaction_row.get('Transaction_ID', 'UNKNOWN')),
-                            'status': 'VIOLATION',
-                            'severity': rule_details.get('risk_level', risk_level),
-                            'explanation': explanation
-                        }
-                    })
-                
-                # Determine the highest risk level from all violations
-                risk_levels = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
-                highest_risk = max(
-                    [risk_levels.get(v['risk_level'].upper(), 0) for v in violation_details],
-                    default=0
-                )
-                overall_risk = [k for k, v in risk_levels.items() if v == highest_risk][0]
-                
-                return {
-                    'transaction_id': result.get('transaction_id', transaction_row.get('Transaction_ID', 'UNKNOWN')),
-                    'has_violation': True,
-                    'violation_details': violation_details,
-                    'ai_analysis': {
-                        'matched_rules': matched_rules,
-                        'explanation': explanation,
-                        'risk_level': overall_risk
-                    }
-                }
-                
-            except json.JSONDecodeError as je:
-                logging.error(f"Failed to parse AI response as JSON: {je}\nResponse: {response_text}")
-                raise ValueError(f"Invalid JSON response from AI: {je}")
-            except Exception as e:
-                logging.error(f"Error processing AI response: {e}\nResponse: {response_text}")
-                raise
-        else:
-            logging.error(f"No JSON found in AI response. Full response:\n{response_text}")
-            raise ValueError("Could not find valid JSON in AI response")
-            
-    except Exception as e:
-        error_msg = str(e)
-        logging.error(f"Error analyzing transaction: {error_msg}")
-        
-        return {
-            'transaction_id': transaction_row.get('Transaction_ID', 'UNKNOWN'),
-            'has_violation': False,
-            'error': error_msg,
-            'ai_analysis': {
-                'matched_rules': ['Analysis Error'],
-                'explanation': f'Error analyzing transaction: {error_msg}',
-                'risk_level': 'UNKNOWN'
-            },
-            'violation_details': [{
-                'rule_name': 'Analysis Error',
-                'description': f'Failed to analyze transaction: {error_msg}',
-                'risk_level': 'UNKNOWN',
-                'details': {
-                    'transaction_id': transaction_row.get('Transaction_ID', 'UNKNOWN'),
-                    'status': 'ERROR',
-                    'severity': 'UNKNOWN',
-                    'explanation': f'Error during analysis: {error_msg}'
-                }
-            }]
-        }
+    return analyze_transaction(transaction_row, model)
 
 def _clean_for_json(obj):
     """
@@ -1455,68 +1110,64 @@ def _clean_for_json(obj):
         obj: Object to clean
         
     Returns:
-        JSON-serializable version of the object
+        JSON-serializable version of the object (see app/utils/fast_json.py)
     """
-    try:
-        # Handle None and numpy.nan
-        if obj is None or (hasattr(obj, 'item') and str(obj).lower() in ['nan', 'nat']):
-            return None
-            
-        # Handle basic JSON types
-        if isinstance(obj, (str, int, bool)):
-            return obj
-            
-        # Handle float specifically to catch NaN, inf, -inf
-        if isinstance(obj, float):
-            if pd.isna(obj) or pd.isnull(obj):
-                return None
-            return obj
-            
-        # Handle pandas NA/NaT/None
-        if str(obj).lower() in ['nat', 'nan', 'none', 'null']:
-            return None
-            
-        # Handle dictionaries - clean each value
-        if isinstance(obj, dict):
-            cleaned = {}
-            for k, v in obj.items():
-                # Special handling for 'rule invoked' field
-                if str(k).lower() == 'rule invoked' and (pd.isna(v) or v == ''):
-                    cleaned[str(k)] = None
-                else:
-                    cleaned[str(k)] = _clean_for_json(v)
-            return cleaned
-            
-        # Handle lists and tuples
-        if isinstance(obj, (list, tuple, set)):
-            return [_clean_for_json(item) for item in obj]
-            
-        # Handle pandas Series and DataFrames
-        if hasattr(obj, 'to_dict') and callable(getattr(obj, 'to_dict')):
-            return _clean_for_json(obj.to_dict())
-            
-        # Handle numpy types
-        if hasattr(obj, 'item') and callable(getattr(obj, 'item')):
-            try:
-                return _clean_for_json(obj.item())
-            except (ValueError, TypeError):
-                return None
-                
-        # Handle datetime objects
-        if hasattr(obj, 'isoformat') and callable(getattr(obj, 'isoformat')):
-            return obj.isoformat()
-            
-        # Convert to string as last resort
-        try:
-            return str(obj) if obj is not None else None
-        except Exception:
-            return None
-            
-    except Exception as e:
-        logging.error(f"Error cleaning object for JSON: {str(e)}, type: {type(obj)}, value: {str(obj)[:200] if obj is not None else 'None'}")
-        return None
+    return to_jsonable(obj)
 
-def _check_monthly_deposit_limit(transactions_df, monthly_limit=3000):
+def _deposit_limit_breaches(transactions_df, monthly_limit=3000, window=None):
+    """Find the windows in which an account's deposits exceed the limit.
+    
+    Args:
+        transactions_df: DataFrame with sender_account, amount and date columns
+        monthly_limit: Maximum allowed deposit amount per window (default: 3000)
+        window: 'month' for calendar months or a rolling window length in days
+            (default: DEPOSIT_LIMIT_WINDOW, else 'month')
+        
+    Returns:
+        Tuple of (breaches from ``find_limit_breaches`` with a ``violation``
+        column holding each breach's violation details, parsed window)
+    """
+    window = parse_window(window or os.getenv('DEPOSIT_LIMIT_WINDOW', MONTH))
+    breaches = find_limit_breaches(
+        transactions_df['sender_account'], transactions_df['date'], transactions_df['amount'],
+        monthly_limit, window
+    )
+    if breaches.empty:
+        breaches['violation'] = []
+        return breaches, window
+    
+    if window == MONTH:
+        periods = breaches['window_start'].dt.strftime('%Y-%m')
+        limit_name = 'monthly limit'
+    else:
+        periods = breaches['window_start'].dt.strftime('%Y-%m-%d') + ' to ' + breaches['window_end'].dt.strftime('%Y-%m-%d')
+        limit_name = f'{window}-day limit'
+    logging.info(f"Found {len(breaches)} deposit limit violations across {breaches['sender_account'].nunique()} accounts "
+                 f"({limit_name}: ₹{monthly_limit:,})")
+    
+    # Violation details in the format expected by the frontend
+    breaches['violation'] = [{
+        'violation_type': 'Monthly Deposit Limit Exceeded',
+        'month': period,
+        'total_deposits': total,
+        'excess_amount': excess,
+        'reason': f'Total deposits of ₹{int(total):,} exceed {limit_name} of ₹{monthly_limit:,}',
+        'legal_provision': 'RBI Guidelines on Digital Lending',
+        'penalty_min': 2500,  # Example penalty range
+        'penalty_max': 3000
+    } for period, total, excess in zip(periods.tolist(), breaches['total_deposits'].tolist(),
+                                       breaches['excess_amount'].tolist())]
+    return breaches, window
+
+
+def _violations_by_account(breaches: pd.DataFrame) -> Dict[Any, List[Dict[str, Any]]]:
+    violations_dict = {}
+    for account, violation in zip(breaches['sender_account'].tolist(), breaches['violation']):
+        violations_dict.setdefault(account, []).append(violation)
+    return violations_dict
+
+
+def _check_monthly_deposit_limit(transactions_df, monthly_limit=3000, window=None):
     """Check for accounts that exceed the monthly deposit limit.
     
     Args:
@@ -1524,74 +1175,79 @@ def _check_monthly_deposit_limit(transactions_df, monthly_limit=3000):
             - sender_account: Account number
             - amount: Transaction amount
             - date: Transaction date (YYYY-MM-DD format)
-        monthly_limit: Maximum allowed deposit amount per month (default: 3000)
+        monthly_limit: Maximum allowed deposit amount per window (default: 3000)
+        window: 'month' for calendar months or a rolling window length in days
+            (default: DEPOSIT_LIMIT_WINDOW, else 'month')
         
     Returns:
         Dictionary mapping account numbers to their violation details
     """
     try:
-        # Make a copy to avoid modifying the original DataFrame
-        df = transactions_df.copy()
-        
-        # Convert date column to datetime and extract year-month
-        df['transaction_date'] = pd.to_datetime(df['date'], errors='coerce')
-        df = df.dropna(subset=['transaction_date'])  # Drop rows with invalid dates
-        df['year_month'] = df['transaction_date'].dt.to_period('M')
-        
-        # Group by account and month, then sum the deposits
-        monthly_deposits = df.groupby(['sender_account', 'year_month'])['amount'].sum().reset_index()
-        
-        # Find accounts exceeding the limit
-        violations = monthly_deposits[monthly_deposits['amount'] > monthly_limit].copy()
-        
-        # Add violation details
-        violations['excess_amount'] = violations['amount'] - monthly_limit
-        violations['violation_type'] = 'Monthly Deposit Limit Exceeded'
-        violations['reason'] = f'Total deposits of ₹{violations["amount"].astype(int):,} exceed monthly limit of ₹{monthly_limit:,}'
-        violations['legal_provision'] = 'RBI Guidelines on Digital Lending'
-        violations['penalty_min'] = 2500  # Example penalty range
-        violations['penalty_max'] = 3000
-        
-        # Log the violations
-        if not violations.empty:
-            logging.info(f"Found {len(violations)} monthly deposit limit violations")
-            for _, row in violations.iterrows():
-                logging.info(
-                    f"Account {row['sender_account']} exceeded monthly limit in {row['year_month']}: "
-                    f"₹{row['amount']:,.2f} (limit: ₹{monthly_limit:,}) - "
-                    f"Excess: ₹{row['excess_amount']:,.2f}"
-                )
-        
-        # Convert to the format expected by the frontend
-        violations_dict = {}
-        for _, row in violations.iterrows():
-            account = row['sender_account']
-            if account not in violations_dict:
-                violations_dict[account] = []
-                
-            violations_dict[account].append({
-                'violation_type': row['violation_type'],
-                'month': str(row['year_month']),
-                'total_deposits': float(row['amount']),
-                'excess_amount': float(row['excess_amount']),
-                'reason': row['reason'],
-                'legal_provision': row['legal_provision'],
-                'penalty_min': row['penalty_min'],
-                'penalty_max': row['penalty_max']
-            })
-            
-        return violations_dict
-        
+        breaches, _ = _deposit_limit_breaches(transactions_df, monthly_limit, window)
+        return _violations_by_account(breaches)
     except Exception as e:
         error_msg = f"Error in _check_monthly_deposit_limit: {str(e)}"
         logging.error(error_msg, exc_info=True)
         return {}
+
+
+def _transaction_window_ends(dates: pd.Series, window) -> pd.Series:
+    """Last day of the deposit window each transaction is checked in.
+    
+    A transaction is covered by its calendar month, or for rolling windows by
+    the window that ends on the transaction's own day.
+    """
+    dates = pd.to_datetime(dates, errors='coerce')
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    if window == MONTH:
+        dates = dates + pd.offsets.MonthEnd(0)
+    return dates.dt.normalize().astype('datetime64[ns]')
+
+
+def _excel_reviewer() -> Tuple[Optional[Callable], Optional[str]]:
+    """Build the optional Gemini review stage for the Excel pipeline.
+    
+    Returns:
+        Tuple of (reviewer or None when review is disabled, error message)
+    """
+    if not llm_review_enabled():
+        return None, None
+    
+    api_key = current_app.config.get('GEMINI_API_KEY')
+    if not api_key:
+        return None, 'GEMINI_API_KEY not configured'
     
+    logging.info(f"Initializing Gemini model with API key: {api_key[:10]}...")
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel('gemini-1.5-flash')
+    
+    # Test API connection first
+    try:
+        model.generate_content("Hello, test message")
+        logging.info("✅ Gemini API connection successful")
+    except Exception as e:
+        error_msg = str(e)
+        logging.error(f"❌ Gemini API connection failed: {error_msg}")
+        if "429" in error_msg or "quota" in error_msg.lower():
+            return None, 'Gemini API quota exceeded. Please check your API limits.'
+        return None, f'Gemini API error: {error_msg}'
+    
+    classifier = BatchClassifier(model)
+    
+    def _review(rows: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        return [analysis.get('ai_analysis') for analysis in classifier.classify(rows)]
+    
+    return _review, None
+
 
 def _process_excel_file(filepath: str) -> Dict[str, Any]:
 
     """
-    Process Excel file to analyze transactions against compliance rules using AI.
+    Process Excel file to analyze transactions against compliance rules.
+    
+    The whole sheet is analysed in chunks (see app/utils/excel_pipeline.py);
+    rows no rule matches are reviewed by Gemini when EXCEL_LLM_REVIEW is set.
     
     Args:
         filepath: Path to the Excel file
@@ -1600,404 +1256,221 @@ def _process_excel_file(filepath: str) -> Dict[str, Any]:
         Dictionary containing analyzed transactions with rule violations
     """
     try:
-        # Initialize Gemini model
-        api_key = current_app.config.get('GEMINI_API_KEY')
-        if not api_key:
-            return {'error': 'GEMINI_API_KEY not configured'}
+        reviewer, error = _excel_reviewer()
+        if error:
+            return {'error': error}
         
-        logging.info(f"Initializing Gemini model with API key: {api_key[:10]}...")
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        result = ExcelAnalysisJob(filepath, reviewer=reviewer).run()
+        if 'error' in result:
+            return result
         
-        # Test API connection first
-        try:
-            test_response = model.generate_content("Hello, test message")
-            logging.info("✅ Gemini API connection successful")
-        except Exception as e:
-            error_msg = str(e)
-            logging.error(f"❌ Gemini API connection failed: {error_msg}")
-            if "429" in error_msg or "quota" in error_msg.lower():
-                return {'error': 'Gemini API quota exceeded. Please check your API limits.'}
-            return {'error': f'Gemini API error: {error_msg}'}
-        
-        # Read the Excel file (single sheet with transactions)
-        df = pd.read_excel(filepath)
-        logging.info(f"Excel columns: {df.columns.tolist()}")
-        
-        # Standardize column names
-        df.columns = [str(col).strip() for col in df.columns]
-        
-        # Find key columns - Description column is optional for KYC datasets
-        description_col = next((col for col in df.columns if 'description' in col.lower()), None)
-        
-        # Check if this is a KYC compliance dataset
-        kyc_columns = [col for col in df.columns if 'kyc' in col.lower()]
-        is_kyc_dataset = len(kyc_columns) > 0
-        
-        if not description_col and not is_kyc_dataset:
-            return {'error': 'Description column not found in Excel sheet. This appears to be neither a transaction dataset nor a KYC compliance dataset.'}
-        
-        # Process only first 2 rows
-        df = df.head(2)
-        total_rows = len(df)
-        logging.info(f"Processing first {total_rows} rows (one by one)")
-        
-        # If there are fewer than 2 rows, log a warning
-        if total_rows < 2:
-            logging.warning(f"Only {total_rows} rows found in the Excel file")
-        
-        transactions: List[Dict[str, Any]] = []
-        
-        # Process each row individually with detailed logging
-        for idx, row in df.iterrows():
-            try:
-                # Log start of processing for this row
-                logging.info(f"\n{'='*80}")
-                logging.info(f"📋 Processing Row {idx + 1}/{total_rows}")
-                logging.info(f"{'='*80}")
-                
-                # Convert row to dictionary with standardized column names
-                transaction_data = {}
-                for col in df.columns:
-                    # Clean column names by removing special characters and converting to lowercase
-                    clean_col = str(col).strip().lower().replace(' ', '_')
-                    transaction_data[clean_col] = row[col] if pd.notna(row[col]) else ''
-                    logging.info(f"  - {clean_col}: {transaction_data[clean_col]}")
-                
-                # Get transaction description from the most likely column (optional for KYC datasets)
-                description_cols = [col for col in transaction_data.keys() 
-                                 if 'desc' in col or 'note' in col or 'detail' in col or 'particular' in col]
-                
-                if description_cols:
-                    description_col = description_cols[0]
-                    transaction_text = str(transaction_data.get(description_col, '')).strip()
-                elif is_kyc_dataset:
-                    # For KYC datasets, use customer name or account number as identifier
-                    customer_cols = [col for col in transaction_data.keys() if 'customer' in col or 'name' in col]
-                    account_cols = [col for col in transaction_data.keys() if 'account' in col]
-                    
-                    if customer_cols:
-                        transaction_text = f"KYC Review for {transaction_data.get(customer_cols[0], 'Unknown Customer')}"
-                    elif account_cols:
-                        transaction_text = f"KYC Review for Account {transaction_data.get(account_cols[0], 'Unknown Account')}"
-                    else:
-                        transaction_text = f"KYC Compliance Review - Row {idx + 1}"
-                else:
-                    # For non-KYC datasets, try to use any available column
-                    description_col = next(iter(transaction_data.keys())) if transaction_data else None
-                    transaction_text = str(transaction_data.get(description_col, '')).strip() if description_col else ''
-                
-                if not transaction_text or transaction_text.lower() in ['nan', 'none', '']:
-                    if not is_kyc_dataset:
-                        logging.warning(f"⚠️  Skipping row {idx + 1}: No description found")
-                        continue
-                    else:
-                        transaction_text = f"KYC Compliance Review - Row {idx + 1}"
-                
-                logging.info(f"🔍 Analyzing transaction {idx + 1}/{total_rows}: {transaction_text[:100]}...")
-                
-                # Add index as transaction_id if not present
-                if 'transaction_id' not in transaction_data or not transaction_data['transaction_id']:
-                    transaction_data['transaction_id'] = f"TXN_{idx + 1}"
-                
-                # First, apply all rule-based checks
-                matched_rules = []
-                violation_details = []
-                
-                # Get the compliance rules from the database
-                compliance_rules = get_compliance_rules()
-                
-                # Define additional compliance rules
-                additional_rules = [
-                    # High-value transaction rule
-                    {
-                        'id': 'high_value_transaction',
-                        'name': 'High Value Transaction',
-                        'description': 'Transaction exceeds threshold',
-                        'risk': 'HIGH',
-                        'condition': "isinstance(t.get('amount', 0), (int, float)) and float(t.get('amount', 0)) > 900000"
-                    },
-                    # Suspicious transaction patterns
-                    {
-                        'id': 'suspicious_transaction_pattern',
-                        'name': 'Suspicious Transaction Pattern',
-                        'description': 'Transaction matches known suspicious patterns',
-                        'risk': 'HIGH',
-                        'condition': "any(term in str(t.get('description', '')).lower() for term in ['urgent', 'immediate', 'crypto', 'bitcoin', 'forex', 'gambling'])"
-                    },
-                    # Non-KYC transaction
-                    {
-                        'id': 'non_kyc_transaction',
-                        'name': 'Non-KYC Transaction',
-                        'description': 'Transaction from an account with incomplete or expired KYC',
-                        'risk': 'HIGH',
-                        'condition': "str(t.get('sender_kyc_status', '')).lower() in ['incomplete', 'expired', 'pending', 'rejected']"
-                    },
-                    # Unusual transaction time
-                    {
-                        'id': 'unusual_transaction_time',
-                        'name': 'Unusual Transaction Time',
-                        'description': 'Transaction occurred during non-business hours',
-                        'risk': 'MEDIUM',
-                        'condition': "'time' in t and t['time'] and isinstance(t['time'], str) and ':' in t['time'] and int(t['time'].split(':')[0]) not in range(9, 18)"
-                    },
-                    # High-risk transaction type
-                    {
-                        'id': 'high_risk_transaction_type',
-                        'name': 'High-Risk Transaction Type',
-                        'description': 'Transaction type is considered high-risk',
-                        'risk': 'HIGH',
-                        'condition': "str(t.get('transaction_type', '')).lower() in ['offshore', 'crypto', 'forex', 'gambling']"
-                    }
-                ]
-                
-                # Add additional rules to compliance_rules
-                compliance_rules.extend(additional_rules)
-                
-                # Log the rules being used
-                logging.debug(f"\n{'='*50}\nActive Compliance Rules:\n" + 
-                             '\n'.join([f"- {r['name']} (Risk: {r.get('risk', 'MEDIUM')}): {r['description']}" 
-                                      for r in compliance_rules]) + 
-                             f"\n{'='*50}")
-                
-                # First, normalize all transaction data keys to lowercase for consistent access
-                normalized_transaction = {str(k).lower(): v for k, v in transaction_data.items()}
-                
-                # Log the normalized transaction data for debugging
-                logging.debug(f"\n{'='*50}\nProcessing transaction {idx + 1} with data:\n{json.dumps(normalized_transaction, indent=2, default=str)}\n{'='*50}")
-                
-                # Add a debug log for the high-value transaction check
-                amount = float(normalized_transaction.get('amount', 0))
-                logging.debug(f"Checking high-value transaction: Amount = {amount}, Type = {type(amount).__name__}")
-                
-                # Compile the condition strings into callable functions
-                for rule in compliance_rules:
-                    if 'condition' in rule and isinstance(rule['condition'], str):
-                        try:
-                            # Replace field names in condition to use lowercase
-                            condition = rule['condition']
-                            # Handle common field name variations
-                            condition = condition.replace('Amount', 'amount')
-                            condition = condition.replace('Transaction_Type', 'transaction_type')
-                            condition = condition.replace('Sender_KYC_Status', 'sender_kyc_status')
-                            # Safely evaluate the condition string into a function
-                            rule['condition'] = eval(f"lambda t: {condition}")
-                        except Exception as e:
-                            logging.error(f"Error compiling condition for rule {rule.get('id', 'unknown')}: {str(e)}")
-                            # If there's an error, make the condition always return False
-                            rule['condition'] = lambda t: False
-                
-                # Check each rule against the transaction
-                for rule in compliance_rules:
-                    try:
-                        # Skip KYC-related rules if KYC status is empty
-                        rule_name = rule.get('name', '')
-                        if rule_name and 'kyc' in rule_name.lower() and not normalized_transaction.get('sender_kyc_status'):
-                            logging.debug(f"Skipping {rule.get('name')} - KYC status is empty")
-                            continue
-                            
-                        # Log the rule being checked and its condition for debugging
-                        rule_name = rule.get('name', 'Unnamed Rule')
-                        condition = rule.get('condition', 'No condition')
-                        logging.debug(f"\n{'='*30}\nChecking rule: {rule_name}\nCondition: {condition}")
-                        
-                        # Log the specific values being checked
-                        if 'amount' in str(condition):
-                            logging.debug(f"Amount check - Value: {normalized_transaction.get('amount', 'N/A')}, Type: {type(normalized_transaction.get('amount')).__name__}")
-                        if 'transaction_type' in str(condition):
-                            logging.debug(f"Transaction Type: {normalized_transaction.get('transaction_type', 'N/A')}")
-                        if 'sender_kyc_status' in str(condition):
-                            logging.debug(f"Sender KYC Status: '{normalized_transaction.get('sender_kyc_status', 'N/A')}'")
-                        
-                        # Apply the condition to the normalized transaction data
-                        try:
-                            condition_func = rule['condition']
-                            if not callable(condition_func):
-                                logging.warning(f"Rule '{rule_name}' condition is not callable")
-                                continue
-                                
-                            if condition_func(normalized_transaction):
-                                matched_rules.append(rule['name'])
-                                risk_level = rule.get('risk_level', rule.get('risk', 'MEDIUM'))
-                                
-                                # Only include valid violations (non-empty KYC status for KYC rules)
-                                if 'kyc' in rule.get('name', '').lower() and not normalized_transaction.get('sender_kyc_status'):
-                                    logging.debug(f"Skipping violation addition for {rule['name']} - Empty KYC status")
-                                    continue
-                                    
-                                violation_details.append({
-                                    'violation_type': rule['name'],
-                                    'legal_provision': 'RBI Master Direction',
-                                    'circular': 'RBI/2022-23/123',
-                                    'penalty_min': 10000 if risk_level in ['HIGH', 'CRITICAL'] else 5000,
-                                    'penalty_max': 100000 if risk_level in ['HIGH', 'CRITICAL'] else 50000,
-                                    'reason': f"{rule.get('description', '')} - {risk_level} risk"
-                                })
-                                
-                                # Log the successful rule match
-                                logging.info(f"✅ Rule matched for transaction {idx + 1}: {rule_name} (Risk: {risk_level})")
-                                if violation_details:  # Only log if we have details to show
-                                    logging.debug(f"Violation details: {violation_details[-1]}")
-                                    
-                        except Exception as e:
-                            logging.error(f"Error applying rule {rule.get('name', 'unknown')}: {str(e)}")
-                            logging.error(f"Rule details: {rule}")
-                            logging.error(f"Transaction data: {normalized_transaction}")
-                            continue
-                            
-                    except Exception as e:
-                        logging.error(f"Error processing rule {rule.get('name', 'unknown')}: {str(e)}")
-                        continue
-                            
-                # Process based on whether we found any rule matches
-                if matched_rules:
-                    # Get the highest risk level from matched rules
-                    logging.info(f"⚠️  Rule violations found for transaction {idx + 1}: Found {len(matched_rules)} rule violation(s): {', '.join(matched_rules)}")
-                    matched_rule_objects = [r for r in compliance_rules if r['name'] in matched_rules]
-                    risk_level = max((rule['risk'] for rule in matched_rule_objects),
-                                  key=lambda x: ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL'].index(x))
-                    
-                    analysis_result = {
-                        'matched_rules': matched_rules,
-                        'explanation': f"Found {len(matched_rules)} rule violation(s): {', '.join(matched_rules)}",
-                        'risk_level': risk_level,
-                        'violation_details': violation_details,
-                        'matched_rule_details': [
-                            {
-                                'rule_id': rule['id'],
-                                'rule_name': rule['name'],
-                                'description': rule['description'],
-                                'risk': rule['risk']
-                            } for rule in matched_rule_objects
-                        ]
-                    }
-                    logging.info(f"⚠️  Rule violations found for transaction {idx + 1}: {analysis_result['explanation']}")
-                
-                # Build transaction record with all fields
-                transaction_record = {
-                    # Standard fields
-                    'transaction_id': str(transaction_data.get('transaction_id', '')).strip() or f"TXN_{idx + 1}",
-                    'date': str(transaction_data.get('date', '')).strip() or '',
-                    'time': str(transaction_data.get('time', '')).strip() or '',
-                    'timestamp': str(transaction_data.get('timestamp', '')).strip() or '',
-                    
-                    # Sender information
-                    'sender': str(transaction_data.get('sender_name', transaction_data.get('sender', ''))).strip(),
-                    'sender_name': str(transaction_data.get('sender_name', '')).strip() or '',
-                    'sender_account': str(transaction_data.get('sender_account', '')).strip() or '',
-                    'sender_kyc_status': str(transaction_data.get('sender_kyc_status', '')).strip() or '',
-                    
-                    # Receiver information
-                    'receiver': str(transaction_data.get('receiver_name', transaction_data.get('receiver', ''))).strip(),
-                    'receiver_name': str(transaction_data.get('receiver_name', '')).strip() or '',
-                    'receiver_account': str(transaction_data.get('receiver_account', '')).strip() or '',
-                    
-                    # Transaction details
-                    'amount': transaction_data.get('amount', ''),
-                    'transaction_type': str(transaction_data.get('transaction_type', '')).strip() or '',
-                    'transaction_mode': str(transaction_data.get('transaction_mode', '')).strip() or '',
-                    'description': transaction_text,
-                    'balance': transaction_data.get('balance', ''),
-                    'balance_after': transaction_data.get('balance_after', ''),
-                    'currency': str(transaction_data.get('currency', 'INR')).strip(),
-                    'channel': str(transaction_data.get('channel', '')).strip() or '',
-                    'reference_number': str(transaction_data.get('reference_number', '')).strip() or '',
-                    'location': str(transaction_data.get('location', '')).strip() or '',
-                    'branch_code': str(transaction_data.get('branch_code', '')).strip() or '',
-                    'branch_location': str(transaction_data.get('branch_location', '')).strip() or '',
-                    
-                    # Violation information
-                    'has_violation': bool(matched_rules) or (analysis_result.get('matched_rules', ['No Violation'])[0] != 'No Violation'),
-                    'violation_type': ', '.join(matched_rules or analysis_result.get('matched_rules', [])),
-                    'violation_details': violation_details or [{
-                        'violation_type': ', '.join(analysis_result.get('matched_rules', [])),
-                        'legal_provision': 'RBI Master Direction',
-                        'circular': 'RBI/2022-23/123',
-                        'penalty_min': None,
-                        'penalty_max': None,
-                        'reason': analysis_result.get('explanation', '')
-                    }],
-                    
-                    # Rule matching information
-                    'matched_rules': [
-                        {
-                            'rule_id': rule['id'],
-                            'rule_name': rule['name'],
-                            'description': rule['description'],
-                            'risk': rule['risk']
-                        } for rule in compliance_rules if rule['name'] in matched_rules
-                    ] if matched_rules else [],
-                    
-                    # AI analysis results
-                    'ai_analysis': analysis_result if not matched_rules else None,
-                    'risk_level': analysis_result.get('risk_level', 'LOW'),
-                    
-                    # Include all original data for reference
-                    'raw_data': {k: str(v) for k, v in transaction_data.items() if v is not None and str(v).strip() != ''}
-                }
-                
-                transactions.append(transaction_record)
-                
-                # Add a small delay between transactions to avoid rate limiting
-                time.sleep(1)  # 1 second delay between transactions
-                    
-            except Exception as e:
-                error_msg = str(e)
-                logging.error(f"Error analyzing transaction {idx + 1}: {error_msg}")
-                
-                # Add the transaction with error details
-                transactions.append({
-                    'transaction_id': str(transaction_data.get('transaction_id', f"TXN_{idx + 1}")),
-                    'date': str(transaction_data.get('date', '')),
-                    'sender': str(transaction_data.get('sender_name', transaction_data.get('sender', ''))),
-                    'sender_account': str(transaction_data.get('sender_account', '')),
-                    'receiver': str(transaction_data.get('receiver_name', transaction_data.get('receiver', ''))),
-                    'receiver_account': str(transaction_data.get('receiver_account', '')),
-                    'amount': transaction_data.get('amount', ''),
-                    'transaction_type': str(transaction_data.get('transaction_type', '')),
-                    'description': transaction_text,
-                    'balance': transaction_data.get('balance', ''),
-                    'has_violation': True,
-                    'violation_type': 'Processing Error',
-                    'violation_details': [{
-                        'violation_type': 'Processing Error',
-                        'legal_provision': 'N/A',
-                        'circular': 'N/A',
-                        'penalty_min': None,
-                        'penalty_max': None,
-                        'reason': f'Error during analysis: {error_msg}'
-                    }],
-                    'ai_analysis': {
-                        'transaction': transaction_text,
-                        'matched_rules': ['Processing Error'],
-                        'explanation': f'Error during analysis: {error_msg}'
-                    }
-                })
-                continue
-        
-        # Count violations
-        violations_found = len([t for t in transactions if t.get('has_violation', False)])
-        
-        response = {
-            'success': True,
-            'transactions': transactions,
-            'kyc_violations': [],  # Empty for compatibility with existing UI
-            'total_transactions': total_rows,
-            'violation_transactions': violations_found,
-            'total_accounts': len({t.get('sender_account') for t in transactions if t.get('sender_account')}),
-            'matched_accounts': violations_found,
-            'customers_with_violations': len({t.get('sender_account') for t in transactions if t.get('has_violation', False)})
-        }
-        
-        logging.info(f"Successfully analyzed {len(transactions)} transactions, found {violations_found} violations")
-        return _clean_for_json(response)
+        logging.info(f"Successfully analyzed {len(result['transactions'])} transactions, "
+                     f"found {result['violation_transactions']} violations")
+        return _clean_for_json(result)
         
     except Exception as e:
         logging.exception('Error processing Excel file')
         return {'error': f'Error processing Excel file: {str(e)}'}
 
+
+def _save_temp_fines(upload_folder: str, filename: str, result: Dict[str, Any]) -> None:
+    """Save a temp copy of fines for an upload in uploads/temp_fines as "fine N"."""
+    temp_dir = os.path.join(upload_folder, 'temp_fines')
+    os.makedirs(temp_dir, exist_ok=True)
+    # Determine next index
+    existing = [f for f in os.listdir(temp_dir) if f.lower().startswith('fine ') and (f.endswith('.json') or f.endswith('.md'))]
+    indices = []
+    for name in existing:
+        try:
+            num = int(name.split(' ')[1].split('.')[0])
+            indices.append(num)
+        except Exception:
+            pass
+    next_idx = (max(indices) + 1) if indices else 1
+    base_name = f"fine {next_idx}"
+
+    # Build compact fines list from transactions with violations
+    fines_items = []
+    for tx in result.get('transactions', []):
+        if not tx or not tx.get('has_violation'):
+            continue
+        for d in tx.get('violation_details', []) or []:
+            pen_min = d.get('penalty_min') or 0
+            pen_max = d.get('penalty_max') or 0
+            penalty_range = ''
+            try:
+                if pen_min or pen_max:
+                    penalty_range = f"₹{int(pen_min):,} – ₹{int(pen_max):,}".replace(',', ',')
+            except Exception:
+                penalty_range = ''
+            fines_items.append({
+                'circular': d.get('circular') or 'N/A',
+                'violation': d.get('violation_type') or 'Violation',
+                'penalty_range': penalty_range,
+                'amount': float(pen_max or pen_min or tx.get('amount') or 0),
+                'legal_provision': d.get('legal_provision') or 'N/A',
+                'reason': d.get('reason') or '',
+                'source_file': filename,
+            })
+
+    # Write JSON
+    json_path = os.path.join(temp_dir, base_name + '.json')
+    with open(json_path, 'w', encoding='utf-8') as jf:
+        jf.write(json.dumps({'created_from': filename, 'items': fines_items}, ensure_ascii=False, indent=2))
+
+    # Also write/update a canonical recent_fines.json for easy access
+    try:
+        recent_json_path = os.path.join(temp_dir, 'recent_fines.json')
+        payload = {
+            'created_from': filename,
+            'label': base_name,
+            'items': fines_items
+        }
+        with open(recent_json_path, 'w', encoding='utf-8') as rjf:
+            rjf.write(json.dumps(payload, ensure_ascii=False, indent=2))
+    except Exception as rerr:
+        logging.warning(f"Could not write recent_fines.json: {rerr}")
+
+    # Write simple markdown summary
+    md_lines = [
+        f"# {base_name}",
+        "",
+        f"Source: {filename}",
+        "",
+    ]
+    for it in fines_items[:50]:
+        md_lines.append(f"- **Violation**: {it['violation']} | **Penalty**: {it.get('penalty_range') or 'N/A'} | **Law**: {it.get('legal_provision')} | **Reason**: {it.get('reason')}")
+    md_path = os.path.join(temp_dir, base_name + '.md')
+    with open(md_path, 'w', encoding='utf-8') as mf:
+        mf.write("\n".join(md_lines))
+
+
+def _excel_result_kind() -> str:
+    """Cache key prefix for Excel analyses.
+    
+    Results differ by rule set, Gemini review, the graph they were enriched
+    from and the deposit limit window, so a graph write made by this process
+    or a settings change starts a new key.
+    """
+    variant = (f"{get_rule_registry().get().version}|{llm_review_enabled()}|{graph_write_generation()}"
+               f"|{os.getenv('DEPOSIT_LIMIT_WINDOW', MONTH)}")
+    return f"excel-{hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _excel_result_ttl() -> float:
+    """Seconds a cached Excel analysis is reused; bounds staleness from graph writes made elsewhere."""
+    return float(os.getenv('EXCEL_RESULT_TTL', 3600))
+
+
+def _excel_summary_kind(result_kind: str) -> str:
+    return f"{result_kind}-summary"
+
+
+def _excel_results_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'transactions': result.get('transactions', []),
+        'kyc_violations': result.get('kyc_violations', []),
+        'summary': {
+            'total_transactions': result.get('total_transactions', 0),
+            'violation_transactions': result.get('violation_transactions', 0),
+            'total_accounts': result.get('total_accounts', 0),
+            'matched_accounts': result.get('matched_accounts', 0),
+            'customers_with_violations': result.get('customers_with_violations', 0)
+        }
+    }
+
+
+def _save_excel_result(store, result_kind: str, content_hash: Optional[str], result: Dict[str, Any]) -> None:
+    """Cache an analysis, and its summary counts on their own for /api/excel/summary."""
+    store.save_result(result_kind, content_hash, result)
+    store.save_result(_excel_summary_kind(result_kind), content_hash, _excel_results_payload(result)['summary'])
+
+
+def _excel_job_completion(upload_folder: str, filename: str, store, result_kind: str,
+                          content_hash: Optional[str]) -> Callable:
+    """Completion handler for background analyses: save temp fines and cache the result."""
+    def _on_complete(job, result):
+        if 'error' not in result:
+            _save_temp_fines(upload_folder, filename, result)
+            # Later synchronous requests for the same content reuse it
+            _save_excel_result(store, result_kind, content_hash, _clean_for_json(result))
+    return _on_complete
+
+
+def _process_param(payload: Dict[str, Any], name: str) -> Any:
+    """An /api/excel/process option from the JSON body, else from the query string."""
+    value = payload.get(name)
+    return request.args.get(name) if value is None else value
+
+
+# Transactions per NDJSON write when streaming a cached analysis
+NDJSON_BATCH = 1000
+
+
+def _excel_ndjson(payload: Dict[str, Any], filepath: str, filename: str, store, result_kind: str,
+                  content_hash: Optional[str], result: Optional[Dict[str, Any]],
+                  fields: Optional[List[str]], offset: int):
+    """Stream transactions as NDJSON, one per line, then a ``{"summary": ...}`` line.
+    
+    A cached analysis is streamed straight away. Otherwise the file is analysed
+    by a background job and each chunk's records are written as soon as the
+    chunk finishes; a failed analysis ends the stream with an ``{"error": ...}``
+    line instead of the summary.
+    """
+    if result is not None:
+        def _cached_batches():
+            transactions = result.get('transactions', [])
+            for start in range(offset, len(transactions), NDJSON_BATCH):
+                yield project(transactions[start:start + NDJSON_BATCH], fields)
+            yield [{'summary': _excel_results_payload(result)['summary']}]
+        return ndjson_response(_cached_batches(), plain=True)
+    
+    reviewer, error = _excel_reviewer()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    job = get_excel_jobs().submit(ExcelAnalysisJob(
+        filepath,
+        chunk_size=payload.get('chunk_size'),
+        workers=payload.get('workers'),
+        reviewer=reviewer,
+        on_complete=_excel_job_completion(current_app.config['UPLOAD_FOLDER'], filename, store,
+                                          result_kind, content_hash),
+    ))
+    
+    def _job_batches():
+        position = offset
+        while True:
+            job.wait(position, timeout=1.0)
+            batch = job.transactions(position)
+            if batch:
+                position += len(batch)
+                yield project(batch, fields)
+            elif job.finished:
+                break
+        final = job.result or {}
+        if 'error' in final:
+            yield [{'error': final['error']}]
+        else:
+            yield [{'summary': _excel_results_payload(final)['summary']}]
+    
+    response = ndjson_response(_job_batches())
+    # The job keeps running (and caches its result) if the client disconnects
+    response.headers['X-Job-Id'] = job.id
+    return response
+
+
 @bp.route('/api/excel/process', methods=['POST'])
 def api_excel_process():
+    """Analyse an uploaded workbook against the compliance rules.
+    
+    Options, in the JSON body or the query string:
+    
+    - ``async``: run in the background and return a job id (see /api/excel/jobs/<job_id>)
+    - ``limit`` / ``cursor``: return one page of transactions plus a ``page``
+      block whose ``next_cursor`` fetches the next one
+    - ``fields``: list or comma-separated names; transactions keep only these keys
+    - ``format``: ``ndjson`` streams one transaction per line instead
+    """
     payload = request.get_json(silent=True) or {}
     filename = payload.get('filename')
     logging.info(f'Received Excel process request for filename: {filename}')
@@ -2009,103 +1482,148 @@ def api_excel_process():
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
     
-    # Use the new Excel processing function
-    result = _process_excel_file(filepath)
+    upload_folder = current_app.config['UPLOAD_FOLDER']
     
-    if 'error' in result:
+    if payload.get('async'):
+        # Run in the background; progress and partial results via /api/excel/jobs/<job_id>
+        reviewer, error = _excel_reviewer()
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        store = get_upload_store(upload_folder)
+        job = get_excel_jobs().submit(ExcelAnalysisJob(
+            filepath,
+            chunk_size=payload.get('chunk_size'),
+            workers=payload.get('workers'),
+            reviewer=reviewer,
+            on_complete=_excel_job_completion(upload_folder, filename, store, _excel_result_kind(),
+                                              store.digest_for(filename)),
+        ))
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': url_for('main.api_excel_job', job_id=job.id)
+        }), 202
+    
+    output = str(_process_param(payload, 'format') or 'json').lower()
+    cursor = _process_param(payload, 'cursor')
+    paged = bool(cursor) or _process_param(payload, 'limit') not in (None, '')
+    offset = 0
+    try:
+        fields = parse_fields(_process_param(payload, 'fields'))
+        limit = page_size(_process_param(payload, 'limit')) if paged else None
+        if cursor:
+            # Later pages keep the page size and fields the cursor was issued with unless given again
+            cursor_hash, cursor_kind, offset, cursor_limit, cursor_fields = decode_cursor(str(cursor))
+            if _process_param(payload, 'limit') in (None, ''):
+                limit = cursor_limit
+            if fields is None:
+                fields = cursor_fields
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if output not in ('json', 'ndjson'):
+        return jsonify({'success': False, 'error': f'Unsupported format: {output}'}), 400
+    
+    # Reuse the analysis of identical content uploaded before, under any name
+    store = get_upload_store(upload_folder)
+    content_hash = store.digest_for(filename)
+    result_kind = _excel_result_kind()
+    if cursor and (cursor_hash, cursor_kind) != (content_hash, result_kind):
         return jsonify({
             'success': False,
-            'error': result['error']
-        }), 400
+            'error': 'Cursor is stale: the file or the analysis inputs changed since it was issued. Start again without a cursor.'
+        }), 409
+    result = store.load_result(result_kind, content_hash, max_age=_excel_result_ttl())
+    if result is not None:
+        logging.info(f'Reusing Excel analysis of {content_hash[:12]} for: {filename}')
+    
+    if output == 'ndjson':
+        return _excel_ndjson(payload, filepath, filename, store, result_kind, content_hash, result, fields, offset)
+    
+    if result is None:
+        # Use the new Excel processing function
+        result = _process_excel_file(filepath)
         
-    try:
-        # Save a temp copy of fines for this upload in uploads/temp_fines as "fine N"
+        if 'error' in result:
+            return jsonify({
+                'success': False,
+                'error': result['error']
+            }), 400
+        _save_excel_result(store, result_kind, content_hash, result)
+    
+    if not cursor:
+        # Later pages belong to the same request; fines were saved with the first
         try:
-            temp_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp_fines')
-            os.makedirs(temp_dir, exist_ok=True)
-            # Determine next index
-            existing = [f for f in os.listdir(temp_dir) if f.lower().startswith('fine ') and (f.endswith('.json') or f.endswith('.md'))]
-            indices = []
-            for name in existing:
-                try:
-                    num = int(name.split(' ')[1].split('.')[0])
-                    indices.append(num)
-                except Exception:
-                    pass
-            next_idx = (max(indices) + 1) if indices else 1
-            base_name = f"fine {next_idx}"
-
-            # Build compact fines list from transactions with violations
-            fines_items = []
-            for tx in result.get('transactions', []):
-                if not tx or not tx.get('has_violation'):
-                    continue
-                for d in tx.get('violation_details', []) or []:
-                    pen_min = d.get('penalty_min') or 0
-                    pen_max = d.get('penalty_max') or 0
-                    penalty_range = ''
-                    try:
-                        if pen_min or pen_max:
-                            penalty_range = f"₹{int(pen_min):,} – ₹{int(pen_max):,}".replace(',', ',')
-                    except Exception:
-                        penalty_range = ''
-                    fines_items.append({
-                        'circular': d.get('circular') or 'N/A',
-                        'violation': d.get('violation_type') or 'Violation',
-                        'penalty_range': penalty_range,
-                        'amount': float(pen_max or pen_min or tx.get('amount') or 0),
-                        'legal_provision': d.get('legal_provision') or 'N/A',
-                        'reason': d.get('reason') or '',
-                        'source_file': filename,
-                    })
-
-            # Write JSON
-            json_path = os.path.join(temp_dir, base_name + '.json')
-            with open(json_path, 'w', encoding='utf-8') as jf:
-                jf.write(json.dumps({'created_from': filename, 'items': fines_items}, ensure_ascii=False, indent=2))
-
-            # Also write/update a canonical recent_fines.json for easy access
-            try:
-                recent_json_path = os.path.join(temp_dir, 'recent_fines.json')
-                payload = {
-                    'created_from': filename,
-                    'label': base_name,
-                    'items': fines_items
-                }
-                with open(recent_json_path, 'w', encoding='utf-8') as rjf:
-                    rjf.write(json.dumps(payload, ensure_ascii=False, indent=2))
-            except Exception as rerr:
-                current_app.logger.warning(f"Could not write recent_fines.json: {rerr}")
-
-            # Write simple markdown summary
-            md_lines = [
-                f"# {base_name}",
-                "",
-                f"Source: {filename}",
-                "",
-            ]
-            for it in fines_items[:50]:
-                md_lines.append(f"- **Violation**: {it['violation']} | **Penalty**: {it.get('penalty_range') or 'N/A'} | **Law**: {it.get('legal_provision')} | **Reason**: {it.get('reason')}")
-            md_path = os.path.join(temp_dir, base_name + '.md')
-            with open(md_path, 'w', encoding='utf-8') as mf:
-                mf.write("\n".join(md_lines))
+            _save_temp_fines(upload_folder, filename, result)
         except Exception as save_err:
             current_app.logger.warning(f"Could not save temp fines set: {save_err}")
 
-        return jsonify({
-            'success': True,
-            'results': {
-                'transactions': result.get('transactions', []),
-                'kyc_violations': result.get('kyc_violations', []),
-                'summary': {
-                    'total_transactions': result.get('total_transactions', 0),
-                    'violation_transactions': result.get('violation_transactions', 0),
-                    'total_accounts': result.get('total_accounts', 0),
-                    'matched_accounts': result.get('matched_accounts', 0),
-                    'customers_with_violations': result.get('customers_with_violations', 0)
-                }
-            },
-            'message': f"Found {result.get('violation_transactions', 0)} violation transactions across {result.get('matched_accounts', 0)} accounts"
-        })
-    finally:
-        pass
\ No newline at end of file
+    results = _excel_results_payload(result)
+    response = {
+        'success': True,
+        'results': results,
+        'message': f"Found {result.get('violation_transactions', 0)} violation transactions across {result.get('matched_accounts', 0)} accounts"
+    }
+    if paged:
+        results['transactions'], response['page'] = page(results['transactions'], offset, limit,
+                                                         content_hash, result_kind, fields)
+    results['transactions'] = project(results['transactions'], fields)
+    # The result is already cleaned, so the body is streamed without another conversion pass
+    return json_response(response, plain=True)
+
+
+@bp.route('/api/excel/summary', methods=['GET'])
+def api_excel_summary():
+    """Summary counts of a file's analysis, without its transactions.
+    
+    Query parameter ``filename`` names the upload. Returns 404 until the file
+    (or identical content under another name) has been processed with the
+    current rules.
+    """
+    filename = request.args.get('filename')
+    if not filename:
+        return jsonify({'error': 'No filename provided'}), 400
+    
+    store = get_upload_store(current_app.config['UPLOAD_FOLDER'])
+    content_hash = store.digest_for(filename)
+    if content_hash is None:
+        return jsonify({'error': 'File not found'}), 404
+    
+    result_kind = _excel_result_kind()
+    summary = store.load_result(_excel_summary_kind(result_kind), content_hash, max_age=_excel_result_ttl())
+    if summary is None:
+        # Analyses cached before their summaries were stored separately
+        result = store.load_result(result_kind, content_hash, max_age=_excel_result_ttl())
+        if result is None:
+            return jsonify({'success': False, 'error': 'File has not been analysed yet'}), 404
+        summary = _excel_results_payload(result)['summary']
+    return jsonify({
+        'success': True,
+        'filename': filename,
+        'content_hash': content_hash,
+        'summary': summary
+    })
+
+
+@bp.route('/api/excel/jobs/<job_id>', methods=['GET'])
+def api_excel_job(job_id):
+    """Progress of a background Excel analysis and the transactions emitted so far.
+    
+    Query parameters ``offset`` and ``limit`` page through the transactions.
+    """
+    job = get_excel_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = max(0, request.args.get('limit', 500, type=int))
+    response = {
+        'success': job.error is None,
+        'progress': job.progress(),
+        'offset': offset,
+        'transactions': job.transactions(offset, limit),
+    }
+    if job.result and 'error' not in job.result:
+        response['summary'] = _excel_results_payload(job.result)['summary']
+    # Transactions are converted for JSON as they are written
+    return json_response(response)
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""
+Generate ``neo4j-admin database import`` CSV files from transaction and KYC inputs.
+
+Used for the initial load of historical data into an empty database, where
+``process_transaction_data``/``process_kyc_data`` would need one transaction
+per row. Inputs are read row by row (CSV via the csv module, Excel through
+``excel_stream``) and written straight to the output files, so memory
+grows with the number of distinct node ids (kept as 8-byte digests for
+deduplication), not with the number of rows.
+
+The nodes and relationships match what the transactional loaders create:
+Account, Transaction, Violation and Person nodes with MADE_TRANSACTION,
+HAS_VIOLATION, VIOLATED_BY and RELATED_TO_VIOLATION relationships. Ids are
+the natural keys (account number, transaction id, ``'P' + account number``);
+rows without a transaction id get an id derived from their content, so
+re-running the export produces the same ids. The first occurrence of a
+duplicated id wins.
+"""
+from __future__ import annotations
+import os
+import csv
+import hashlib
+from datetime import date, datetime
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+import pandas as pd
+
+from .graph import content_fingerprint, KYC_FINGERPRINT_FIELDS
+from .transaction_processor import TRANSACTION_FINGERPRINT_FIELDS
+from .excel_stream import get_sheet_names, iter_sheet_rows
+
+# Header aliases (lower-case) per field, in priority order
+TRANSACTION_ALIASES = {
+    'transaction_id': ['transaction id', 'transaction_id', 'txnid', 'transactionid'],
+    'date': ['date', 'transaction date', 'txn_date'],
+    'sender_account': ['sender account', 'sender_account', 'from account', 'from_account', 'account number',
+                       'account_number'],
+    'sender_name': ['sender name', 'sender_name', 'from name', 'from_name'],
+    'amount': ['amount', 'transaction amount', 'amt'],
+    'transaction_type': ['transaction type', 'transaction_type', 'type', 'txn_type'],
+    'description': ['description', 'desc', 'details', 'transaction details'],
+}
+
+KYC_ALIASES = {
+    'transaction_id': ['transaction id', 'transaction_id', 'txnid', 'transactionid'],
+    'account_number': ['account no', 'account no.', 'account number', 'account_number', 'account', 'acct_no'],
+    'customer_name': ['customer name', 'customer_name', 'sender name', 'sender_name', 'name'],
+    'date': ['date', 'transaction date', 'txn_date', 'value date'],
+    'kyc_verified': ['kyc verified', 'kyc_verified', 'kyc status', 'kyc_status', 'kyc'],
+    'violation_type': ['customer violation', 'violation type', 'violation_type', 'rule invoked', 'rule_invoked',
+                       'violation'],
+}
+
+REQUIRED_FIELDS = {
+    'transaction': ('sender_account', 'amount'),
+    'kyc': ('account_number', 'violation_type'),
+}
+
+# file name -> header row, in neo4j-admin's header syntax
+NODE_FILES = {
+    'Account': ('accounts.csv', ['number:ID(Account)', 'name', 'kyc_verified', ':LABEL']),
+    'Transaction': ('transactions.csv', ['transaction_id:ID(Transaction)', 'amount:double', 'date:date',
+                                         'description', 'type', 'fingerprint', ':LABEL']),
+    'Violation': ('violations.csv', ['id:ID(Violation)', 'type', 'date:date', 'status', 'fingerprint', ':LABEL']),
+    'Person': ('persons.csv', ['id:ID(Person)', 'name', ':LABEL']),
+}
+
+RELATIONSHIP_FILES = {
+    'MADE_TRANSACTION': ('made_transaction.csv', [':START_ID(Account)', ':END_ID(Transaction)', ':TYPE']),
+    'HAS_VIOLATION': ('has_violation.csv', [':START_ID(Account)', ':END_ID(Violation)', 'detected_date:date', ':TYPE']),
+    'VIOLATED_BY': ('violated_by.csv', [':START_ID(Violation)', ':END_ID(Person)', ':TYPE']),
+    'RELATED_TO_VIOLATION': ('related_to_violation.csv', [':START_ID(Transaction)', ':END_ID(Violation)',
+                                                          'matched_by', ':TYPE']),
+}
+
+
+def resolve_headers(headers: List[Any], aliases: Dict[str, List[str]]) -> Dict[str, int]:
+    """Map each field to the index of the first header matching one of its aliases."""
+    normalized = {}
+    for idx, header in enumerate(headers):
+        if header is not None:
+            normalized.setdefault(str(header).strip().lower(), idx)
+    resolved = {}
+    for field, names in aliases.items():
+        for name in names:
+            if name in normalized:
+                resolved[field] = normalized[name]
+                break
+    return resolved
+
+
+def iter_table_rows(path: str) -> Iterator[Tuple[str, List[Any], Iterator[List[Any]]]]:
+    """Yield ``(sheet_name, headers, rows)`` for every table in a CSV or Excel file.
+
+    Rows are produced lazily; Excel sheets are read through ``excel_stream``.
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            headers = next(reader, [])
+            yield os.path.basename(path), headers, reader
+        return
+    for sheet_name in get_sheet_names(path):
+        for headers, rows in iter_sheet_rows(path, sheet_name):
+            yield sheet_name, headers, (list(row) for row in rows)
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and pd.isna(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def _iso_date(value: Any) -> Optional[str]:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()[:10]
+    text = _text(value)
+    if not text:
+        return None
+    parsed = pd.to_datetime(text, errors='coerce')
+    return None if pd.isna(parsed) else parsed.date().isoformat()
+
+
+def _amount(value: Any) -> float:
+    text = _text(value)
+    if not text:
+        return 0.0
+    try:
+        return float(text.replace(',', '').replace('₹', '').replace('$', '').strip() or '0')
+    except ValueError:
+        return 0.0
+
+
+def _digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+
+
+class BulkImportWriter:
+    """Streams normalised rows into neo4j-admin import CSV files."""
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self._files = {}
+        self._writers = {}
+        for name, (filename, header) in {**NODE_FILES, **RELATIONSHIP_FILES}.items():
+            f = open(os.path.join(out_dir, filename), 'w', newline='', encoding='utf-8')
+            writer = csv.writer(f)
+            writer.writerow(header)
+            self._files[name] = f
+            self._writers[name] = writer
+        self._seen: Dict[str, set] = {name: set() for name in ('Account', 'Transaction', 'Violation', 'Person',
+                                                               'HAS_VIOLATION')}
+        # account -> [(violation id, date)] for linking transactions; sized by the KYC input
+        self._account_violations: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self.counts: Dict[str, int] = {name: 0 for name in self._writers}
+        self.duplicates = 0
+
+    def _first(self, kind: str, key: str) -> bool:
+        digest = _digest(key)
+        if digest in self._seen[kind]:
+            self.duplicates += 1
+            return False
+        self._seen[kind].add(digest)
+        return True
+
+    def _write(self, name: str, row: List[Any]) -> None:
+        self._writers[name].writerow(row)
+        self.counts[name] += 1
+
+    def _account(self, number: str, name: Optional[str] = None, kyc_verified: Optional[str] = None) -> None:
+        if self._first('Account', number):
+            self._write('Account', [number, name or '', kyc_verified or '', 'Account'])
+
+    def add_kyc(self, row: Dict[str, Any]) -> None:
+        account = _text(row.get('account_number'))
+        violation_type = _text(row.get('violation_type'))
+        if not account or not violation_type:
+            return
+        record = {
+            'account_number': account,
+            'customer_name': _text(row.get('customer_name')),
+            'kyc_verified': _text(row.get('kyc_verified')) or 'No',
+            'transaction_id': _text(row.get('transaction_id')),
+            'violation_type': violation_type,
+            'date': _iso_date(row.get('date')),
+        }
+        if not record['transaction_id']:
+            record['transaction_id'] = 'KYC-' + content_fingerprint(
+                record, ('account_number', 'violation_type', 'date'))[:16]
+        violation_id = record['transaction_id']
+
+        self._account(account, record['customer_name'], record['kyc_verified'])
+        new_violation = self._first('Violation', violation_id)
+        if new_violation:
+            self._write('Violation', [violation_id, violation_type, record['date'] or '', 'ACTIVE',
+                                      content_fingerprint(record, KYC_FINGERPRINT_FIELDS), 'Violation'])
+        if self._first('HAS_VIOLATION', f"{account}|{violation_id}"):
+            self._write('HAS_VIOLATION', [account, violation_id, record['date'] or '', 'HAS_VIOLATION'])
+            self._account_violations.setdefault(account, []).append((violation_id, record['date']))
+        if record['customer_name']:
+            person_id = f"P{account}"
+            if self._first('Person', person_id):
+                self._write('Person', [person_id, record['customer_name'], 'Person'])
+            if new_violation:
+                self._write('VIOLATED_BY', [violation_id, person_id, 'VIOLATED_BY'])
+
+    def add_transaction(self, row: Dict[str, Any]) -> None:
+        account = _text(row.get('sender_account'))
+        if not account:
+            return
+        params = {
+            'transaction_id': _text(row.get('transaction_id')),
+            'account_number': account,
+            'amount': _amount(row.get('amount')),
+            'date': _iso_date(row.get('date')),
+            'description': _text(row.get('description')) or '',
+            'transaction_type': _text(row.get('transaction_type')) or 'UNKNOWN',
+        }
+        if not params['transaction_id']:
+            params['transaction_id'] = 'TX-' + content_fingerprint(params, TRANSACTION_FINGERPRINT_FIELDS)[:16]
+        tx_id = params['transaction_id']
+        if not self._first('Transaction', tx_id):
+            return
+
+        self._account(account, _text(row.get('sender_name')))
+        self._write('Transaction', [tx_id, params['amount'], params['date'] or '', params['description'],
+                                    params['transaction_type'],
+                                    content_fingerprint(params, TRANSACTION_FINGERPRINT_FIELDS), 'Transaction'])
+        self._write('MADE_TRANSACTION', [account, tx_id, 'MADE_TRANSACTION'])
+        # Same rule as _process_single_transaction: active violations dated on or before the transaction
+        for violation_id, violation_date in self._account_violations.get(account, ()):
+            if violation_date is None or (params['date'] is not None and params['date'] >= violation_date):
+                self._write('RELATED_TO_VIOLATION', [tx_id, violation_id, 'SYSTEM', 'RELATED_TO_VIOLATION'])
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+    def import_command(self, database: str = 'neo4j') -> str:
+        """The neo4j-admin command line that loads the generated files."""
+        args = [f"--nodes={label}={os.path.join(self.out_dir, filename)}"
+                for label, (filename, _) in NODE_FILES.items()]
+        args += [f"--relationships={rel_type}={os.path.join(self.out_dir, filename)}"
+                 for rel_type, (filename, _) in RELATIONSHIP_FILES.items()]
+        return ' '.join(['neo4j-admin database import full', *args, '--multiline-fields=true', database])
+
+
+def generate_import_files(out_dir: str, kyc_paths: List[str], transaction_paths: List[str]) -> BulkImportWriter:
+    """Convert KYC and transaction files into neo4j-admin import CSVs.
+
+    KYC inputs are read first so transactions can be linked to the
+    violations of their account. In Excel workbooks every sheet whose headers
+    provide the required fields for that input kind is used.
+
+    Args:
+        out_dir: Directory for the generated CSV files
+        kyc_paths: CSV/Excel files with KYC violation rows
+        transaction_paths: CSV/Excel files with transaction rows
+
+    Returns:
+        The closed writer, with per-file row counts in ``counts``
+    """
+    writer = BulkImportWriter(out_dir)
+    try:
+        for kind, paths, aliases, add in (('kyc', kyc_paths, KYC_ALIASES, writer.add_kyc),
+                                          ('transaction', transaction_paths, TRANSACTION_ALIASES,
+                                           writer.add_transaction)):
+            for path in paths:
+                for sheet_name, headers, rows in iter_table_rows(path):
+                    columns = resolve_headers(headers, aliases)
+                    if not all(field in columns for field in REQUIRED_FIELDS[kind]):
+                        continue
+                    for values in rows:
+                        add({field: values[idx] if idx < len(values) else None
+                             for field, idx in columns.items()})
+    finally:
+        writer.close()
+    return writer
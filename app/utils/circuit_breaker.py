@@ -0,0 +1,132 @@
+"""
+Circuit breaker for the Neo4j connection.
+
+``run_query`` reports every query outcome here, and ``execute_write``
+reports failures to open a write transaction. After ``threshold``
+consecutive connectivity failures the breaker opens: new ``Neo4jClient``
+instances come up disabled, so callers take their existing "database not
+available" fallbacks immediately instead of waiting on connection timeouts.
+While open, a background thread probes the database every
+``probe_interval`` seconds and closes the breaker once it answers again.
+"""
+from __future__ import annotations
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Callable
+
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+# Errors that mean the database is unreachable, as opposed to a bad query
+CONNECTIVITY_ERRORS = (ServiceUnavailable, SessionExpired)
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a background recovery probe."""
+
+    def __init__(self, name: str, threshold: int = 5, probe_interval: float = 5.0,
+                 probe: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.probe_interval = probe_interval
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._trips = 0
+        self._probe_thread: Optional[threading.Thread] = None
+
+    def set_probe(self, probe: Callable[[], None]) -> None:
+        """Set the callable used to test recovery; it should raise while the service is down."""
+        self._probe = probe
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """False while the breaker is open."""
+        return self._state == CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count a failure; only connectivity errors move the breaker."""
+        if not isinstance(error, CONNECTIVITY_ERRORS) or getattr(error, '_breaker_counted', False):
+            return
+        try:
+            # An error re-raised through several reporting layers counts once
+            error._breaker_counted = True
+        except AttributeError:
+            pass
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error)
+            if self._state == OPEN or self._failures < self.threshold:
+                return
+            self._state = OPEN
+            self._opened_at = time.time()
+            self._trips += 1
+        logging.error(f"{self.name} circuit breaker opened after {self.threshold} consecutive failures: {error}")
+        self._start_probe()
+
+    def reset(self) -> None:
+        with self._lock:
+            was_open = self._state == OPEN
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+        if was_open:
+            logging.info(f"{self.name} circuit breaker closed; connection recovered")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'threshold': self.threshold,
+                'opened_at': self._opened_at,
+                'trips': self._trips,
+                'last_error': self._last_error,
+            }
+
+    def _start_probe(self) -> None:
+        if self._probe is None:
+            return
+        with self._lock:
+            if self._probe_thread and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(target=self._probe_loop, name=f'{self.name}-breaker-probe',
+                                                  daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while self._state == OPEN:
+            time.sleep(self.probe_interval)
+            try:
+                self._probe()
+            except Exception as e:
+                with self._lock:
+                    self._last_error = str(e)
+                continue
+            self.reset()
+
+
+_neo4j_breaker = CircuitBreaker(
+    'neo4j',
+    threshold=int(os.getenv('NEO4J_BREAKER_THRESHOLD', 5)),
+    probe_interval=float(os.getenv('NEO4J_BREAKER_PROBE_INTERVAL', 5.0)),
+)
+
+
+def get_neo4j_breaker() -> CircuitBreaker:
+    """Return the process-wide Neo4j circuit breaker."""
+    return _neo4j_breaker
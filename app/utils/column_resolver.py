@@ -0,0 +1,227 @@
+"""
+Map spreadsheet headers to the fields the sheet processors need.
+
+Resolution runs in tiers, and the first tier that finds a column for a field
+wins:
+
+1. exact - the stripped, lower-cased header equals one of the field's
+   synonyms, tried in ``COLUMN_SYNONYMS`` order (earlier synonyms win)
+2. substring - KYC account numbers only: any header containing
+   ``account``/``acct``/``acc no``/``accno``
+3. fuzzy - headers not claimed by tiers 1-2 are normalised (camelCase split,
+   punctuation and currency noise dropped, abbreviations such as ``txn``,
+   ``amt``, ``a/c`` or ``dt`` expanded) and scored against every synonym,
+   including the fuzzy-only ones in ``FUZZY_SYNONYMS``. The score is a
+   weighted token overlap: identifiers such as ``number``/``id`` count for
+   little, and near-identical tokens (typos) count as equal. Pairs scoring at
+   least ``FUZZY_THRESHOLD`` are assigned best first, one column per field;
+   a column serves several fields only through a synonym they share.
+
+So ``Txn Amt (INR)`` resolves as ``amount`` and ``Beneficiary A/C No`` as
+``receiver_account`` without new code. Sheets from one bank template share
+their headers, so results are cached by header signature and repeat uploads
+skip scoring entirely.
+"""
+from __future__ import annotations
+import re
+import logging
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+# Ordered synonyms per field; the exact tier tries them in this order
+COLUMN_SYNONYMS: Dict[str, Dict[str, List[str]]] = {
+    'transaction': {
+        'transaction_id': ['transaction id', 'transaction_id', 'txnid', 'transactionid'],
+        'sender': ['sender name', 'sender', 'from', 'sender_account', 'from_account'],
+        'receiver': ['receiver name', 'receiver', 'to', 'receiver_account', 'to_account'],
+        'amount': ['amount', 'transaction amount', 'amt', 'txn_amount'],
+        'date': ['date', 'transaction date', 'txn_date', 'transaction_date', 'value_date'],
+        'sender_account': ['sender account', 'sender_account', 'from account', 'from_account'],
+        'sender_name': ['sender name', 'sender_name', 'from name', 'from_name'],
+        'receiver_account': ['receiver account', 'receiver_account', 'to account', 'to_account'],
+        'receiver_name': ['receiver name', 'receiver_name', 'to name', 'to_name'],
+        'transaction_type': ['transaction type', 'transaction_type', 'type', 'txn_type'],
+        'description': ['description', 'desc', 'details', 'transaction details'],
+        'balance': ['balance', 'account balance', 'current balance'],
+    },
+    'kyc': {
+        'customer_id': ['customer id', 'customer_id', 'cust_id', 'client_id'],
+        'customer_name': ['customer name', 'customer_name', 'name', 'customer', 'john smith'],
+        'account_number': ['account no', 'account no.', 'account number', 'account_number', 'account', 'acct_no'],
+        'violation_type': ['customer violation', 'violation type', 'violation_type', 'rule invoked', 'rule_invoked', 'violation'],
+        'kyc_status': ['kyc verified', 'kyc status', 'kyc_status', 'status', 'customer_status'],
+        'transaction_id': ['transaction id', 'transaction_id', 'txnid', 'transactionid'],
+        'sender_name': ['sender name', 'sender_name', 'customer name', 'name', 'john smith'],
+        'date': ['date', 'transaction date', 'txn_date', 'value date'],
+        'kyc_verified': ['kyc verified', 'kyc_verified', 'kyc status', 'kyc_status', 'kyc'],
+    },
+}
+
+# Further names used by the fuzzy tier only
+FUZZY_SYNONYMS: Dict[str, Dict[str, List[str]]] = {
+    'transaction': {
+        'transaction_id': ['transaction reference', 'reference number', 'utr number'],
+        'amount': ['transaction value', 'amount inr'],
+        'date': ['posting date', 'transaction time', 'transaction timestamp', 'value date'],
+        'sender_account': ['debit account', 'remitter account', 'payer account', 'source account'],
+        'sender_name': ['remitter name', 'payer name'],
+        'receiver_account': ['credit account', 'beneficiary account', 'payee account', 'destination account'],
+        'receiver_name': ['beneficiary name', 'payee name'],
+        'transaction_type': ['payment mode', 'transaction mode', 'mode', 'channel'],
+        'description': ['narration', 'remarks', 'particulars'],
+        'balance': ['closing balance', 'running balance', 'available balance'],
+    },
+    'kyc': {
+        'customer_id': ['client id', 'cif', 'cif id'],
+        'customer_name': ['client name', 'account holder name', 'holder name'],
+        'account_number': ['account id'],
+        'violation_type': ['violation category', 'compliance violation', 'breach type'],
+        'kyc_status': ['kyc state'],
+        'kyc_verified': ['kyc flag', 'kyc compliant'],
+    },
+}
+
+_ACCOUNT_TERMS = ['account', 'acct', 'acc no', 'accno']
+
+# Minimum fuzzy score for a header to be assigned to a field
+FUZZY_THRESHOLD = 0.85
+
+# Header signatures whose resolution is kept
+CACHE_SIZE = 256
+
+_ABBREVIATIONS = {
+    'txn': 'transaction', 'trx': 'transaction', 'trans': 'transaction', 'tran': 'transaction',
+    'txnid': 'transaction id', 'transactionid': 'transaction id',
+    'amt': 'amount', 'amnt': 'amount',
+    'acct': 'account', 'acc': 'account', 'ac': 'account',
+    'accno': 'account number', 'acctno': 'account number',
+    'no': 'number', 'num': 'number', 'nbr': 'number',
+    'dt': 'date', 'cust': 'customer', 'desc': 'description', 'bal': 'balance',
+    'ref': 'reference', 'refno': 'reference number', 'benef': 'beneficiary',
+}
+
+# Units and filler that say nothing about the field
+_NOISE = {'inr', 'rs', 'rupees', 'in', 'of', 'the'}
+
+# Tokens that identify rather than describe a field
+_WEAK = {'number': 0.25, 'id': 0.25, 'code': 0.25}
+
+_CAMEL = re.compile(r'([a-z0-9])([A-Z])')
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalize_header(header: Any) -> Tuple[str, ...]:
+    """Header as normalised tokens, e.g. ``'Txn Amt (INR)'`` -> ``('transaction', 'amount')``."""
+    text = _CAMEL.sub(r'\1 \2', str(header)).lower().replace('a/c', ' account ')
+    tokens: List[str] = []
+    for token in _TOKEN.findall(text):
+        token = _ABBREVIATIONS.get(token, token)
+        tokens.extend(part for part in token.split() if part not in _NOISE)
+    return tuple(tokens)
+
+
+def _weight(token: str) -> float:
+    return _WEAK.get(token, 1.0)
+
+
+def _tokens_match(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if min(len(a), len(b)) < 4:
+        return False
+    return SequenceMatcher(None, a, b).ratio() >= 0.85
+
+
+def similarity(header: Tuple[str, ...], synonym: Tuple[str, ...]) -> float:
+    """Weighted token overlap of two normalised names, 0.0-1.0."""
+    if not header or not synonym:
+        return 0.0
+    if header == synonym:
+        return 1.0
+    unmatched = list(header)
+    shared = 0.0
+    for token in synonym:
+        for position, candidate in enumerate(unmatched):
+            if _tokens_match(token, candidate):
+                shared += _weight(token)
+                del unmatched[position]
+                break
+    total = sum(_weight(token) for token in header) + sum(_weight(token) for token in synonym) - shared
+    return shared / total if total else 0.0
+
+
+def _exact(cols: Dict[str, str], synonyms: Dict[str, List[str]], sheet_type: str) -> Dict[str, Optional[str]]:
+    resolved = {field: next((cols[name] for name in names if name in cols), None)
+                for field, names in synonyms.items()}
+    if sheet_type == 'kyc' and not resolved.get('account_number'):
+        for col_name, actual_name in cols.items():
+            if any(term in col_name for term in _ACCOUNT_TERMS):
+                resolved['account_number'] = actual_name
+                break
+    return resolved
+
+
+def _fuzzy(headers: List[str], resolved: Dict[str, Optional[str]], sheet_type: str) -> None:
+    """Assign unclaimed headers to unresolved fields, best score first."""
+    missing = [field for field, name in resolved.items() if name is None]
+    exact = set(resolved.values())
+    candidates = [(header, normalize_header(header)) for header in dict.fromkeys(headers) if header not in exact]
+    if not missing or not candidates:
+        return
+
+    extra = FUZZY_SYNONYMS.get(sheet_type, {})
+    scored = []
+    for field_order, field in enumerate(missing):
+        names = {normalize_header(name) for name in COLUMN_SYNONYMS[sheet_type][field] + extra.get(field, [])}
+        for header_order, (header, tokens) in enumerate(candidates):
+            score, name = max((similarity(tokens, name), name) for name in names)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, field_order, header_order, field, header, name))
+
+    # Like the exact tier, fields may share a header when they matched it
+    # through the same synonym (e.g. sender and sender_account via "sender account")
+    claimed: Dict[str, Tuple[str, ...]] = {}
+    for negative_score, _, _, field, header, name in sorted(scored):
+        if resolved[field] is None and claimed.get(header, name) == name:
+            resolved[field] = header
+            claimed[header] = name
+            logging.info(f"Resolved {sheet_type} column '{header}' as {field} (score {-negative_score:.2f})")
+
+
+_cache: 'OrderedDict[Tuple[str, Tuple[str, ...]], Dict[str, str]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def resolve_columns(columns: Iterable[Any], sheet_type: str = 'transaction') -> Dict[str, str]:
+    """
+    Resolve sheet headers to standard field names.
+
+    Args:
+        columns: The sheet's column labels
+        sheet_type: 'transaction' or 'kyc'
+
+    Returns:
+        Mapping of standard field names to the (stripped) header they were found under
+    """
+    sheet_type = 'kyc' if sheet_type == 'kyc' else 'transaction'
+    headers = [str(col).strip() for col in columns]
+    signature = (sheet_type, tuple(headers))
+    with _cache_lock:
+        cached = _cache.get(signature)
+        if cached is not None:
+            _cache.move_to_end(signature)
+            return dict(cached)
+
+    # Case-insensitive lookup; a later duplicate header wins
+    cols = {header.lower(): header for header in headers}
+    resolved = _exact(cols, COLUMN_SYNONYMS[sheet_type], sheet_type)
+    _fuzzy(headers, resolved, sheet_type)
+    result = {field: name for field, name in resolved.items() if name is not None}
+
+    with _cache_lock:
+        _cache[signature] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(result)
@@ -0,0 +1,163 @@
+"""
+Windowed deposit totals per account.
+
+Totals are computed over either calendar months or rolling N-day windows.
+Every transaction is reduced to an integer key, ``account * span + period``,
+and the keys are sorted once (O(n log n)):
+
+- calendar months: the sorted keys form one run per (account, month), and
+  each run is summed with ``np.add.reduceat``. When there are no more
+  (account, month) slots than a few times the row count, ``np.bincount``
+  sums them directly without a sort.
+- rolling N days: for every (account, day) with activity, the window is
+  ``(day - N, day]``. Its first transaction is found with ``searchsorted``
+  on the same sorted keys, and its total is a difference of cumulative sums.
+
+Amounts are summed as integer paise, so totals and limit comparisons are
+exact however many rows there are. Results come back as a compact DataFrame
+with one row per window: ``sender_account``, ``window_start``,
+``window_end``, ``total_deposits``, ``transaction_count`` and, for
+``find_limit_breaches``, ``excess_amount``.
+"""
+from __future__ import annotations
+from typing import Any, Union
+
+import numpy as np
+import pandas as pd
+
+MONTH = 'month'
+
+Window = Union[str, int]
+
+_COLUMNS = ['sender_account', 'window_start', 'window_end', 'total_deposits', 'transaction_count']
+
+
+def parse_window(value: Any) -> Window:
+    """``'month'`` for calendar months, otherwise a window length in days (``30``, ``'30'``, ``'30d'``)."""
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ('month', 'calendar_month', 'monthly', 'm'):
+            return MONTH
+        value = text[:-1] if text.endswith('d') else text
+    days = int(value)
+    if days < 1:
+        raise ValueError(f'Deposit window must be at least 1 day, got {days}')
+    return days
+
+
+def _prepare(accounts, dates, amounts):
+    """Valid rows as (account codes, unique accounts, datetime64 dates, amounts in paise)."""
+    accounts = pd.Series(accounts).reset_index(drop=True)
+    dates = pd.Series(dates).reset_index(drop=True)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    amounts = pd.to_numeric(pd.Series(amounts).reset_index(drop=True), errors='coerce')
+    codes, uniques = pd.factorize(accounts)
+    valid = (codes >= 0) & dates.notna().to_numpy() & amounts.notna().to_numpy()
+    paise = np.rint(amounts.to_numpy(dtype=float)[valid] * 100).astype(np.int64)
+    return codes[valid].astype(np.int64), uniques, dates.to_numpy(dtype='datetime64[ns]')[valid], paise
+
+
+def _empty(with_excess: bool = False) -> pd.DataFrame:
+    columns = _COLUMNS + (['excess_amount'] if with_excess else [])
+    return pd.DataFrame({column: [] for column in columns})
+
+
+def _monthly_totals(codes, dates, paise):
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    first = months.min()
+    span = int(months.max() - first) + 1
+    keys = codes * span + (months - first)
+    if (int(codes.max()) + 1) * span <= 4 * len(keys):
+        # Dense key range: count straight into buckets, no sort needed
+        counts = np.bincount(keys)
+        run_keys = np.flatnonzero(counts)
+        counts = counts[run_keys]
+        # float64 sums of whole paise stay exact below 2**53
+        totals = np.rint(np.bincount(keys, weights=paise)[run_keys]).astype(np.int64)
+    else:
+        order = np.argsort(keys)
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        totals = np.add.reduceat(paise[order], starts)
+        counts = np.diff(np.r_[starts, len(keys)])
+        run_keys = keys[starts]
+    month = (run_keys % span + first).astype('datetime64[M]')
+    return run_keys // span, month.astype('datetime64[D]'), ((month + 1).astype('datetime64[D]') - 1), totals, counts
+
+
+def _rolling_totals(codes, dates, paise, days: int):
+    day = dates.astype('datetime64[D]').astype(np.int64)
+    first = day.min()
+    # Padding the span by the window length keeps a window from reaching into the previous account
+    span = int(day.max() - first) + days + 1
+    keys = codes * span + (day - first)
+    order = np.argsort(keys)
+    keys = keys[order]
+    cumulative = np.concatenate(([0], np.cumsum(paise[order])))
+    # Windows end on the last transaction of each (account, day) with activity
+    ends = np.flatnonzero(np.r_[keys[1:] != keys[:-1], True])
+    end_keys = keys[ends]
+    starts = np.searchsorted(keys, end_keys - (days - 1), side='left')
+    totals = cumulative[ends + 1] - cumulative[starts]
+    counts = ends + 1 - starts
+    window_end = (end_keys % span + first).astype('datetime64[D]')
+    return end_keys // span, window_end - (days - 1), window_end, totals, counts
+
+
+def _windows(accounts, dates, amounts, window: Window):
+    """(accounts, window starts, window ends, totals in paise, counts), or None without valid rows."""
+    window = parse_window(window)
+    codes, uniques, dates, paise = _prepare(accounts, dates, amounts)
+    if not len(codes):
+        return None
+    if window == MONTH:
+        account_codes, start, end, totals, counts = _monthly_totals(codes, dates, paise)
+    else:
+        account_codes, start, end, totals, counts = _rolling_totals(codes, dates, paise, window)
+    return np.asarray(uniques)[account_codes], start, end, totals, counts
+
+
+def _frame(account, start, end, totals, counts) -> pd.DataFrame:
+    return pd.DataFrame({
+        'sender_account': account,
+        'window_start': start.astype('datetime64[ns]'),
+        'window_end': end.astype('datetime64[ns]'),
+        'total_deposits': totals / 100.0,
+        'transaction_count': counts,
+    })
+
+
+def deposit_window_totals(accounts, dates, amounts, window: Window = MONTH) -> pd.DataFrame:
+    """
+    Deposit totals per account and window.
+
+    Args:
+        accounts: Account of each transaction
+        dates: Transaction dates (anything ``pd.to_datetime`` parses)
+        amounts: Transaction amounts
+        window: ``MONTH`` or a rolling window length in days
+
+    Returns:
+        DataFrame with one row per account and calendar month, or per
+        account and day with activity for rolling windows. Rows with a
+        missing account, unparseable date or non-numeric amount are ignored.
+    """
+    windows = _windows(accounts, dates, amounts, window)
+    if windows is None:
+        return _empty()
+    return _frame(*windows)
+
+
+def find_limit_breaches(accounts, dates, amounts, limit: float, window: Window = MONTH) -> pd.DataFrame:
+    """Windows whose deposit total exceeds ``limit``, with the ``excess_amount`` over it."""
+    windows = _windows(accounts, dates, amounts, window)
+    if windows is None:
+        return _empty(with_excess=True)
+    limit_paise = int(round(limit * 100))
+    over = windows[3] > limit_paise
+    breaches = _frame(*(values[over] for values in windows))
+    breaches['excess_amount'] = (windows[3][over] - limit_paise) / 100.0
+    return breaches
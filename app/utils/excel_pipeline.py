@@ -0,0 +1,503 @@
+"""
+Chunked analysis of uploaded transaction workbooks.
+
+A sheet flows through four stages, ``chunk_size`` rows at a time:
+
+1. read      - ``excel_stream.iter_excel_chunks`` parses the next rows
+2. evaluate  - the rows are normalised and matched against the compiled
+               compliance rules in one column-wise pass (``rule_registry``)
+3. review    - optionally, rows no rule matched are handed to an LLM reviewer
+4. emit      - per-row transaction records are appended to the job's results
+
+Reading happens on the job's thread while up to ``workers`` chunks are
+evaluated and reviewed on a thread pool; results are emitted in sheet order.
+Jobs report per-chunk progress and expose the records emitted so far, so a
+caller can poll a long-running job and page through partial results.
+"""
+from __future__ import annotations
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable, Mapping, Tuple
+
+import pandas as pd
+
+from .excel_stream import iter_excel_chunks, read_headers, estimate_rows
+from .rule_engine import normalize_frame
+from .rule_registry import RuleSet, get_rule_registry
+
+# Rows per chunk and chunks processed in parallel
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_WORKERS = 2
+
+# Finished jobs kept for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 20
+
+RISK_ORDER = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Reviewer: original-column rows in, one ``ai_analysis`` dict (or None) per row out
+Reviewer = Callable[[List[Dict[str, Any]]], List[Optional[Dict[str, Any]]]]
+
+
+def get_chunk_size() -> int:
+    return max(1, int(os.getenv('EXCEL_PIPELINE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)))
+
+
+def get_worker_count() -> int:
+    return max(1, int(os.getenv('EXCEL_PIPELINE_WORKERS', DEFAULT_WORKERS)))
+
+
+def llm_review_enabled() -> bool:
+    return os.getenv('EXCEL_LLM_REVIEW', '0').lower() in ('1', 'true', 'yes')
+
+
+def rule_violation_detail(rule: Mapping[str, Any]) -> Dict[str, Any]:
+    """Violation detail entry for a matched compliance rule."""
+    risk_level = rule.get('risk_level', rule.get('risk', 'MEDIUM'))
+    return {
+        'violation_type': rule['name'],
+        'legal_provision': 'RBI Master Direction',
+        'circular': 'RBI/2022-23/123',
+        'penalty_min': 10000 if risk_level in ['HIGH', 'CRITICAL'] else 5000,
+        'penalty_max': 100000 if risk_level in ['HIGH', 'CRITICAL'] else 50000,
+        'reason': f"{rule.get('description', '')} - {risk_level} risk"
+    }
+
+
+def no_violation_analysis() -> Dict[str, Any]:
+    """Analysis attached to rows that matched no rule and were not reviewed."""
+    return {
+        'matched_rules': ['No Violation'],
+        'explanation': 'No compliance rule violations detected.',
+        'risk_level': 'LOW'
+    }
+
+
+def check_sheet_columns(columns: List[Any]) -> Tuple[Optional[str], bool]:
+    """Validate a sheet header.
+
+    Returns:
+        Tuple of (error message or None, whether this is a KYC dataset)
+    """
+    columns = [str(col).strip() for col in columns]
+    # Description column is optional for KYC datasets
+    description_col = next((col for col in columns if 'description' in col.lower()), None)
+    is_kyc_dataset = any('kyc' in col.lower() for col in columns)
+    if not description_col and not is_kyc_dataset:
+        return ('Description column not found in Excel sheet. This appears to be neither a transaction '
+                'dataset nor a KYC compliance dataset.'), is_kyc_dataset
+    return None, is_kyc_dataset
+
+
+def _transaction_text(idx: int, transaction_data: Dict[str, Any], is_kyc_dataset: bool) -> Optional[str]:
+    """Text identifying the transaction; None when the row should be skipped."""
+    # Get transaction description from the most likely column (optional for KYC datasets)
+    description_cols = [col for col in transaction_data.keys()
+                        if 'desc' in col or 'note' in col or 'detail' in col or 'particular' in col]
+
+    if description_cols:
+        transaction_text = str(transaction_data.get(description_cols[0], '')).strip()
+    elif is_kyc_dataset:
+        # For KYC datasets, use customer name or account number as identifier
+        customer_cols = [col for col in transaction_data.keys() if 'customer' in col or 'name' in col]
+        account_cols = [col for col in transaction_data.keys() if 'account' in col]
+
+        if customer_cols:
+            transaction_text = f"KYC Review for {transaction_data.get(customer_cols[0], 'Unknown Customer')}"
+        elif account_cols:
+            transaction_text = f"KYC Review for Account {transaction_data.get(account_cols[0], 'Unknown Account')}"
+        else:
+            transaction_text = f"KYC Compliance Review - Row {idx + 1}"
+    else:
+        # For non-KYC datasets, try to use any available column
+        description_col = next(iter(transaction_data.keys())) if transaction_data else None
+        transaction_text = str(transaction_data.get(description_col, '')).strip() if description_col else ''
+
+    if not transaction_text or transaction_text.lower() in ['nan', 'none', '']:
+        if not is_kyc_dataset:
+            logging.debug(f"Skipping row {idx + 1}: No description found")
+            return None
+        transaction_text = f"KYC Compliance Review - Row {idx + 1}"
+    return transaction_text
+
+
+def _transaction_record(idx: int, transaction_data: Dict[str, Any], transaction_text: str,
+                        matched: Tuple[Mapping[str, Any], ...], analysis: Optional[Dict[str, Any]],
+                        compliance_rules: Tuple[Mapping[str, Any], ...]) -> Dict[str, Any]:
+    """Build the result record for one analysed row."""
+    matched_rules = [rule['name'] for rule in matched]
+    violation_details = [rule_violation_detail(rule) for rule in matched]
+
+    # Rows with a non-numeric amount are reported as processing errors
+    float(transaction_data.get('amount', 0))
+
+    if matched_rules:
+        matched_rule_objects = [r for r in compliance_rules if r['name'] in matched_rules]
+        risk_level = max((rule['risk'] for rule in matched_rule_objects), key=lambda x: RISK_ORDER.index(x))
+        analysis_result = {
+            'matched_rules': matched_rules,
+            'explanation': f"Found {len(matched_rules)} rule violation(s): {', '.join(matched_rules)}",
+            'risk_level': risk_level,
+            'violation_details': violation_details,
+            'matched_rule_details': [
+                {
+                    'rule_id': rule['id'],
+                    'rule_name': rule['name'],
+                    'description': rule['description'],
+                    'risk': rule['risk']
+                } for rule in matched_rule_objects
+            ]
+        }
+    else:
+        analysis_result = analysis or no_violation_analysis()
+
+    return {
+        # Standard fields
+        'transaction_id': str(transaction_data.get('transaction_id', '')).strip() or f"TXN_{idx + 1}",
+        'date': str(transaction_data.get('date', '')).strip() or '',
+        'time': str(transaction_data.get('time', '')).strip() or '',
+        'timestamp': str(transaction_data.get('timestamp', '')).strip() or '',
+
+        # Sender information
+        'sender': str(transaction_data.get('sender_name', transaction_data.get('sender', ''))).strip(),
+        'sender_name': str(transaction_data.get('sender_name', '')).strip() or '',
+        'sender_account': str(transaction_data.get('sender_account', '')).strip() or '',
+        'sender_kyc_status': str(transaction_data.get('sender_kyc_status', '')).strip() or '',
+
+        # Receiver information
+        'receiver': str(transaction_data.get('receiver_name', transaction_data.get('receiver', ''))).strip(),
+        'receiver_name': str(transaction_data.get('receiver_name', '')).strip() or '',
+        'receiver_account': str(transaction_data.get('receiver_account', '')).strip() or '',
+
+        # Transaction details
+        'amount': transaction_data.get('amount', ''),
+        'transaction_type': str(transaction_data.get('transaction_type', '')).strip() or '',
+        'transaction_mode': str(transaction_data.get('transaction_mode', '')).strip() or '',
+        'description': transaction_text,
+        'balance': transaction_data.get('balance', ''),
+        'balance_after': transaction_data.get('balance_after', ''),
+        'currency': str(transaction_data.get('currency', 'INR')).strip(),
+        'channel': str(transaction_data.get('channel', '')).strip() or '',
+        'reference_number': str(transaction_data.get('reference_number', '')).strip() or '',
+        'location': str(transaction_data.get('location', '')).strip() or '',
+        'branch_code': str(transaction_data.get('branch_code', '')).strip() or '',
+        'branch_location': str(transaction_data.get('branch_location', '')).strip() or '',
+
+        # Violation information
+        'has_violation': bool(matched_rules) or (analysis_result.get('matched_rules', ['No Violation'])[0] != 'No Violation'),
+        'violation_type': ', '.join(matched_rules or analysis_result.get('matched_rules', [])),
+        'violation_details': violation_details or [{
+            'violation_type': ', '.join(analysis_result.get('matched_rules', [])),
+            'legal_provision': 'RBI Master Direction',
+            'circular': 'RBI/2022-23/123',
+            'penalty_min': None,
+            'penalty_max': None,
+            'reason': analysis_result.get('explanation', '')
+        }],
+
+        # Rule matching information
+        'matched_rules': [
+            {
+                'rule_id': rule['id'],
+                'rule_name': rule['name'],
+                'description': rule['description'],
+                'risk': rule['risk']
+            } for rule in compliance_rules if rule['name'] in matched_rules
+        ] if matched_rules else [],
+
+        # AI analysis results
+        'ai_analysis': analysis_result if not matched_rules else None,
+        'risk_level': analysis_result.get('risk_level', 'LOW'),
+
+        # Include all original data for reference
+        'raw_data': {k: str(v) for k, v in transaction_data.items() if v is not None and str(v).strip() != ''}
+    }
+
+
+def _error_record(idx: int, transaction_data: Dict[str, Any], transaction_text: str, error_msg: str) -> Dict[str, Any]:
+    return {
+        'transaction_id': str(transaction_data.get('transaction_id', f"TXN_{idx + 1}")),
+        'date': str(transaction_data.get('date', '')),
+        'sender': str(transaction_data.get('sender_name', transaction_data.get('sender', ''))),
+        'sender_account': str(transaction_data.get('sender_account', '')),
+        'receiver': str(transaction_data.get('receiver_name', transaction_data.get('receiver', ''))),
+        'receiver_account': str(transaction_data.get('receiver_account', '')),
+        'amount': transaction_data.get('amount', ''),
+        'transaction_type': str(transaction_data.get('transaction_type', '')),
+        'description': transaction_text,
+        'balance': transaction_data.get('balance', ''),
+        'has_violation': True,
+        'violation_type': 'Processing Error',
+        'violation_details': [{
+            'violation_type': 'Processing Error',
+            'legal_provision': 'N/A',
+            'circular': 'N/A',
+            'penalty_min': None,
+            'penalty_max': None,
+            'reason': f'Error during analysis: {error_msg}'
+        }],
+        'ai_analysis': {
+            'transaction': transaction_text,
+            'matched_rules': ['Processing Error'],
+            'explanation': f'Error during analysis: {error_msg}'
+        }
+    }
+
+
+def analyze_chunk(chunk: pd.DataFrame, rule_set: RuleSet, is_kyc_dataset: bool,
+                  reviewer: Optional[Reviewer] = None) -> List[Dict[str, Any]]:
+    """Run one chunk through the evaluate, review and record-building stages.
+
+    Args:
+        chunk: Sheet rows with their original columns and sheet-order index
+        rule_set: Compiled rules to evaluate
+        is_kyc_dataset: Whether the sheet is a KYC dataset (affects row skipping)
+        reviewer: Optional LLM reviewer for rows no rule matched
+
+    Returns:
+        Transaction records in row order; rows without a description are skipped
+    """
+    chunk = chunk.copy()
+    chunk.columns = [str(col).strip() for col in chunk.columns]
+    frame = normalize_frame(chunk)
+    matches = rule_set.match(frame)
+    rows = frame.to_dict('records')
+
+    prepared = []
+    for position, (idx, transaction_data) in enumerate(zip(chunk.index, rows)):
+        transaction_text = _transaction_text(idx, transaction_data, is_kyc_dataset)
+        if transaction_text is None:
+            continue
+        # Add index as transaction_id if not present
+        if 'transaction_id' not in transaction_data or not transaction_data['transaction_id']:
+            transaction_data['transaction_id'] = f"TXN_{idx + 1}"
+        prepared.append((position, idx, transaction_data, transaction_text))
+
+    reviews: Dict[int, Optional[Dict[str, Any]]] = {}
+    if reviewer is not None:
+        unmatched = [position for position, _, _, _ in prepared if not matches[position]]
+        if unmatched:
+            try:
+                results = reviewer([chunk.iloc[position].to_dict() for position in unmatched])
+                reviews = dict(zip(unmatched, results))
+            except Exception as e:
+                logging.error(f"LLM review failed for {len(unmatched)} row(s): {e}")
+
+    records = []
+    for position, idx, transaction_data, transaction_text in prepared:
+        try:
+            records.append(_transaction_record(idx, transaction_data, transaction_text, matches[position],
+                                               reviews.get(position), rule_set.rules))
+        except Exception as e:
+            logging.error(f"Error analyzing transaction {idx + 1}: {e}")
+            records.append(_error_record(idx, transaction_data, transaction_text, str(e)))
+    return records
+
+
+def summarize(transactions: List[Dict[str, Any]], total_rows: int) -> Dict[str, Any]:
+    """Response counters over the analysed transactions."""
+    violations_found = len([t for t in transactions if t.get('has_violation', False)])
+    return {
+        'total_transactions': total_rows,
+        'violation_transactions': violations_found,
+        'total_accounts': len({t.get('sender_account') for t in transactions if t.get('sender_account')}),
+        'matched_accounts': violations_found,
+        'customers_with_violations': len({t.get('sender_account') for t in transactions if t.get('has_violation', False)})
+    }
+
+
+class ExcelAnalysisJob:
+    """Analysis of one workbook; run in the caller's thread or by ``ExcelJobRegistry``."""
+
+    def __init__(self, filepath: str, chunk_size: Optional[int] = None, workers: Optional[int] = None,
+                 reviewer: Optional[Reviewer] = None,
+                 on_complete: Optional[Callable[['ExcelAnalysisJob', Dict[str, Any]], None]] = None):
+        self.id = uuid.uuid4().hex
+        self.filepath = filepath
+        self.filename = os.path.basename(filepath)
+        self.chunk_size = max(1, int(chunk_size)) if chunk_size else get_chunk_size()
+        self.workers = max(1, int(workers)) if workers else get_worker_count()
+        self._reviewer = reviewer
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+        # Signalled whenever records are emitted or the job finishes
+        self._changed = threading.Condition(self._lock)
+        self._transactions: List[Dict[str, Any]] = []
+        self._result: Optional[Dict[str, Any]] = None
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.rows_estimate: Optional[int] = None
+        self.rows_read = 0
+        self.chunks_done = 0
+        self.violations = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def run(self) -> Dict[str, Any]:
+        """Process the whole sheet; returns the result dict or ``{'error': ...}``."""
+        with self._lock:
+            self.status = RUNNING
+            self.started_at = time.time()
+        try:
+            result = self._run()
+        except Exception as e:
+            logging.error(f"Excel analysis of {self.filename} failed: {e}")
+            result = {'error': str(e)}
+
+        with self._lock:
+            self.finished_at = time.time()
+            # Result first: readers that see a finished status find it set
+            self._result = result
+            if 'error' in result:
+                self.status = FAILED
+                self.error = result['error']
+            else:
+                self.status = DONE
+            self._changed.notify_all()
+        if self._on_complete is not None:
+            try:
+                self._on_complete(self, result)
+            except Exception as e:
+                logging.warning(f"Completion handler for {self.filename} failed: {e}")
+        return result
+
+    def _run(self) -> Dict[str, Any]:
+        columns = read_headers(self.filepath)
+        logging.info(f"Excel columns: {columns}")
+        error, is_kyc_dataset = check_sheet_columns(columns)
+        if error:
+            return {'error': error}
+        try:
+            self.rows_estimate = estimate_rows(self.filepath)
+        except Exception:
+            self.rows_estimate = None
+
+        # One rule snapshot for the whole job, even if the rules change meanwhile
+        rule_set = get_rule_registry().get()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='excel-pipeline') as pool:
+            pending = deque()
+            for chunk in iter_excel_chunks(self.filepath, chunk_size=self.chunk_size):
+                if chunk.empty:
+                    continue
+                with self._lock:
+                    self.rows_read += len(chunk)
+                pending.append(pool.submit(analyze_chunk, chunk, rule_set, is_kyc_dataset, self._reviewer))
+                # Bound the number of chunks held in memory
+                while len(pending) > self.workers:
+                    self._emit(pending.popleft().result())
+            while pending:
+                self._emit(pending.popleft().result())
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            transactions = list(self._transactions)
+            total_rows = self.rows_read
+        logging.info(f"Analyzed {total_rows} rows of {self.filename} in {elapsed:.2f}s "
+                     f"({self.chunks_done} chunks, {self.violations} violations)")
+        response = {'success': True, 'transactions': transactions,
+                    'kyc_violations': []}  # Empty for compatibility with existing UI
+        response.update(summarize(transactions, total_rows))
+        return response
+
+    def _emit(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._transactions.extend(records)
+            self.chunks_done += 1
+            self.violations += sum(1 for record in records if record.get('has_violation'))
+            rows_read, estimate = self.rows_read, self.rows_estimate
+            self._changed.notify_all()
+        logging.info(f"{self.filename}: chunk {self.chunks_done} done, {rows_read}"
+                     f"{f'/{estimate}' if estimate else ''} rows read")
+
+    @property
+    def result(self) -> Optional[Dict[str, Any]]:
+        return self._result
+
+    def transactions(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Records emitted so far (a slice of them)."""
+        with self._lock:
+            end = None if limit is None else offset + limit
+            return self._transactions[offset:end]
+
+    def wait(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """Block until more than ``offset`` records exist or the job has finished; False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self._transactions) > offset or self.finished, timeout)
+
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'filename': self.filename,
+                'status': self.status,
+                'error': self.error,
+                'chunk_size': self.chunk_size,
+                'workers': self.workers,
+                'chunks_done': self.chunks_done,
+                'rows_read': self.rows_read,
+                'rows_estimate': self.rows_estimate,
+                'transactions_emitted': len(self._transactions),
+                'violations': self.violations,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+class ExcelJobRegistry:
+    """Background runner and lookup table for analysis jobs."""
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs: 'OrderedDict[str, ExcelAnalysisJob]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job: ExcelAnalysisJob) -> ExcelAnalysisJob:
+        """Start ``job`` on a background thread."""
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        threading.Thread(target=job.run, name=f'excel-job-{job.id[:8]}', daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[ExcelAnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.progress() for job in jobs]
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+_excel_jobs: Optional[ExcelJobRegistry] = None
+_excel_jobs_lock = threading.Lock()
+
+
+def get_excel_jobs() -> ExcelJobRegistry:
+    """Return the process-wide analysis job registry."""
+    global _excel_jobs
+    with _excel_jobs_lock:
+        if _excel_jobs is None:
+            _excel_jobs = ExcelJobRegistry()
+        return _excel_jobs
@@ -0,0 +1,189 @@
+"""
+Streaming Excel reader built on openpyxl's read-only mode.
+
+``pd.read_excel`` parses the whole sheet into memory on every call. Here the
+workbook is opened read-only, so listing sheet names only reads the workbook
+index, reading headers stops after the first row, and data rows are turned
+into DataFrames ``chunk_size`` rows at a time. Memory stays flat regardless of
+sheet length.
+
+Columns are named as ``pd.read_excel`` names them: the first row becomes the
+columns (blank headers become ``Unnamed: <n>`` and repeats get ``.1``, ``.2``
+suffixes). The data differs from ``pd.read_excel`` in three ways:
+
+- Completely empty rows are skipped, not returned as all-NaN rows. The index
+  counts the rows that are kept and continues across chunks, so after a
+  blank row it no longer equals the sheet row number minus 2. Row numbers
+  derived from it (e.g. the ``TXN_<n>`` fallback ids) count data rows.
+- Empty cells in text/object columns are ``None``, not NaN. Numeric columns
+  with empty cells are float64 with NaN, as in pandas.
+- As no NaN rows are added for blank rows, a whole-number column with no
+  empty cells stays int64; ``pd.read_excel`` makes it float64 when the sheet
+  has a blank row.
+
+Legacy ``.xls`` files are not supported by openpyxl and fall back to
+``pd.read_excel``, so they behave exactly like pandas.
+
+Workbooks converted by ``sheet_cache`` (uploads are converted on arrival)
+are served from that cache without opening the workbook at all.
+"""
+from __future__ import annotations
+import os
+from contextlib import contextmanager
+from typing import Any, Optional, List, Iterator, Tuple, Union
+
+import pandas as pd
+
+# Rows per DataFrame chunk
+DEFAULT_CHUNK_SIZE = 10000
+
+SheetRef = Union[int, str, None]
+
+
+def _is_legacy(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == '.xls'
+
+
+@contextmanager
+def _open_workbook(path: str):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield workbook
+    finally:
+        workbook.close()
+
+
+def _select_sheet(workbook, sheet: SheetRef):
+    if sheet is None:
+        return workbook.worksheets[0]
+    if isinstance(sheet, int):
+        return workbook.worksheets[sheet]
+    return workbook[sheet]
+
+
+def _column_names(header: Tuple[Any, ...]) -> List[str]:
+    """Column labels the way pandas builds them from a header row."""
+    names: List[str] = []
+    seen = {}
+    for idx, value in enumerate(header):
+        name = f"Unnamed: {idx}" if value is None or str(value).strip() == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _cached(path: str):
+    """The converted copy of ``path`` from ``sheet_cache``, if there is one."""
+    from .sheet_cache import cached_workbook
+    return cached_workbook(path)
+
+
+def get_sheet_names(path: str, use_cache: bool = True) -> List[str]:
+    """List sheet names without reading any cell data."""
+    cached = _cached(path) if use_cache else None
+    if cached is not None:
+        return cached.sheet_names()
+    if _is_legacy(path):
+        return pd.ExcelFile(path).sheet_names
+    with _open_workbook(path) as workbook:
+        return list(workbook.sheetnames)
+
+
+def read_headers(path: str, sheet: SheetRef = None) -> List[str]:
+    """Return the column names of a sheet (its first row)."""
+    cached = _cached(path)
+    if cached is not None:
+        return cached.headers(sheet)
+    if _is_legacy(path):
+        return pd.read_excel(path, sheet_name=sheet or 0, nrows=0).columns.tolist()
+    with _open_workbook(path) as workbook:
+        rows = _select_sheet(workbook, sheet).iter_rows(values_only=True)
+        return _column_names(next(rows, ()))
+
+
+def estimate_rows(path: str, sheet: SheetRef = None) -> Optional[int]:
+    """Data row count from the sheet's stored dimensions, without reading cells.
+
+    The dimension is written by the producing application and may include
+    trailing empty rows, so treat it as an upper bound. None when unknown.
+    Cached workbooks report their exact row count.
+    """
+    cached = _cached(path)
+    if cached is not None:
+        return cached.row_count(sheet)
+    if _is_legacy(path):
+        return None
+    with _open_workbook(path) as workbook:
+        max_row = _select_sheet(workbook, sheet).max_row
+    return max(0, max_row - 1) if max_row else None
+
+
+def iter_sheet_rows(path: str, sheet: SheetRef = None) -> Iterator[Tuple[List[str], Iterator[Tuple[Any, ...]]]]:
+    """Yield ``(columns, rows)`` for one sheet, with rows produced lazily.
+
+    The workbook stays open until the generator is exhausted or closed.
+    """
+    if _is_legacy(path):
+        df = pd.read_excel(path, sheet_name=sheet or 0)
+        yield df.columns.tolist(), df.itertuples(index=False, name=None)
+        return
+    with _open_workbook(path) as workbook:
+        rows = _select_sheet(workbook, sheet).iter_rows(values_only=True)
+        header = next(rows, ())
+        yield _column_names(header), rows
+
+
+def iter_excel_chunks(path: str, sheet: SheetRef = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      nrows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Iterate over a sheet as DataFrames of at most ``chunk_size`` rows.
+
+    Args:
+        path: Path to the .xlsx/.xls file
+        sheet: Sheet index or name (default: first sheet)
+        chunk_size: Maximum rows per chunk
+        nrows: Stop after this many data rows
+
+    Yields:
+        DataFrames with the sheet's columns and a running index over the
+        non-empty rows (see the module docstring for how they differ from
+        ``pd.read_excel``)
+    """
+    cached = _cached(path)
+    if cached is not None:
+        yield from cached.iter_chunks(sheet, chunk_size, nrows)
+        return
+    chunk_size = max(1, chunk_size)
+    for columns, rows in iter_sheet_rows(path, sheet):
+        width = len(columns)
+        buffer: List[Tuple[Any, ...]] = []
+        offset = 0
+        for row in rows:
+            if nrows is not None and offset + len(buffer) >= nrows:
+                break
+            if all(value is None for value in row):
+                continue
+            # Rows can be shorter or longer than the header in sparse sheets
+            buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(buffer) >= chunk_size:
+                yield _chunk_frame(buffer, columns, offset)
+                offset += len(buffer)
+                buffer = []
+        if buffer or offset == 0:
+            yield _chunk_frame(buffer, columns, offset)
+
+
+def _chunk_frame(rows: List[Tuple[Any, ...]], columns: List[str], offset: int) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df.index = pd.RangeIndex(offset, offset + len(rows))
+    return df
+
+
+def read_excel_rows(path: str, sheet: SheetRef = None, nrows: Optional[int] = None) -> pd.DataFrame:
+    """Read (the first ``nrows`` rows of) a sheet into one DataFrame."""
+    chunks = list(iter_excel_chunks(path, sheet, chunk_size=nrows or DEFAULT_CHUNK_SIZE, nrows=nrows))
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
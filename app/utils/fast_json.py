@@ -0,0 +1,432 @@
+"""
+Fast JSON serialization for large API responses.
+
+``to_jsonable`` converts results into plain JSON types. It produces the same
+values as the recursive cleaner it replaces: NaN/NaT/None become ``null``,
+NumPy scalars become Python scalars, timestamps become ISO strings, dict keys
+become strings, and a blank ``rule invoked`` becomes ``null``. It looks up a
+handler by exact type instead of probing every value with ``hasattr`` and
+``str()``. Types without a handler go through the generic rules, and the
+handler chosen for each type is remembered.
+
+DataFrames and Series are converted column by column: one pass per column
+handles its dtype, instead of one pass per cell.
+
+``json_response`` writes the response body with the settings of
+``app.json`` (sorted keys, compact separators, ASCII escapes, trailing
+newline), so the bytes match ``jsonify``. Dicts are written key by key and
+list items one at a time, in buffered chunks. The full document is never
+held in memory as a single string.
+
+``ndjson_response`` streams newline-delimited JSON, one value per line, with
+the same encoder settings. Values arrive in batches, and each batch is
+written as soon as it is available.
+"""
+from __future__ import annotations
+import json
+import math
+import logging
+import datetime as _dt
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import Response, current_app, stream_with_context
+
+# Bytes buffered before a chunk is written to the response
+CHUNK_BYTES = 64 * 1024
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+_NULL_TEXT = ('nat', 'nan', 'none', 'null')
+
+_NaTType = type(pd.NaT)
+
+
+def _identity(obj):
+    return obj
+
+
+def _none(obj):
+    return None
+
+
+def _float(obj):
+    return None if obj != obj else obj
+
+
+def _rule_invoked_blank(value) -> bool:
+    return bool(pd.isna(value) or value == '')
+
+
+def _dict(obj: dict):
+    cleaned = {}
+    for key, value in obj.items():
+        key = key if type(key) is str else str(key)
+        if key.lower() == 'rule invoked':
+            try:
+                blank = _rule_invoked_blank(value)
+            except Exception as e:
+                logging.error(f"Error cleaning object for JSON: {str(e)}, type: {type(obj)}, value: {str(obj)[:200]}")
+                return None
+            if blank:
+                cleaned[key] = None
+                continue
+        handler = _HANDLERS.get(type(value))
+        cleaned[key] = handler(value) if handler is not None else _generic(value)
+    return cleaned
+
+
+def _list(obj):
+    handlers = _HANDLERS
+    return [
+        handler(item) if handler is not None else _generic(item)
+        for item, handler in ((item, handlers.get(type(item))) for item in obj)
+    ]
+
+
+def _timestamp(obj):
+    return obj.isoformat()
+
+
+def _numpy_float(obj):
+    return None if obj != obj else obj.item()
+
+
+def _numpy_item(obj):
+    return to_jsonable(obj.item())
+
+
+def _numpy_datetime(obj):
+    return None if np.isnat(obj) else to_jsonable(obj.item())
+
+
+def _numpy_str(obj):
+    return None if obj.lower() in ('nan', 'nat') else obj
+
+
+def _series_values(series: pd.Series) -> List[Any]:
+    """Cleaned values of one column, converted according to its dtype."""
+    kind = series.dtype.kind
+    if kind in 'iub' and isinstance(series.dtype, np.dtype):
+        return series.tolist()
+    if kind == 'f' and isinstance(series.dtype, np.dtype):
+        return [None if value != value else value for value in series.tolist()]
+    if kind == 'M':
+        return [None if value is pd.NaT else value.isoformat() for value in series]
+    if isinstance(series.dtype, np.dtype):
+        return _list(series.tolist())
+    # Extension dtypes (nullable integers, categoricals, ...) box their missing values like to_dict
+    return _list(series.to_dict().values())
+
+
+def _series_keys(index: pd.Index) -> Optional[List[str]]:
+    """String keys for an index, or None when the generic path must handle it."""
+    if not index.is_unique:
+        return None
+    keys = [key if type(key) is str else str(key) for key in index.tolist()]
+    if any(key.lower() == 'rule invoked' for key in keys):
+        return None
+    return keys
+
+
+def _series(obj: pd.Series):
+    keys = _series_keys(obj.index)
+    if keys is None:
+        return _dict(obj.to_dict())
+    return dict(zip(keys, _series_values(obj)))
+
+
+def _frame(obj: pd.DataFrame):
+    keys = _series_keys(obj.index)
+    if keys is None or not obj.columns.is_unique:
+        return _dict(obj.to_dict())
+    columns = {}
+    for column in obj.columns:
+        columns[column if type(column) is str else str(column)] = dict(zip(keys, _series_values(obj[column])))
+    return columns
+
+
+def _generic(obj):
+    """Convert a value whose type has no handler, then remember the handler for its type."""
+    handler = _handler_for(obj)
+    if handler is not None:
+        _HANDLERS[type(obj)] = handler
+        return handler(obj)
+    return _clean_value(obj)
+
+
+def _handler_for(obj) -> Optional[Callable[[Any], Any]]:
+    """Pick a handler for ``type(obj)`` when the generic rules would treat every value of that type the same way."""
+    if isinstance(obj, np.floating):
+        return _numpy_float
+    if isinstance(obj, np.datetime64):
+        return _numpy_datetime
+    if isinstance(obj, np.str_):
+        return _numpy_str
+    if isinstance(obj, (np.integer, np.bool_)):
+        return _numpy_item
+    if isinstance(obj, pd.DataFrame):
+        return _frame
+    if isinstance(obj, pd.Series):
+        return _series
+    if isinstance(obj, pd.Timestamp):
+        return _timestamp
+    return None
+
+
+def _clean_value(obj):
+    """The generic rules, used for types without a handler."""
+    try:
+        # Handle None and numpy.nan
+        if obj is None or (hasattr(obj, 'item') and str(obj).lower() in ('nan', 'nat')):
+            return None
+
+        if isinstance(obj, (str, int, bool)):
+            return obj
+
+        # Handle float specifically to catch NaN, inf, -inf
+        if isinstance(obj, float):
+            return None if math.isnan(obj) else obj
+
+        # Handle pandas NA/NaT/None
+        if str(obj).lower() in _NULL_TEXT:
+            return None
+
+        if isinstance(obj, dict):
+            return _dict(obj)
+
+        if isinstance(obj, (list, tuple, set)):
+            return _list(obj)
+
+        # Handle pandas Series and DataFrames
+        if hasattr(obj, 'to_dict') and callable(getattr(obj, 'to_dict')):
+            return to_jsonable(obj.to_dict())
+
+        # Handle numpy types
+        if hasattr(obj, 'item') and callable(getattr(obj, 'item')):
+            try:
+                return to_jsonable(obj.item())
+            except (ValueError, TypeError):
+                return None
+
+        # Handle datetime objects
+        if hasattr(obj, 'isoformat') and callable(getattr(obj, 'isoformat')):
+            return obj.isoformat()
+
+        # Convert to string as last resort
+        try:
+            return str(obj)
+        except Exception:
+            return None
+
+    except Exception as e:
+        logging.error(f"Error cleaning object for JSON: {str(e)}, type: {type(obj)}, value: {str(obj)[:200] if obj is not None else 'None'}")
+        return None
+
+
+# Handlers by exact type; subclasses and unknown types go through _generic
+_HANDLERS: Dict[type, Callable[[Any], Any]] = {
+    type(None): _none,
+    str: _identity,
+    int: _identity,
+    bool: _identity,
+    float: _float,
+    dict: _dict,
+    list: _list,
+    tuple: _list,
+    set: _list,
+    _NaTType: _none,
+    pd.Timestamp: _timestamp,
+    _dt.datetime: _timestamp,
+    _dt.date: _timestamp,
+    _dt.time: _timestamp,
+    pd.DataFrame: _frame,
+    pd.Series: _series,
+    np.float64: _numpy_float,
+    np.float32: _numpy_float,
+    np.int64: _numpy_item,
+    np.int32: _numpy_item,
+    np.bool_: _numpy_item,
+    np.datetime64: _numpy_datetime,
+    np.str_: _numpy_str,
+}
+
+
+def to_jsonable(obj: Any) -> Any:
+    """
+    Convert a value to plain JSON types.
+
+    Args:
+        obj: Value to convert (dicts, lists, DataFrames, NumPy/pandas scalars, ...)
+
+    Returns:
+        JSON-serializable version of the object
+    """
+    handler = _HANDLERS.get(type(obj))
+    if handler is not None:
+        return handler(obj)
+    return _generic(obj)
+
+
+def _encoder_options() -> Dict[str, Any]:
+    """json.dumps options matching ``jsonify`` for the current app."""
+    provider = current_app.json
+    options = {
+        'ensure_ascii': getattr(provider, 'ensure_ascii', True),
+        'sort_keys': getattr(provider, 'sort_keys', True),
+        'default': getattr(provider, 'default', None),
+    }
+    compact = getattr(provider, 'compact', None)
+    if (compact is None and current_app.debug) or compact is False:
+        options['indent'] = 2
+    else:
+        options['separators'] = (',', ':')
+    return options
+
+
+def _shallow_dict(obj: dict) -> Optional[Dict[str, Tuple[Any, bool]]]:
+    """``to_jsonable`` for one dict level: keys and other values converted, nested dicts and lists left for streaming.
+
+    Each value is paired with whether it is already converted, so it is not
+    converted a second time (the conversion is not idempotent, e.g. for
+    ``rule invoked`` lists).
+    """
+    cleaned = {}
+    for key, value in obj.items():
+        key = key if type(key) is str else str(key)
+        if key.lower() == 'rule invoked':
+            try:
+                blank = _rule_invoked_blank(value)
+            except Exception as e:
+                logging.error(f"Error cleaning object for JSON: {str(e)}, type: {type(obj)}, value: {str(obj)[:200]}")
+                return None
+            if blank:
+                cleaned[key] = (None, True)
+                continue
+        cleaned[key] = (value, False) if type(value) in (dict, list) else (to_jsonable(value), True)
+    return cleaned
+
+
+def _iter_encode(obj: Any, encode: Callable[[Any], str], sort_keys: bool, plain: bool) -> Iterator[str]:
+    """JSON text for ``obj`` in pieces: dicts key by key, lists item by item."""
+    if type(obj) is dict:
+        if plain:
+            entries = {key: (value, True) for key, value in obj.items()}
+        else:
+            entries = _shallow_dict(obj)
+            if entries is None:
+                yield 'null'
+                return
+        yield '{'
+        items = entries.items()
+        for index, (key, (value, converted)) in enumerate(sorted(items) if sort_keys else items):
+            yield (',' if index else '') + encode(key) + ':'
+            yield from _iter_encode(value, encode, sort_keys, converted)
+        yield '}'
+    elif type(obj) is list:
+        yield '['
+        for index, item in enumerate(obj):
+            if index:
+                yield ','
+            yield encode(item if plain else to_jsonable(item))
+        yield ']'
+    else:
+        yield encode(obj if plain else to_jsonable(obj))
+
+
+def iter_json(obj: Any, chunk_bytes: int = CHUNK_BYTES, plain: bool = False, **options: Any) -> Iterator[str]:
+    """
+    Serialize ``obj`` as compact JSON in chunks of roughly ``chunk_bytes``.
+
+    Args:
+        obj: Value to serialize; converted with ``to_jsonable`` as it is written
+        chunk_bytes: Characters buffered before a chunk is yielded
+        plain: ``obj`` already holds only JSON types with string keys
+            (e.g. it came from ``to_jsonable``), so it is not converted again
+        **options: ``json.JSONEncoder`` options (``ensure_ascii``, ``sort_keys``, ``default``)
+
+    Yields:
+        Pieces of the document, ending with a newline
+    """
+    options.pop('indent', None)
+    options['separators'] = (',', ':')
+    encode = json.JSONEncoder(**options).encode
+
+    buffer: List[str] = []
+    size = 0
+    for piece in _iter_encode(obj, encode, options.get('sort_keys', False), plain):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    buffer.append('\n')
+    yield ''.join(buffer)
+
+
+def dumps(obj: Any, **options: Any) -> str:
+    """``to_jsonable`` followed by ``json.dumps``."""
+    return json.dumps(to_jsonable(obj), **options)
+
+
+def json_response(obj: Any, status: int = 200, stream: bool = True, plain: bool = False) -> Response:
+    """
+    Build a JSON response with the same body ``jsonify`` would produce.
+
+    Args:
+        obj: Value to serialize
+        status: HTTP status code
+        stream: Write the body in chunks instead of building it first
+            (not used when ``app.json`` pretty-prints, e.g. in debug mode)
+        plain: ``obj`` already holds only JSON types, skip ``to_jsonable``
+
+    Returns:
+        Flask response with the app's JSON mimetype
+    """
+    options = _encoder_options()
+    mimetype = getattr(current_app.json, 'mimetype', 'application/json')
+    if not stream or 'indent' in options:
+        body = json.dumps(obj, **options) if plain else dumps(obj, **options)
+        return current_app.response_class(f"{body}\n", status=status, mimetype=mimetype)
+    return current_app.response_class(
+        stream_with_context(iter_json(obj, plain=plain, **options)), status=status, mimetype=mimetype
+    )
+
+
+def iter_ndjson(batches: Iterable[List[Any]], plain: bool = False, **options: Any) -> Iterator[str]:
+    """
+    Serialize batches of values as newline-delimited JSON, one piece per batch.
+
+    Args:
+        batches: Lists of values; each value becomes one line
+        plain: The values already hold only JSON types, skip ``to_jsonable``
+        **options: ``json.JSONEncoder`` options (``ensure_ascii``, ``sort_keys``, ``default``)
+
+    Yields:
+        The lines of one batch
+    """
+    options.pop('indent', None)
+    options['separators'] = (',', ':')
+    encode = json.JSONEncoder(**options).encode
+    for batch in batches:
+        if batch:
+            yield ''.join(f"{encode(item if plain else to_jsonable(item))}\n" for item in batch)
+
+
+def ndjson_response(batches: Iterable[List[Any]], status: int = 200, plain: bool = False) -> Response:
+    """
+    Build a streamed ``application/x-ndjson`` response.
+
+    Args:
+        batches: Lists of values, written as they are produced
+        status: HTTP status code
+        plain: The values already hold only JSON types, skip ``to_jsonable``
+
+    Returns:
+        Flask response; one line per value
+    """
+    return current_app.response_class(
+        stream_with_context(iter_ndjson(batches, plain=plain, **_encoder_options())),
+        status=status, mimetype=NDJSON_MIMETYPE
+    )
@@ -1,22 +1,72 @@
 from __future__ import annotations
 import os
+import json
+import uuid
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Dict, Any, Optional, List, Iterable
 
 from neo4j import GraphDatabase, Driver
 
+from .query_stats import run_query, execute_write
+from .circuit_breaker import get_neo4j_breaker
+
+
+# Constraints and indexes; the uniqueness constraints also index their property
+SCHEMA_STATEMENTS = [
+    """
+    CREATE CONSTRAINT account_number IF NOT EXISTS
+    FOR (a:Account) REQUIRE a.number IS UNIQUE
+    """,
+    """
+    CREATE CONSTRAINT violation_id IF NOT EXISTS
+    FOR (v:Violation) REQUIRE v.id IS UNIQUE
+    """,
+    """
+    CREATE CONSTRAINT person_id IF NOT EXISTS
+    FOR (p:Person) REQUIRE p.id IS UNIQUE
+    """,
+    """
+    CREATE INDEX violation_sl_page IF NOT EXISTS
+    FOR (v:Violation) ON (v.slNo, v.page)
+    """,
+    """
+    CREATE INDEX transaction_id IF NOT EXISTS
+    FOR (t:Transaction) ON (t.transaction_id)
+    """,
+    """
+    CREATE CONSTRAINT account_month_key IF NOT EXISTS
+    FOR (m:AccountMonth) REQUIRE m.key IS UNIQUE
+    """,
+    """
+    CREATE CONSTRAINT fines_trend_month IF NOT EXISTS
+    FOR (m:FinesTrendMonth) REQUIRE m.month IS UNIQUE
+    """,
+]
+
 
 class Neo4jClient:
     """Thin wrapper around neo4j.Driver with convenience upsert for violations.
 
-    If required environment variables are missing, the client is disabled and
-    calls become no-ops to avoid breaking the existing application flow.
+    If required environment variables are missing, or the Neo4j circuit
+    breaker is open, the client is disabled and calls become no-ops to avoid
+    breaking the existing application flow.
     """
 
+    # The module-level helpers dispatch to MemoryGraphClient when this is True
+    in_memory = False
+
     def __init__(self, uri: Optional[str], user: Optional[str], password: Optional[str], database: Optional[str] = None):
-        self._enabled = bool(uri and user and password)
+        # Connection settings present; the client may still be disabled by the breaker
+        self.configured = bool(uri and user and password)
+        self._enabled = self.configured
         self._driver: Optional[Driver] = None
         self._database = database or 'neo4j'  # Default to 'neo4j' if not specified
+        if self._enabled and not get_neo4j_breaker().allow():
+            # Database known to be down; skip the driver so callers fail fast
+            logging.debug("Neo4j circuit breaker open; client disabled")
+            self._enabled = False
         if self._enabled:
             self._driver = GraphDatabase.driver(uri, auth=(user, password))
             
@@ -39,68 +89,286 @@ class Neo4jClient:
         if not self._enabled or not self._driver:
             return
             
+        # The driver accepts one statement per run, so apply them individually
         with self._driver.session(database=self._database) as session:
-            # Create constraints for uniqueness
-            session.run("""
-                CREATE CONSTRAINT account_number IF NOT EXISTS 
-                FOR (a:Account) REQUIRE a.number IS UNIQUE;
-                
-                CREATE CONSTRAINT violation_id IF NOT EXISTS
-                FOR (v:Violation) REQUIRE v.id IS UNIQUE;
-                
-                CREATE CONSTRAINT person_id IF NOT EXISTS
-                FOR (p:Person) REQUIRE p.id IS UNIQUE;
-                
-                CREATE INDEX transaction_id IF NOT EXISTS
-                FOR (t:Transaction) ON (t.transaction_id);
-                
-                CREATE INDEX account_number_idx IF NOT EXISTS
-                FOR (a:Account) ON (a.number);
-            """)
+            for statement in SCHEMA_STATEMENTS:
+                try:
+                    run_query(session, 'graph.schema', statement, profile=False)
+                except Exception as e:
+                    logging.warning(f"Schema statement failed: {statement.strip().splitlines()[0]}: {e}")
 
     def upsert_violation(self, record: Dict[str, Any]) -> None:
         if not self._enabled or not self._driver:
             logging.info("Neo4j not enabled or driver not initialized. Skipping write.")
             return
-        has_penalty = (
-            record.get("penMin") is not None or record.get("penMax") is not None
-        )
-        if has_penalty: 
-            cypher = (
-                """
-                MERGE (c:Circular {name: $circular})
-                MERGE (v:Violation {slNo: $slNo, page: toInteger($page)})
-                  ON CREATE SET v.type = $violationType
-                  ON MATCH  SET v.type = coalesce($violationType, v.type)
-                MERGE (p:PenaltyRange {min: $penMin, max: $penMax, currency: $currency})
-                MERGE (l:LegalProvision {text: coalesce($legal, '')})
-                MERGE (r:Reason {text: coalesce($reason, '')})
-                MERGE (c)-[:HAS_VIOLATION]->(v)
-                MERGE (v)-[:PENALTY_IN_RANGE]->(p)
-                MERGE (v)-[:INVOKES]->(l)
-                MERGE (v)-[:HAS_REASON]->(r)
-                """
-            )
-        else:
-            cypher = (
-                """
-                MERGE (c:Circular {name: $circular})
-                MERGE (v:Violation {slNo: $slNo, page: toInteger($page)})
-                  ON CREATE SET v.type = $violationType
-                  ON MATCH  SET v.type = coalesce($violationType, v.type)
-                MERGE (l:LegalProvision {text: coalesce($legal, '')})
-                MERGE (r:Reason {text: coalesce($reason, '')})
-                MERGE (c)-[:HAS_VIOLATION]->(v)
-                MERGE (v)-[:INVOKES]->(l)
-                MERGE (v)-[:HAS_REASON]->(r)
-                """
-            )
         logging.info(f"Cypher parameters for upsert_violation: {record}")
-        with self._driver.session(database=self._database) as session:
-            session.execute_write(lambda tx: tx.run(cypher, **record))
+        upsert_violations(self, [record])
+
+
+# Rows per UNWIND when comparing fingerprints against the graph
+FINGERPRINT_BATCH_SIZE = 5000
+
+
+def content_fingerprint(values: Dict[str, Any], fields: tuple) -> str:
+    """Stable hash of the given fields of a record.
+
+    Stored on the node as ``fingerprint`` so re-ingesting an identical record
+    can be detected and skipped.
+    """
+    payload = json.dumps([values.get(field) for field in fields], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def find_unchanged(session, name: str, query: str, rows: List[Dict[str, Any]]) -> set:
+    """Bulk-compare fingerprints and return the indexes of unchanged rows.
+
+    Args:
+        session: Neo4j session
+        name: Query name for the statistics
+        query: Cypher taking ``$rows`` (each with ``idx`` and ``fingerprint``)
+            and returning ``idx`` for every row whose stored fingerprint matches
+        rows: Rows to check
+
+    Returns:
+        Set of ``idx`` values that need no write
+    """
+    unchanged = set()
+    for start in range(0, len(rows), FINGERPRINT_BATCH_SIZE):
+        chunk = rows[start:start + FINGERPRINT_BATCH_SIZE]
+        unchanged.update(item['idx'] for item in run_query(session, name, query, rows=chunk))
+    return unchanged
+
+
+# Fields that make up a violation upsert's fingerprint
+VIOLATION_FINGERPRINT_FIELDS = ('circular', 'slNo', 'page', 'violationType', 'penMin', 'penMax', 'currency',
+                                'legal', 'reason')
+
+_VIOLATIONS_UNCHANGED = """
+UNWIND $rows AS row
+MATCH (v:Violation {slNo: row.slNo, page: toInteger(row.page)})
+WHERE v.fingerprint = row.fingerprint
+RETURN row.idx AS idx
+"""
+
+# Batched form of Neo4jClient.upsert_violation: one statement for many records,
+# with the penalty range merged only for rows that have one
+UPSERT_VIOLATIONS_BATCH = """
+UNWIND $rows AS row
+MERGE (c:Circular {name: row.circular})
+MERGE (v:Violation {slNo: row.slNo, page: toInteger(row.page)})
+  ON CREATE SET v.type = row.violationType
+  ON MATCH  SET v.type = coalesce(row.violationType, v.type)
+SET v.fingerprint = row.fingerprint
+MERGE (l:LegalProvision {text: coalesce(row.legal, '')})
+MERGE (r:Reason {text: coalesce(row.reason, '')})
+MERGE (c)-[:HAS_VIOLATION]->(v)
+MERGE (v)-[:INVOKES]->(l)
+MERGE (v)-[:HAS_REASON]->(r)
+FOREACH (_ IN CASE WHEN row.penMin IS NOT NULL OR row.penMax IS NOT NULL THEN [1] ELSE [] END |
+    MERGE (p:PenaltyRange {min: row.penMin, max: row.penMax, currency: row.currency})
+    MERGE (v)-[:PENALTY_IN_RANGE]->(p)
+)
+"""
+
+
+def upsert_violations(client: Neo4jClient, records: List[Dict[str, Any]]) -> None:
+    """Upsert many violation records in a single write transaction.
+
+    Records whose fingerprint matches the one stored on the violation by a
+    previous load are skipped.
+
+    Args:
+        client: Neo4j client instance
+        records: Records in the shape accepted by ``Neo4jClient.upsert_violation``
+    """
+    if not records:
+        return
+    if client.in_memory:
+        for record in records:
+            client.upsert_violation(record)
+        return
+    if not client.enabled or not client._driver:
+        logging.info("Neo4j not enabled or driver not initialized. Skipping write.")
+        return
+
+    rows = []
+    for idx, record in enumerate(records):
+        row = {field: record.get(field) for field in VIOLATION_FINGERPRINT_FIELDS}
+        row.update(idx=idx, fingerprint=content_fingerprint(row, VIOLATION_FINGERPRINT_FIELDS))
+        rows.append(row)
+
+    with client._driver.session(database=client._database) as session:
+        unchanged = find_unchanged(session, 'graph.violations_unchanged', _VIOLATIONS_UNCHANGED, rows)
+    if unchanged:
+        logging.info(f"Skipping {len(unchanged)} unchanged violation record(s)")
+        rows = [row for row in rows if row['idx'] not in unchanged]
+    if not rows:
+        return
+
+    def _write(tx):
+        run_query(tx, 'graph.upsert_violations_batch', UPSERT_VIOLATIONS_BATCH, rows=rows)
+        _update_fines_rollup(
+            tx, "UNWIND $rows AS row MATCH (v:Violation {slNo: row.slNo, page: toInteger(row.page)})",
+            rows=rows)
+
+    with client._driver.session(database=client._database) as session:
+        execute_write(session, _write)
+    notify_graph_write()
+
+
+# Bucket key for violations without a date; reported as a null date like before
+UNDATED_MONTH = 'undated'
+
+# Re-derives the fines contribution of each matched violation `v` and moves it
+# between FinesTrendMonth buckets. The previous contribution is remembered on
+# the violation (fines_month/fines_amount), so replaying an upsert is a no-op.
+_FINES_ROLLUP_UPDATE = """
+WITH v
+CALL {
+    WITH v
+    OPTIONAL MATCH (v)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
+    RETURN count(p) AS penalties, coalesce(sum(p.max), 0) AS amount
+}
+WITH v, amount,
+     CASE WHEN penalties = 0 THEN null
+          WHEN v.date IS NULL THEN $undated
+          ELSE substring(toString(v.date), 0, 7) END AS month,
+     v.fines_month AS old_month,
+     coalesce(v.fines_amount, 0) AS old_amount
+CALL {
+    WITH old_month, old_amount
+    MATCH (m:FinesTrendMonth {month: old_month})
+    SET m.total = m.total - old_amount,
+        m.violations = m.violations - 1
+}
+CALL {
+    WITH month, amount
+    WITH month, amount WHERE month IS NOT NULL
+    MERGE (m:FinesTrendMonth {month: month})
+      ON CREATE SET m.total = 0, m.violations = 0
+    SET m.total = m.total + amount,
+        m.violations = m.violations + 1
+}
+SET v.fines_month = month,
+    v.fines_amount = CASE WHEN month IS NULL THEN null ELSE amount END
+"""
+
+
+def _update_fines_rollup(tx, match_clause: str, **params) -> None:
+    """Refresh the monthly fines rollup for the violations selected by ``match_clause``."""
+    run_query(tx, 'graph.fines_rollup_update', match_clause + _FINES_ROLLUP_UPDATE, undated=UNDATED_MONTH, **params)
+
+
+def get_fines_trend(client: Neo4jClient) -> List[Dict[str, Any]]:
+    """Return the fines trend from the monthly rollup nodes.
+
+    Returns:
+        List of dicts with keys: date (``YYYY-MM`` or None for undated
+        violations) and amount, ordered by month
+    """
+    if client.in_memory:
+        return client.get_fines_trend()
+    if not client.enabled or not client._driver:
+        return []
+
+    query = """
+    MATCH (m:FinesTrendMonth)
+    WHERE m.violations > 0
+    RETURN m.month AS month, m.total AS total
+    ORDER BY month
+    """
+    with client._driver.session(database=client._database) as session:
+        result = run_query(session, 'graph.fines_trend', query)
+    return [
+        {'date': None if item['month'] == UNDATED_MONTH else item['month'],
+         'amount': float(item['total'] or 0)}
+        for item in result
+    ]
+
+
+def rebuild_fines_trend(client: Neo4jClient) -> int:
+    """Recompute all FinesTrendMonth rollups from the violation graph.
+
+    Returns:
+        Number of month buckets written
+    """
+    if client.in_memory:
+        # Trend buckets are computed on read, so there is nothing to rebuild
+        return len(client.get_fines_trend())
+    if not client.enabled or not client._driver:
+        return 0
+
+    with client._driver.session(database=client._database) as session:
+        run_query(session, 'graph.fines_rollup_clear', "MATCH (m:FinesTrendMonth) DETACH DELETE m")
+        run_query(session, 'graph.fines_rollup_reset', """
+        MATCH (v:Violation) WHERE v.fines_month IS NOT NULL
+        CALL {
+            WITH v
+            REMOVE v.fines_month, v.fines_amount
+        } IN TRANSACTIONS OF 10000 ROWS
+        """)
+        rows = run_query(session, 'graph.fines_rollup_rebuild', """
+        MATCH (v:Violation)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
+        WITH v, sum(p.max) AS amount
+        WITH v, amount,
+             CASE WHEN v.date IS NULL THEN $undated
+                  ELSE substring(toString(v.date), 0, 7) END AS month
+        SET v.fines_month = month, v.fines_amount = amount
+        WITH month, sum(amount) AS total, count(v) AS violations
+        MERGE (m:FinesTrendMonth {month: month})
+        SET m.total = total, m.violations = violations
+        RETURN count(m) AS months
+        """, undated=UNDATED_MONTH)
+    notify_graph_write()
+    return rows[0]['months'] if rows else 0
+
+
+# Advanced by every write this process makes; the epoch tells processes
+# (and restarts) apart, since each starts counting again
+_write_generation = 0
+_write_generation_lock = threading.Lock()
+_WRITE_EPOCH = uuid.uuid4().hex[:12]
+
+
+def notify_graph_write() -> None:
+    """Invalidate cached graph statistics after one of our own writes."""
+    global _write_generation
+    with _write_generation_lock:
+        _write_generation += 1
+    from .stats import invalidate_graph_stats
+    invalidate_graph_stats()
+
+
+def graph_write_generation() -> str:
+    """Token that changes whenever this process writes to the graph, and on restart."""
+    with _write_generation_lock:
+        return f"{_WRITE_EPOCH}:{_write_generation}"
+
+
+def _probe_connectivity() -> None:
+    """Circuit breaker recovery probe; raises while Neo4j is unreachable."""
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME")
+    password = os.getenv("NEO4J_PASSWORD")
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        driver.verify_connectivity()
+    finally:
+        driver.close()
+
+
+get_neo4j_breaker().set_probe(_probe_connectivity)
+
+
+def using_memory_backend() -> bool:
+    """True when ``GRAPH_BACKEND=memory`` selects the in-process graph store."""
+    return os.getenv("GRAPH_BACKEND", "neo4j").strip().lower() == "memory"
 
 
 def get_client_from_env() -> Neo4jClient:
+    if using_memory_backend():
+        from .memory_graph import get_memory_graph
+        return get_memory_graph()
     uri = os.getenv("NEO4J_URI")
     # Support both NEO4J_USER and NEO4J_USERNAME
     user = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME")
@@ -110,12 +378,114 @@ def get_client_from_env() -> Neo4jClient:
 
 
 
+# Lookup queries shared by the sync helpers below and app.utils.graph_async
+VIOLATIONS_BY_DESCRIPTION_QUERY = """
+MATCH (v:Violation)
+WHERE toLower(v.type) CONTAINS toLower($desc)
+OPTIONAL MATCH (p:Person)-[:RESPONSIBLE_FOR|ASSOCIATED_WITH|INVOLVED_IN*1..2]->(v)
+RETURN v.type AS violationType,
+       p.name AS personName,
+       p.id AS personId,
+       p.email AS personEmail,
+       p.phone AS personPhone
+LIMIT 5
+"""
+
+VIOLATIONS_BY_ACCOUNT_DESCRIPTION_QUERY = """
+MATCH (v:Violation)
+OPTIONAL MATCH (a:Account {number: $acct})-[:HAS_TRANSACTION|ASSOCIATED_WITH*0..2]->(t:Transaction)
+WHERE toLower(t.description) CONTAINS toLower($desc)
+   OR toLower(v.type) CONTAINS toLower($desc)
+OPTIONAL MATCH (p:Person)-[:OWNS|ASSOCIATED_WITH]->(a)
+RETURN DISTINCT v.type AS violationType,
+                p.name AS personName,
+                p.id AS personId,
+                p.email AS personEmail,
+                p.phone AS personPhone
+LIMIT 5
+"""
+
+VIOLATIONS_BY_ACCOUNT_QUERY = """
+MATCH (a:Account {number: $account_number})-[:HAS_VIOLATION]->(v:Violation)
+OPTIONAL MATCH (v)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
+OPTIONAL MATCH (v)-[:INVOKES]->(l:LegalProvision)
+OPTIONAL MATCH (v)-[:IN_CIRCULAR]->(c:Circular)
+OPTIONAL MATCH (v)-[:HAS_REASON]->(r:Reason)
+OPTIONAL MATCH (v)-[:VIOLATED_BY]->(per:Person)
+RETURN DISTINCT
+    v.type as violationType,
+    l.text as legalProvision,
+    c.name as circular,
+    p.min as penMin,
+    p.max as penMax,
+    r.text as reason,
+    per.name as personName,
+    per.id as personId,
+    per.email as personEmail,
+    per.phone as personPhone
+"""
+
+VIOLATIONS_BY_ACCOUNTS_QUERY = """
+UNWIND $account_numbers AS account_number
+MATCH (a:Account {number: account_number})-[:HAS_VIOLATION]->(v:Violation)
+OPTIONAL MATCH (v)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
+OPTIONAL MATCH (v)-[:INVOKES]->(l:LegalProvision)
+OPTIONAL MATCH (v)-[:IN_CIRCULAR]->(c:Circular)
+OPTIONAL MATCH (v)-[:HAS_REASON]->(r:Reason)
+OPTIONAL MATCH (v)-[:VIOLATED_BY]->(per:Person)
+RETURN DISTINCT
+    account_number as accountNumber,
+    v.type as violationType,
+    l.text as legalProvision,
+    c.name as circular,
+    p.min as penMin,
+    p.max as penMax,
+    r.text as reason,
+    per.name as personName,
+    per.id as personId,
+    per.email as personEmail,
+    per.phone as personPhone
+"""
+
+# Accounts per UNWIND in find_violations_by_accounts
+ACCOUNT_BATCH_SIZE = 5000
+
+VIOLATIONS_BY_TYPE_QUERY = """
+MATCH (v:Violation)
+WHERE toLower(v.type) CONTAINS toLower($vtype)
+   OR toLower($vtype) CONTAINS toLower(v.type)
+OPTIONAL MATCH (v)-[:INVOKES]->(l:LegalProvision)
+OPTIONAL MATCH (p:Person)-[:RESPONSIBLE_FOR|:ASSOCIATED_WITH|:INVOLVED_IN*1..2]->(v)
+RETURN DISTINCT v.type AS violationType,
+                coalesce(l.text, l.name, '') AS legalProvision,
+                p.name AS personName,
+                p.id AS personId,
+                p.email AS personEmail,
+                p.phone AS personPhone
+LIMIT 10
+"""
+
+
+def dedupe_matches(results: List[Dict[str, Any]], key_fields: tuple) -> List[Dict[str, Any]]:
+    """Drop repeated matches, keeping the first occurrence of each key."""
+    seen = set()
+    deduped: List[Dict[str, Any]] = []
+    for item in results:
+        key = tuple(item.get(field) for field in key_fields)
+        if key not in seen:
+            seen.add(key)
+            deduped.append(item)
+    return deduped
+
+
 def find_violations_for_transaction(client: Neo4jClient, account_number: Optional[str], description: str) -> List[Dict[str, Any]]:
     """Attempt to find violations and associated persons for a given transaction description.
 
     Tries a couple of generic patterns to accommodate unknown graph schemas.
     Returns a list of dicts with keys: violationType, personName, personId, personEmail, personPhone.
     """
+    if client.in_memory:
+        return client.find_violations_for_transaction(account_number, description)
     if not client.enabled:
         logging.info("Neo4j not enabled; returning empty matches.")
         return []
@@ -125,54 +495,18 @@ def find_violations_for_transaction(client: Neo4jClient, account_number: Optiona
     try:
         with client._driver.session(database=client._database) as session:
             # Pattern 1: Match by violation type text similarity/contains
-            query1 = (
-                """
-                MATCH (v:Violation)
-                WHERE toLower(v.type) CONTAINS toLower($desc)
-                OPTIONAL MATCH (p:Person)-[:RESPONSIBLE_FOR|ASSOCIATED_WITH|INVOLVED_IN*1..2]->(v)
-                RETURN v.type AS violationType,
-                       p.name AS personName,
-                       p.id AS personId,
-                       p.email AS personEmail,
-                       p.phone AS personPhone
-                LIMIT 5
-                """
-            )
-            for r in session.run(query1, desc=desc):
-                results.append(dict(r))
+            results.extend(run_query(session, 'graph.violations_by_description', VIOLATIONS_BY_DESCRIPTION_QUERY, desc=desc))
 
             # Pattern 2: If account is available, try to find via Account->Transaction linkage
             if acct:
-                query2 = (
-                    """
-                    MATCH (v:Violation)
-                    OPTIONAL MATCH (a:Account {number: $acct})-[:HAS_TRANSACTION|ASSOCIATED_WITH*0..2]->(t:Transaction)
-                    WHERE toLower(t.description) CONTAINS toLower($desc)
-                       OR toLower(v.type) CONTAINS toLower($desc)
-                    OPTIONAL MATCH (p:Person)-[:OWNS|ASSOCIATED_WITH]->(a)
-                    RETURN DISTINCT v.type AS violationType,
-                                    p.name AS personName,
-                                    p.id AS personId,
-                                    p.email AS personEmail,
-                                    p.phone AS personPhone
-                    LIMIT 5
-                    """
-                )
-                for r in session.run(query2, acct=acct, desc=desc):
-                    results.append(dict(r))
+                results.extend(run_query(session, 'graph.violations_by_account_description',
+                                         VIOLATIONS_BY_ACCOUNT_DESCRIPTION_QUERY, acct=acct, desc=desc))
     except Exception as e:
         logging.error(f"Neo4j find_violations_for_transaction error: {e}")
         return []
 
     # Deduplicate by (violationType, personName, personId)
-    seen = set()
-    deduped: List[Dict[str, Any]] = []
-    for item in results:
-        key = (item.get('violationType'), item.get('personName'), item.get('personId'))
-        if key not in seen:
-            seen.add(key)
-            deduped.append(item)
-    return deduped
+    return dedupe_matches(results, ('violationType', 'personName', 'personId'))
 
 
 def find_violations_by_account(client: Neo4jClient, account_number: str) -> List[Dict[str, Any]]:
@@ -189,36 +523,49 @@ def find_violations_by_account(client: Neo4jClient, account_number: str) -> List
     """
     if not client.enabled or not account_number:
         return []
-        
-    query = """
-    MATCH (a:Account {number: $account_number})-[:HAS_VIOLATION]->(v:Violation)
-    OPTIONAL MATCH (v)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
-    OPTIONAL MATCH (v)-[:INVOKES]->(l:LegalProvision)
-    OPTIONAL MATCH (v)-[:IN_CIRCULAR]->(c:Circular)
-    OPTIONAL MATCH (v)-[:HAS_REASON]->(r:Reason)
-    OPTIONAL MATCH (v)-[:VIOLATED_BY]->(per:Person)
-    RETURN DISTINCT
-        v.type as violationType,
-        l.text as legalProvision,
-        c.name as circular,
-        p.min as penMin,
-        p.max as penMax,
-        r.text as reason,
-        per.name as personName,
-        per.id as personId,
-        per.email as personEmail,
-        per.phone as personPhone
-    """
+    if client.in_memory:
+        return client.find_violations_by_account(account_number)
     
     try:
-        with client._driver.session() as session:
-            result = session.run(query, account_number=account_number)
-            return [dict(record) for record in result]
+        with client._driver.session(database=client._database) as session:
+            return run_query(session, 'graph.violations_by_account', VIOLATIONS_BY_ACCOUNT_QUERY, account_number=account_number)
     except Exception as e:
         logging.error(f"Error querying violations by account: {e}")
         return []
 
 
+
+def find_violations_by_accounts(client: Neo4jClient, account_numbers: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Find violations for many account numbers with one UNWIND query per batch.
+    
+    Args:
+        client: Neo4j client instance
+        account_numbers: Account numbers to search for; duplicates and blanks are ignored
+        
+    Returns:
+        Dictionary mapping each distinct account number to its violations, with
+        the same keys as ``find_violations_by_account``; accounts without
+        violations map to an empty list
+    """
+    accounts = list(dict.fromkeys(a for a in account_numbers if a))
+    if not client.enabled or not accounts:
+        return {}
+    if client.in_memory:
+        return {account: client.find_violations_by_account(account) for account in accounts}
+    
+    found: Dict[str, List[Dict[str, Any]]] = {account: [] for account in accounts}
+    try:
+        with client._driver.session(database=client._database) as session:
+            for start in range(0, len(accounts), ACCOUNT_BATCH_SIZE):
+                rows = run_query(session, 'graph.violations_by_accounts', VIOLATIONS_BY_ACCOUNTS_QUERY,
+                                 account_numbers=accounts[start:start + ACCOUNT_BATCH_SIZE])
+                for row in rows:
+                    found[row.pop('accountNumber')].append(row)
+    except Exception as e:
+        logging.error(f"Error querying violations by accounts: {e}")
+        return {}
+    return found
+
 def process_kyc_data(client: Neo4jClient, kyc_data: List[Dict[str, Any]]) -> None:
     """Process KYC data and load into Neo4j.
     
@@ -232,12 +579,36 @@ def process_kyc_data(client: Neo4jClient, kyc_data: List[Dict[str, Any]]) -> Non
             - transaction_id: Related transaction ID
             - date: Date of the violation
     """
+    if client.in_memory:
+        client.process_kyc_data(kyc_data)
+        notify_graph_write()
+        return
     if not client.enabled or not client._driver:
         return
 
     with client._driver.session(database=client._database) as session:
-        for record in kyc_data:
-            session.execute_write(_create_kyc_violation, record)
+        rows = [{'idx': idx, 'id': record.get('transaction_id'), 'fingerprint': _kyc_fingerprint(record)}
+                for idx, record in enumerate(kyc_data)]
+        unchanged = find_unchanged(session, 'graph.kyc_unchanged', _KYC_UNCHANGED, rows)
+        if unchanged:
+            logging.info(f"Skipping {len(unchanged)} unchanged KYC record(s)")
+        for idx, record in enumerate(kyc_data):
+            if idx not in unchanged:
+                execute_write(session, _create_kyc_violation, record)
+    notify_graph_write()
+
+# Fields that make up a KYC record's fingerprint
+KYC_FINGERPRINT_FIELDS = ('account_number', 'customer_name', 'kyc_verified', 'transaction_id', 'violation_type', 'date')
+
+_KYC_UNCHANGED = """
+UNWIND $rows AS row
+MATCH (v:Violation {id: row.id})
+WHERE v.fingerprint = row.fingerprint
+RETURN row.idx AS idx
+"""
+
+def _kyc_fingerprint(record: Dict[str, Any]) -> str:
+    return content_fingerprint(dict(record, kyc_verified=record.get('kyc_verified', 'No')), KYC_FINGERPRINT_FIELDS)
 
 def _create_kyc_violation(tx, record):
     query = """
@@ -252,6 +623,7 @@ def _create_kyc_violation(tx, record):
     SET v.type = $violation_type,
         v.date = date($date),
         v.status = 'ACTIVE',
+        v.fingerprint = $fingerprint,
         v.last_updated = datetime()
     
     // Create relationship between account and violation
@@ -270,13 +642,17 @@ def _create_kyc_violation(tx, record):
     MERGE (v)-[vp:VIOLATED_BY]->(p)
     SET vp.since = date()
     """
-    tx.run(query, 
-           account_number=record.get('account_number'),
-           customer_name=record.get('customer_name'),
-           kyc_verified=record.get('kyc_verified', 'No'),
-           transaction_id=record.get('transaction_id'),
-           violation_type=record.get('violation_type'),
-           date=record.get('date'))
+    run_query(tx, 'graph.create_kyc_violation', query,
+              account_number=record.get('account_number'),
+              customer_name=record.get('customer_name'),
+              kyc_verified=record.get('kyc_verified', 'No'),
+              transaction_id=record.get('transaction_id'),
+              violation_type=record.get('violation_type'),
+              date=record.get('date'),
+              fingerprint=_kyc_fingerprint(record))
+    # The violation date may have moved it to another trend month
+    _update_fines_rollup(tx, "MATCH (v:Violation {id: $transaction_id})",
+                         transaction_id=record.get('transaction_id'))
 
 
 def find_violations_by_type(client: Neo4jClient, violation_type_text: str) -> List[Dict[str, Any]]:
@@ -289,40 +665,18 @@ def find_violations_by_type(client: Neo4jClient, violation_type_text: str) -> Li
         return []
     if not violation_type_text:
         return []
+    if client.in_memory:
+        return client.find_violations_by_type(violation_type_text)
     results: List[Dict[str, Any]] = []
     try:
         with client._driver.session(database=client._database) as session:
-            query = (
-                """
-                MATCH (v:Violation)
-                WHERE toLower(v.type) CONTAINS toLower($vtype)
-                   OR toLower($vtype) CONTAINS toLower(v.type)
-                OPTIONAL MATCH (v)-[:INVOKES]->(l:LegalProvision)
-                OPTIONAL MATCH (p:Person)-[:RESPONSIBLE_FOR|:ASSOCIATED_WITH|:INVOLVED_IN*1..2]->(v)
-                RETURN DISTINCT v.type AS violationType,
-                                coalesce(l.text, l.name, '') AS legalProvision,
-                                p.name AS personName,
-                                p.id AS personId,
-                                p.email AS personEmail,
-                                p.phone AS personPhone
-                LIMIT 10
-                """
-            )
-            for r in session.run(query, vtype=violation_type_text):
-                results.append(dict(r))
+            results.extend(run_query(session, 'graph.violations_by_type', VIOLATIONS_BY_TYPE_QUERY, vtype=violation_type_text))
     except Exception as e:
         logging.error(f"Neo4j find_violations_by_type error: {e}")
         return []
 
     # Deduplicate
-    seen = set()
-    deduped: List[Dict[str, Any]] = []
-    for item in results:
-        key = (item.get('violationType'), item.get('legalProvision'), item.get('personName'), item.get('personId'))
-        if key not in seen:
-            seen.add(key)
-            deduped.append(item)
-    return deduped
+    return dedupe_matches(results, ('violationType', 'legalProvision', 'personName', 'personId'))
 
 
 def get_compliance_rules(client: Neo4jClient) -> List[Dict[str, Any]]:
@@ -339,28 +693,43 @@ def get_compliance_rules(client: Neo4jClient) -> List[Dict[str, Any]]:
         - risk: Risk level (LOW, MEDIUM, HIGH, CRITICAL)
         - condition: Condition to evaluate (if applicable)
     """
-    if not client.enabled or not client._driver:
+    if not client.in_memory and (not client.enabled or not client._driver):
         return []
-        
-    query = """
-    MATCH (r:ComplianceRule)
-    RETURN r.id as id,
-           r.name as name,
-           r.description as description,
-           r.risk as risk,
-           r.condition as condition
-    ORDER BY r.id
-    """
-    
     try:
-        with client._driver.session(database=client._database) as session:
-            result = session.run(query)
-            return [dict(record) for record in result]
+        return fetch_compliance_rules(client)
     except Exception as e:
         logging.error(f"Error fetching compliance rules: {str(e)}")
         return []
 
 
+_COMPLIANCE_RULES = """
+MATCH (r:ComplianceRule)
+RETURN r.id as id,
+       r.name as name,
+       r.description as description,
+       r.risk as risk,
+       r.condition as condition
+ORDER BY r.id
+"""
+
+
+def fetch_compliance_rules(client: Neo4jClient) -> List[Dict[str, Any]]:
+    """Like ``get_compliance_rules`` but lets database errors propagate.
+
+    Callers that cache rules use this to tell "no rules" from "could not read rules".
+    """
+    if client.in_memory:
+        return client.get_compliance_rules()
+    with client._driver.session(database=client._database) as session:
+        return run_query(session, 'graph.compliance_rules', _COMPLIANCE_RULES)
+
+
+def compliance_rules_checksum(rules: List[Dict[str, Any]]) -> str:
+    """Checksum of a rule list; changes whenever any rule is added, removed or edited."""
+    payload = json.dumps(rules, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
 def initialize_compliance_rules(client: Neo4jClient) -> None:
     """Initialize database constraints for compliance rules."""
     if not client.enabled or not client._driver:
@@ -375,7 +744,7 @@ def initialize_compliance_rules(client: Neo4jClient) -> None:
     
     try:
         with client._driver.session(database=client._database) as session:
-            session.run(constraint_query)
+            run_query(session, 'graph.compliance_rule_schema', constraint_query, profile=False)
             logging.info("Successfully created compliance rule constraints")
     except Exception as e:
         logging.error(f"Error initializing compliance rule constraints: {str(e)}")
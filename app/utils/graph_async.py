@@ -0,0 +1,230 @@
+"""
+Async counterpart of ``Neo4jClient`` for fanning out independent reads.
+
+The lookup helpers mirror the ones in ``graph.py`` and run the same Cypher,
+but each query gets its own session so independent reads overlap on the
+wire. ``gather_bounded`` caps how many run at once, and the ``batch_*``
+functions wrap everything in ``asyncio.run`` so synchronous callers such as
+Flask views stay unchanged.
+"""
+from __future__ import annotations
+import os
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List, Iterable, Awaitable, Callable
+
+from neo4j import AsyncGraphDatabase, AsyncDriver
+
+from .graph import (
+    get_client_from_env,
+    using_memory_backend,
+    find_violations_by_account,
+    find_violations_by_type,
+    find_violations_for_transaction,
+    VIOLATIONS_BY_DESCRIPTION_QUERY,
+    VIOLATIONS_BY_ACCOUNT_DESCRIPTION_QUERY,
+    VIOLATIONS_BY_ACCOUNT_QUERY,
+    VIOLATIONS_BY_TYPE_QUERY,
+    dedupe_matches,
+)
+from .query_stats import run_query_async
+from .circuit_breaker import get_neo4j_breaker
+
+# Default cap on in-flight queries per batch
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncNeo4jClient:
+    """Thin wrapper around neo4j.AsyncDriver.
+
+    Like ``Neo4jClient`` it is disabled (and lookups return empty results)
+    when connection settings are missing or the circuit breaker is open.
+    """
+
+    def __init__(self, uri: Optional[str], user: Optional[str], password: Optional[str],
+                 database: Optional[str] = None, max_connection_pool_size: int = 100):
+        self._enabled = bool(uri and user and password) and get_neo4j_breaker().allow()
+        self._driver: Optional[AsyncDriver] = None
+        self._database = database or 'neo4j'  # Default to 'neo4j' if not specified
+        if self._enabled:
+            self._driver = AsyncGraphDatabase.driver(
+                uri, auth=(user, password), max_connection_pool_size=max_connection_pool_size
+            )
+
+    def get_session(self):
+        """Get a new async database session with the configured database name."""
+        if not self._driver:
+            raise RuntimeError("Driver not initialized")
+        return self._driver.session(database=self._database)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self._driver is not None
+
+    async def close(self) -> None:
+        if self._driver:
+            await self._driver.close()
+
+    async def __aenter__(self) -> 'AsyncNeo4jClient':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def fetch(self, name: str, query: str, **params) -> List[Dict[str, Any]]:
+        """Run a named read query in its own session and return the records as dicts."""
+        async with self.get_session() as session:
+            return await run_query_async(session, name, query, **params)
+
+
+def get_async_client_from_env() -> AsyncNeo4jClient:
+    uri = os.getenv("NEO4J_URI")
+    # Support both NEO4J_USER and NEO4J_USERNAME
+    user = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME")
+    password = os.getenv("NEO4J_PASSWORD")
+    database = os.getenv("NEO4J_DATABASE")
+    return AsyncNeo4jClient(uri, user, password, database)
+
+
+def get_max_concurrency() -> int:
+    return max(1, int(os.getenv("NEO4J_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+
+
+async def gather_bounded(awaitables: Iterable[Awaitable[Any]], limit: int) -> List[Any]:
+    """Await all ``awaitables`` with at most ``limit`` running at the same time.
+
+    Results are returned in input order.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(_run(a) for a in awaitables))
+
+
+async def find_violations_for_transaction_async(client: AsyncNeo4jClient, account_number: Optional[str],
+                                                description: str) -> List[Dict[str, Any]]:
+    """Async version of ``graph.find_violations_for_transaction``.
+
+    Both lookup patterns run concurrently instead of back to back.
+    """
+    if not client.enabled:
+        return []
+    desc = description or ""
+    queries = [client.fetch('graph.violations_by_description', VIOLATIONS_BY_DESCRIPTION_QUERY, desc=desc)]
+    if account_number:
+        queries.append(client.fetch('graph.violations_by_account_description',
+                                    VIOLATIONS_BY_ACCOUNT_DESCRIPTION_QUERY, acct=account_number, desc=desc))
+    try:
+        batches = await asyncio.gather(*queries)
+    except Exception as e:
+        logging.error(f"Neo4j find_violations_for_transaction error: {e}")
+        return []
+
+    results = [item for batch in batches for item in batch]
+    return dedupe_matches(results, ('violationType', 'personName', 'personId'))
+
+
+async def find_violations_by_account_async(client: AsyncNeo4jClient, account_number: str) -> List[Dict[str, Any]]:
+    """Async version of ``graph.find_violations_by_account``."""
+    if not client.enabled or not account_number:
+        return []
+    try:
+        return await client.fetch('graph.violations_by_account', VIOLATIONS_BY_ACCOUNT_QUERY,
+                                  account_number=account_number)
+    except Exception as e:
+        logging.error(f"Error querying violations by account: {e}")
+        return []
+
+
+async def find_violations_by_type_async(client: AsyncNeo4jClient, violation_type_text: str) -> List[Dict[str, Any]]:
+    """Async version of ``graph.find_violations_by_type``."""
+    if not client.enabled or not violation_type_text:
+        return []
+    try:
+        results = await client.fetch('graph.violations_by_type', VIOLATIONS_BY_TYPE_QUERY, vtype=violation_type_text)
+    except Exception as e:
+        logging.error(f"Neo4j find_violations_by_type error: {e}")
+        return []
+    return dedupe_matches(results, ('violationType', 'legalProvision', 'personName', 'personId'))
+
+
+def _run_batch(lookup: Callable[..., Awaitable[List[Dict[str, Any]]]], keys: Iterable[Any],
+               concurrency: Optional[int] = None,
+               sync_lookup: Optional[Callable[..., List[Dict[str, Any]]]] = None) -> Dict[Any, List[Dict[str, Any]]]:
+    """Run ``lookup(client, key)`` for every distinct key and map key -> result.
+
+    The async driver is bound to the event loop, so a client is created and
+    closed inside the loop that ``asyncio.run`` starts. With the in-memory
+    backend ``sync_lookup`` is called directly instead.
+    """
+    unique_keys = list(dict.fromkeys(k for k in keys if k))
+    if not unique_keys:
+        return {}
+    if sync_lookup is not None and using_memory_backend():
+        client = get_client_from_env()
+        return {key: sync_lookup(client, key) for key in unique_keys}
+    limit = concurrency or get_max_concurrency()
+
+    async def _main():
+        async with get_async_client_from_env() as client:
+            if not client.enabled:
+                return {key: [] for key in unique_keys}
+            results = await gather_bounded((lookup(client, key) for key in unique_keys), limit)
+            return dict(zip(unique_keys, results))
+
+    return asyncio.run(_main())
+
+
+def batch_find_violations_by_account(account_numbers: Iterable[str],
+                                     concurrency: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Look up violations for many accounts concurrently.
+
+    Returns:
+        Dictionary mapping each distinct account number to its violations
+    """
+    return _run_batch(find_violations_by_account_async, account_numbers, concurrency, find_violations_by_account)
+
+
+def batch_find_violations_by_type(violation_types: Iterable[str],
+                                  concurrency: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Look up violations for many violation types concurrently.
+
+    Returns:
+        Dictionary mapping each distinct violation type to its matches
+    """
+    return _run_batch(find_violations_by_type_async, violation_types, concurrency, find_violations_by_type)
+
+
+def batch_find_violations_for_transactions(transactions: Iterable[Dict[str, Any]],
+                                           concurrency: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    """Run ``find_violations_for_transaction`` for many transactions concurrently.
+
+    Args:
+        transactions: Dicts with keys account_number and description
+
+    Returns:
+        One list of matches per input transaction, in input order
+    """
+    items = list(transactions)
+    if not items:
+        return []
+    if using_memory_backend():
+        client = get_client_from_env()
+        return [find_violations_for_transaction(client, t.get('account_number'), t.get('description', ''))
+                for t in items]
+    limit = concurrency or get_max_concurrency()
+
+    async def _main():
+        async with get_async_client_from_env() as client:
+            if not client.enabled:
+                return [[] for _ in items]
+            return await gather_bounded(
+                (find_violations_for_transaction_async(client, t.get('account_number'), t.get('description', ''))
+                 for t in items),
+                limit
+            )
+
+    return asyncio.run(_main())
@@ -0,0 +1,615 @@
+"""
+Gemini review of uploaded transactions against the RBI compliance rules.
+
+``analyze_transaction`` classifies one transaction per call, the way the
+upload screen always has. ``BatchClassifier`` is the bulk path used by the
+Excel pipeline: it packs ``batch_size`` transactions into one prompt, sends
+the rule catalogue once per batch instead of once per row, and asks for a
+JSON array keyed by ``Transaction_ID``. Answers are split back per row;
+rows whose answer is missing or cannot be parsed are resubmitted on their
+own (the rest of the batch is not paid for twice). Batches run in parallel,
+but every Gemini call in the process goes through a shared semaphore so
+several uploads together stay under ``GEMINI_MAX_CONCURRENCY`` calls.
+
+Both paths consult the verdict cache (``verdict_cache``) first: a row whose
+feature tuple was already classified under the current rule catalogue
+reuses that verdict without an API call, and rows sharing a feature tuple
+within one batch run are sent to Gemini only once. Only the matched rules
+and risk level are reused; Gemini's explanation describes the row it was
+written for, so reused verdicts are explained from the rule catalogue.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+from .verdict_cache import VerdictCache, get_verdict_cache, verdict_features, verdict_key
+
+# Transactions per prompt, concurrent Gemini calls and attempts per batch
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_BATCH_ATTEMPTS = 3
+
+RISK_LEVELS = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
+
+# Compliance rules the model checks each transaction against
+LLM_COMPLIANCE_RULES = [
+    {
+        "name": "High Value Transaction",
+        "description": "Single transaction above ₹9,00,000 requires additional scrutiny",
+        "condition": "isinstance(t.get('amount', 0), (int, float)) and float(t.get('amount', 0)) > 900000",
+        "risk_level": "HIGH",
+        "penalty_min": 50000,
+        "penalty_max": 200000,
+        "legal_provision": "RBI Master Direction on KYC 2016"
+    },
+    {
+        "name": "Non-compliance with KYC norms",
+        "description": "Banks must collect KYC documents, verify customer identity, perform periodic KYC updates.",
+        "condition": "t.get('sender_kyc_status') and (kyc_status := str(t.get('sender_kyc_status', '')).strip().lower()) and kyc_status not in ['', 'completed'] and kyc_status in ['expired', 'rejected', 'incomplete', 'pending']",
+        "risk_level": "HIGH"
+    },
+    {
+        "name": "Violation of customer protection norms",
+        "description": "Banks must follow RBI's Charter of Customer Rights (fair treatment, transparency, grievance redress, etc).",
+        "condition": "any(term in description.lower() for term in ['unauthorized', 'disputed', 'unfair', 'complaint'])",
+        "risk_level": "HIGH"
+    },
+    {
+        "name": "Non-submission or delay in regulatory returns",
+        "description": "Banks must file periodic regulatory returns (NPAs, statutory returns, fraud reports) on time.",
+        "condition": "any(term in description.lower() for term in ['overdue', 'late submission', 'penalty', 'compliance charge'])",
+        "risk_level": "MEDIUM"
+    },
+    {
+        "name": "Inadequate oversight of outsourced activities",
+        "description": "Banks must audit outsourced services, cannot outsource policy formulation or loan sanction.",
+        "condition": "any(term in description.lower() for term in ['third-party', 'outsourced', 'vendor'])",
+        "risk_level": "MEDIUM"
+    },
+    {
+        "name": "Breach of digital lending norms",
+        "description": "Direct loan disbursement, APR disclosures, no automatic credit limit increases without consent.",
+        "condition": "any(term in description.lower() for term in ['fintech', 'lending app', 'lsp']) or 'digital_lending' in transaction_mode.lower()",
+        "risk_level": "HIGH"
+    },
+    {
+        "name": "Lapses in cybersecurity compliance",
+        "description": "Banks must maintain a cybersecurity framework, CISOs, audits; customers must follow safe practices.",
+        "condition": "any(term in description.lower() for term in ['suspicious', 'alert', 'fraud', 'cyber', 'hack'])",
+        "risk_level": "CRITICAL"
+    }
+]
+
+# Further rules listed in the prompt that are not checked automatically
+LLM_ADDITIONAL_RULES = [
+    "Misclassification of NPAs → NPAs must be classified correctly after 90+ days of non-payment.",
+    "Non-reporting of large exposures → Large exposures (10%+ Tier 1 capital, or ₹1 lakh+ for reporting) must be reported.",
+    "Penalties under PMLA → Suspicious transactions must be reported and identity verified.",
+    "Non-compliance by Credit Information Companies → CICs must notify customers and secure data.",
+    "Non-cooperation with Ombudsman → Banks must cooperate with Ombudsman rulings."
+]
+
+
+def get_batch_size() -> int:
+    return max(1, int(os.getenv('GEMINI_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+
+
+def get_max_concurrency() -> int:
+    return max(1, int(os.getenv('GEMINI_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)))
+
+
+def get_batch_attempts() -> int:
+    return max(1, int(os.getenv('GEMINI_BATCH_ATTEMPTS', DEFAULT_BATCH_ATTEMPTS)))
+
+
+_call_slots: Optional[threading.BoundedSemaphore] = None
+_call_slots_lock = threading.Lock()
+
+
+def _gemini_slots() -> threading.BoundedSemaphore:
+    """Process-wide limit on concurrent Gemini calls."""
+    global _call_slots
+    with _call_slots_lock:
+        if _call_slots is None:
+            _call_slots = threading.BoundedSemaphore(get_max_concurrency())
+        return _call_slots
+
+
+def rule_catalogue() -> str:
+    """Numbered rule list shared by the single and batched prompts."""
+    rule_descriptions = [
+        f"{i+1}. {rule['name']} → {rule['description']} (Risk: {rule['risk_level']})"
+        for i, rule in enumerate(LLM_COMPLIANCE_RULES)
+    ]
+    rule_descriptions.extend([
+        f"{i+len(LLM_COMPLIANCE_RULES)+1}. {rule}"
+        for i, rule in enumerate(LLM_ADDITIONAL_RULES)
+    ])
+    return '\n'.join(rule_descriptions)
+
+
+def _amount(transaction_row: Dict[str, Any], field: str) -> float:
+    try:
+        return float(transaction_row.get(field, 0))
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def transaction_details(transaction_row: Dict[str, Any]) -> str:
+    """Human-readable block describing one transaction for the prompt."""
+    amount = _amount(transaction_row, 'Amount')
+    balance_after = _amount(transaction_row, 'Balance_After')
+    sender_kyc_status = str(transaction_row.get('Sender_KYC_Status', 'Unknown')).strip()
+    transaction_mode = str(transaction_row.get('Transaction_Mode', '')).lower()
+    return f"""
+TRANSACTION DETAILS:
+• Transaction ID: {transaction_row.get('Transaction_ID', 'N/A')}
+• Date: {transaction_row.get('Date', 'N/A')} at {transaction_row.get('Time', 'N/A')}
+• Sender: {transaction_row.get('Sender_Name', 'N/A')} (Account: {transaction_row.get('Sender_Account', 'N/A')})
+• Sender KYC Status: {sender_kyc_status}
+• Receiver: {transaction_row.get('Receiver_Name', 'N/A')} (Account: {transaction_row.get('Receiver_Account', 'N/A')})
+• Amount: ₹{amount:,.2f}
+• Transaction Type: {transaction_row.get('Transaction_Type', 'N/A')}
+• Transaction Mode: {transaction_mode}
+• Channel: {transaction_row.get('Channel', 'N/A')}
+• Branch: {transaction_row.get('Branch_Code', 'N/A')}
+• Location: {transaction_row.get('Location', 'N/A')}
+• Description: {transaction_row.get('Description', 'No description')}
+• Balance After: ₹{balance_after:,.2f}
+• Reference: {transaction_row.get('Reference_Number', 'N/A')}
+"""
+
+
+_ANALYSIS_INSTRUCTIONS = """IMPORTANT: Only flag transactions above ₹9,00,000 as high-value. Do not flag transactions below this amount as high-value under any circumstances.
+
+ANALYSIS INSTRUCTIONS:
+1. Review the transaction details carefully against each compliance rule
+2. Pay special attention to:
+   - Transaction amount (CRITICAL: Only flag if amount > ₹9,00,000)
+   - Sender KYC status
+   - Transaction mode and channel
+   - Description text for any red flags
+   - Any unusual patterns or combinations
+
+3. For each rule that is violated, include:
+   - The exact rule name
+   - A clear, concise explanation of the violation without repeating the rule name or amount
+   - The risk level (CRITICAL, HIGH, MEDIUM, or LOW) - include this only once at the end
+   - For high value transactions, only include if amount is above ₹9,00,000
+
+4. If no rules are violated, respond with "No Violation\""""
+
+
+# Parts of an answer that depend only on the feature tuple and may be reused
+_VERDICT_FIELDS = ('matched_rules', 'risk_level')
+
+
+def catalogue_version() -> str:
+    """Checksum of everything in the prompt that decides a verdict, and of the cached fields."""
+    payload = json.dumps([LLM_COMPLIANCE_RULES, LLM_ADDITIONAL_RULES, _ANALYSIS_INSTRUCTIONS, _VERDICT_FIELDS],
+                         sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _default_cache() -> Optional[VerdictCache]:
+    return get_verdict_cache(catalogue_version())
+
+
+def catalogue_explanation(matched_rules: List[str]) -> str:
+    """Row-independent explanation of a verdict, built from the rule catalogue."""
+    descriptions = {rule['name']: rule['description'] for rule in LLM_COMPLIANCE_RULES}
+    parts = [f"{name}: {descriptions[name]}" if name in descriptions else name for name in matched_rules]
+    return 'Matches ' + '; '.join(parts) + '.'
+
+
+def _cached_result(verdict: Dict[str, Any], transaction_row: Dict[str, Any]) -> Dict[str, Any]:
+    result = {key: verdict[key] for key in _VERDICT_FIELDS if key in verdict}
+    result['transaction_id'] = transaction_row.get('Transaction_ID', 'UNKNOWN')
+    matched_rules = [rule for rule in result.get('matched_rules', []) if rule and rule != 'No Violation']
+    if matched_rules:
+        result['explanation'] = catalogue_explanation(matched_rules)
+    return build_result(result, transaction_row)
+
+
+def _verdict(analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Cacheable part of an analysis; None for failed analyses."""
+    if 'error' in analysis:
+        return None
+    ai_analysis = analysis['ai_analysis']
+    return {key: ai_analysis[key] for key in _VERDICT_FIELDS}
+
+
+def build_prompt(transaction_row: Dict[str, Any]) -> str:
+    """Prompt classifying a single transaction."""
+    transaction_id = transaction_row.get('Transaction_ID', 'N/A')
+    sender_kyc_status = str(transaction_row.get('Sender_KYC_Status', 'Unknown')).strip()
+    amount = _amount(transaction_row, 'Amount')
+    return f"""You are a compliance classification assistant for RBI banking regulations.
+You will receive one complete financial transaction record at a time.
+Your task is to analyze if this transaction violates any of the following RBI compliance rules.
+
+RBI COMPLIANCE RULES (in priority order):
+{rule_catalogue()}
+
+{transaction_details(transaction_row)}
+
+{_ANALYSIS_INSTRUCTIONS}
+
+RESPONSE FORMAT (strict JSON):
+{{
+  "transaction_id": "{transaction_id}",
+  "matched_rules": ["Rule Name 1", "Rule Name 2"],
+  "explanation": "Concise explanation of the specific violation without repeating the rule name or amount.",
+  "kyc_status": "{sender_kyc_status}",
+  "amount": {amount},
+  "risk_level": "HIGHEST_RISK_LEVEL_FOUND"
+}}
+
+EXAMPLE RESPONSE FOR VIOLATION:
+{{
+  "transaction_id": "TXN12345",
+  "matched_rules": ["High Value Transaction", "Lapses in cybersecurity compliance"],
+  "explanation": "Transaction amount of ₹9,50,000 exceeds the ₹9,00,000 threshold for high-value transactions. This transaction requires additional scrutiny as per RBI guidelines.",
+  "kyc_status": "Verified,completed",
+  "amount": 950000.0,
+  "risk_level": "CRITICAL"
+}}
+
+EXAMPLE RESPONSE FOR NO VIOLATION:
+{{
+  "transaction_id": "{transaction_id}",
+  "matched_rules": ["No Violation"],
+  "explanation": "This transaction is below the ₹9,00,000 threshold and shows no other signs of suspicious activity.",
+  "kyc_status": "{sender_kyc_status}",
+  "amount": {amount},
+  "risk_level": "LOW"
+}}"""
+
+
+def build_batch_prompt(keyed_rows: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """Prompt classifying several transactions, each tagged with its response key."""
+    transactions = '\n'.join(
+        f"KEY: {key}{transaction_details(row)}" for key, row in keyed_rows
+    )
+    return f"""You are a compliance classification assistant for RBI banking regulations.
+You will receive a batch of {len(keyed_rows)} financial transaction records, each introduced by a KEY line.
+Your task is to analyze each transaction independently for violations of the following RBI compliance rules.
+
+RBI COMPLIANCE RULES (in priority order):
+{rule_catalogue()}
+
+TRANSACTIONS:
+{transactions}
+
+{_ANALYSIS_INSTRUCTIONS}
+
+RESPONSE FORMAT (strict JSON array, exactly one object per transaction, "transaction_id" set to the transaction's KEY verbatim):
+[
+  {{
+    "transaction_id": "KEY",
+    "matched_rules": ["Rule Name 1", "Rule Name 2"],
+    "explanation": "Concise explanation of the specific violation without repeating the rule name or amount.",
+    "risk_level": "HIGHEST_RISK_LEVEL_FOUND"
+  }}
+]
+
+EXAMPLE RESPONSE FOR TWO TRANSACTIONS:
+[
+  {{
+    "transaction_id": "TXN12345",
+    "matched_rules": ["High Value Transaction", "Lapses in cybersecurity compliance"],
+    "explanation": "Transaction amount of ₹9,50,000 exceeds the ₹9,00,000 threshold for high-value transactions. This transaction requires additional scrutiny as per RBI guidelines.",
+    "risk_level": "CRITICAL"
+  }},
+  {{
+    "transaction_id": "TXN12346",
+    "matched_rules": ["No Violation"],
+    "explanation": "This transaction is below the ₹9,00,000 threshold and shows no other signs of suspicious activity.",
+    "risk_level": "LOW"
+  }}
+]"""
+
+
+def build_result(result: Dict[str, Any], transaction_row: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn one parsed model answer into the transaction analysis returned to callers."""
+    transaction_id = result.get('transaction_id', transaction_row.get('Transaction_ID', 'UNKNOWN'))
+
+    # Check if this is a no-violation response
+    if result.get('matched_rules') == ["No Violation"] or not any(result.get('matched_rules', [])):
+        return {
+            'transaction_id': transaction_id,
+            'has_violation': False,
+            'violation_details': [],
+            'ai_analysis': {
+                'matched_rules': ['No Violation'],
+                'explanation': result.get('explanation', 'No compliance violations detected.'),
+                'risk_level': 'LOW'
+            }
+        }
+
+    matched_rules = result.get('matched_rules', [])
+    explanation = result.get('explanation', 'No explanation provided')
+    risk_level = result.get('risk_level', 'MEDIUM')
+
+    # Format the response with detailed violation information
+    violation_details = []
+    for rule_name in matched_rules:
+        rule_details = next(
+            (r for r in LLM_COMPLIANCE_RULES if r['name'] == rule_name),
+            {'description': 'Rule details not available', 'risk_level': risk_level}
+        )
+        violation_details.append({
+            'rule_name': rule_name,
+            'description': rule_details.get('description', ''),
+            'risk_level': rule_details.get('risk_level', risk_level),
+            'details': {
+                'transaction_id': transaction_id,
+                'status': 'VIOLATION',
+                'severity': rule_details.get('risk_level', risk_level),
+                'explanation': explanation
+            }
+        })
+
+    # Determine the highest risk level from all violations
+    highest_risk = max(
+        [RISK_LEVELS.get(v['risk_level'].upper(), 0) for v in violation_details],
+        default=0
+    )
+    overall_risk = [k for k, v in RISK_LEVELS.items() if v == highest_risk][0]
+
+    return {
+        'transaction_id': transaction_id,
+        'has_violation': True,
+        'violation_details': violation_details,
+        'ai_analysis': {
+            'matched_rules': matched_rules,
+            'explanation': explanation,
+            'risk_level': overall_risk
+        }
+    }
+
+
+def error_result(transaction_row: Dict[str, Any], error_msg: str) -> Dict[str, Any]:
+    """Analysis returned for a transaction the model could not classify."""
+    return {
+        'transaction_id': transaction_row.get('Transaction_ID', 'UNKNOWN'),
+        'has_violation': False,
+        'error': error_msg,
+        'ai_analysis': {
+            'matched_rules': ['Analysis Error'],
+            'explanation': f'Error analyzing transaction: {error_msg}',
+            'risk_level': 'UNKNOWN'
+        },
+        'violation_details': [{
+            'rule_name': 'Analysis Error',
+            'description': f'Failed to analyze transaction: {error_msg}',
+            'risk_level': 'UNKNOWN',
+            'details': {
+                'transaction_id': transaction_row.get('Transaction_ID', 'UNKNOWN'),
+                'status': 'ERROR',
+                'severity': 'UNKNOWN',
+                'explanation': f'Error during analysis: {error_msg}'
+            }
+        }]
+    }
+
+
+def _generate(model, prompt: str) -> str:
+    with _gemini_slots():
+        response = model.generate_content(prompt)
+    return response.text.strip()
+
+
+def analyze_transaction(transaction_row: Dict[str, Any], model) -> Dict[str, Any]:
+    """
+    Analyze a single transaction against compliance rules using Gemini AI.
+
+    Args:
+        transaction_row: Dictionary containing all transaction fields from Excel row
+        model: Gemini model instance for AI analysis
+
+    Returns:
+        Dictionary with rule analysis results
+    """
+    cache = _default_cache()
+    key = verdict_key(transaction_row)
+    if cache is not None:
+        cached = cache.get_many([key]).get(key)
+        if cached is not None:
+            return _cached_result(cached, transaction_row)
+
+    analysis = _ask_single(transaction_row, model)
+    verdict = _verdict(analysis)
+    if cache is not None and verdict is not None:
+        cache.put_many([(key, verdict_features(transaction_row), verdict)])
+    return analysis
+
+
+def _ask_single(transaction_row: Dict[str, Any], model) -> Dict[str, Any]:
+    try:
+        response_text = _generate(model, build_prompt(transaction_row))
+        logging.debug(f"Raw AI response for transaction {transaction_row.get('Transaction_ID', 'UNKNOWN')}:\n{response_text}")
+
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if not json_match:
+            logging.error(f"No JSON found in AI response. Full response:\n{response_text}")
+            raise ValueError("Could not find valid JSON in AI response")
+        try:
+            result = json.loads(json_match.group(0))
+        except json.JSONDecodeError as je:
+            logging.error(f"Failed to parse AI response as JSON: {je}\nResponse: {response_text}")
+            raise ValueError(f"Invalid JSON response from AI: {je}")
+        return build_result(result, transaction_row)
+
+    except Exception as e:
+        error_msg = str(e)
+        logging.error(f"Error analyzing transaction: {error_msg}")
+        return error_result(transaction_row, error_msg)
+
+
+def parse_batch_response(response_text: str) -> List[Dict[str, Any]]:
+    """
+    Answer objects found in a batched response.
+
+    The whole array is parsed when possible. Otherwise (truncated output,
+    stray text between items) each flat ``{...}`` object is parsed on its own
+    so the well-formed answers are still used.
+    """
+    array_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+    if array_match:
+        try:
+            items = json.loads(array_match.group(0))
+            if isinstance(items, list):
+                return [item for item in items if isinstance(item, dict)]
+        except json.JSONDecodeError:
+            pass
+    items = []
+    for obj_match in re.finditer(r'\{[^{}]*\}', response_text):
+        try:
+            item = json.loads(obj_match.group(0))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(item, dict):
+            items.append(item)
+    return items
+
+
+def _is_quota_error(error_msg: str) -> bool:
+    return '429' in error_msg or 'quota' in error_msg.lower()
+
+
+class BatchClassifier:
+    """Classifies many transactions with a few batched Gemini calls."""
+
+    def __init__(self, model, batch_size: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 max_attempts: Optional[int] = None, retry_delay: float = 2.0,
+                 cache: Optional[VerdictCache] = None, use_cache: bool = True):
+        self.model = model
+        self.cache = cache if cache is not None or not use_cache else _default_cache()
+        self.batch_size = batch_size or get_batch_size()
+        self.max_concurrency = max_concurrency or get_max_concurrency()
+        self.max_attempts = max_attempts or get_batch_attempts()
+        self.retry_delay = retry_delay
+
+    def classify(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze transactions in batches.
+
+        Args:
+            rows: Transaction rows with the original Excel column names
+
+        Returns:
+            One analysis per row, in input order, shaped like ``analyze_transaction``'s
+        """
+        if not rows:
+            return []
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        keys = [verdict_key(row) for row in rows]
+        cached = self.cache.get_many(keys) if self.cache is not None else {}
+
+        # One Gemini question per distinct feature tuple not in the cache
+        representatives: Dict[str, int] = {}
+        for pos, key in enumerate(keys):
+            if key in cached:
+                results[pos] = _cached_result(cached[key], rows[pos])
+            elif key not in representatives:
+                representatives[key] = pos
+        if representatives:
+            logging.info(f"Gemini review: {len(rows)} rows, {len(rows) - sum(r is None for r in results)} cached, "
+                         f"{len(representatives)} distinct to classify")
+            answers = self._classify_uncached([rows[pos] for pos in representatives.values()])
+            answered = dict(zip(representatives, answers))
+            for pos, key in enumerate(keys):
+                if results[pos] is None:
+                    analysis = answered[key]
+                    results[pos] = analysis if pos == representatives[key] else self._fan_out(analysis, rows[pos])
+            if self.cache is not None:
+                self.cache.put_many(
+                    (key, verdict_features(rows[representatives[key]]), verdict)
+                    for key, verdict in ((key, _verdict(analysis)) for key, analysis in answered.items())
+                    if verdict is not None
+                )
+        return results
+
+    @staticmethod
+    def _fan_out(analysis: Dict[str, Any], transaction_row: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a representative row's analysis for another row with the same features."""
+        verdict = _verdict(analysis)
+        if verdict is None:
+            return error_result(transaction_row, analysis.get('error', 'Analysis failed'))
+        return _cached_result(verdict, transaction_row)
+
+    def _classify_uncached(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        batches = [list(range(start, min(start + self.batch_size, len(rows))))
+                   for start in range(0, len(rows), self.batch_size)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        workers = min(self.max_concurrency, len(batches))
+        if workers == 1:
+            for batch in batches:
+                self._classify_batch(rows, batch, results)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini-batch') as pool:
+                for future in [pool.submit(self._classify_batch, rows, batch, results) for batch in batches]:
+                    future.result()
+        return results
+
+    def _classify_batch(self, rows: List[Dict[str, Any]], batch: List[int],
+                        results: List[Optional[Dict[str, Any]]]) -> None:
+        pending = self._keys(rows, batch)
+        last_error = 'No answer for transaction in AI response'
+        for attempt in range(self.max_attempts):
+            if not pending:
+                return
+            if attempt:
+                logging.info(f"Resubmitting {len(pending)} transaction(s) to Gemini (attempt {attempt + 1})")
+            try:
+                response_text = _generate(self.model, build_batch_prompt(
+                    [(key, rows[pos]) for key, pos in pending.items()]
+                ))
+            except Exception as e:
+                last_error = str(e)
+                logging.error(f"Gemini batch call failed: {last_error}")
+                if _is_quota_error(last_error):
+                    time.sleep(self.retry_delay * (2 ** attempt))
+                continue
+            logging.debug(f"Raw AI response for batch of {len(pending)}:\n{response_text}")
+
+            for item in parse_batch_response(response_text):
+                key = str(item.get('transaction_id', ''))
+                if key not in pending or not isinstance(item.get('matched_rules', []), list):
+                    continue
+                pos = pending.pop(key)
+                item['transaction_id'] = rows[pos].get('Transaction_ID', 'UNKNOWN')
+                results[pos] = build_result(item, rows[pos])
+            if pending:
+                last_error = 'No answer for transaction in AI response'
+                logging.warning(f"{len(pending)} transaction(s) missing or unparsable in Gemini batch response")
+
+        for pos in pending.values():
+            results[pos] = error_result(rows[pos], last_error)
+
+    @staticmethod
+    def _keys(rows: List[Dict[str, Any]], batch: List[int]) -> Dict[str, int]:
+        """Response key for each row: its Transaction_ID, made unique within the batch."""
+        keys: Dict[str, int] = {}
+        for pos in batch:
+            transaction_id = str(rows[pos].get('Transaction_ID', '')).strip()
+            if not transaction_id or transaction_id.lower() == 'nan':
+                transaction_id = f'ROW-{pos + 1}'
+            key, n = transaction_id, 2
+            while key in keys:
+                key = f'{transaction_id}#{n}'
+                n += 1
+            keys[key] = pos
+        return keys
+
+
+def analyze_transactions(rows: List[Dict[str, Any]], model) -> List[Dict[str, Any]]:
+    """Batched counterpart of ``analyze_transaction`` using the configured limits."""
+    return BatchClassifier(model).classify(rows)
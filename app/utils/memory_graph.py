@@ -0,0 +1,414 @@
+"""
+In-process graph store that stands in for Neo4j.
+
+``MemoryGraphClient`` keeps the same nodes and relationships the Cypher in
+``graph.py`` and ``transaction_processor.py`` writes, in plain dicts with hash
+indexes on account number, violation id and transaction id. Lookups that
+Neo4j answers through an index are O(1) dictionary hits here, so the store is
+useful for benchmarks and local runs without a database.
+
+It is selected with ``GRAPH_BACKEND=memory``; ``get_client_from_env`` then
+returns one process-wide instance and the module-level helpers in ``graph.py``
+and ``transaction_processor.py`` dispatch to the methods below. Dates are kept
+as ISO ``YYYY-MM-DD`` strings.
+"""
+from __future__ import annotations
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+from .graph import UNDATED_MONTH, dedupe_matches
+
+# Labels/relationship types reported by ``graph_stats`` (mirrors stats.py)
+_STATS_NODE_LABELS = ('Circular', 'Violation', 'PenaltyRange', 'LegalProvision', 'Reason', 'ComplianceRule')
+
+
+def _iso_date(value: Any) -> Optional[str]:
+    """Normalise a date-like value the way Cypher's ``date($date)`` would."""
+    if value is None or value == '':
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+
+def _contains(haystack: Optional[str], needle: Optional[str]) -> bool:
+    """Case-insensitive ``toLower(a) CONTAINS toLower(b)`` with Cypher null semantics."""
+    if haystack is None or needle is None:
+        return False
+    return needle.lower() in haystack.lower()
+
+
+class MemoryGraphClient:
+    """Dict-backed replacement for ``Neo4jClient``.
+
+    All methods are thread-safe; a single re-entrant lock guards the store.
+    """
+
+    in_memory = True
+    configured = True
+
+    def __init__(self):
+        self._driver = None
+        self._database = 'memory'
+        self._lock = threading.RLock()
+        self.clear()
+
+    # -- Neo4jClient interface --------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        """No-op; the store lives for the whole process."""
+
+    def initialize_schema(self) -> None:
+        """No-op; the hash indexes always exist."""
+
+    def clear(self) -> None:
+        """Drop every node and relationship."""
+        with self._lock:
+            self._violations: Dict[Tuple, Dict[str, Any]] = {}
+            # Hash indexes
+            self._violation_by_id: Dict[Any, Tuple] = {}
+            self._violations_by_type: Dict[str, set] = {}
+            self._accounts: Dict[str, Dict[str, Any]] = {}
+            self._transactions: Dict[Any, Dict[str, Any]] = {}
+            self._persons: Dict[str, Dict[str, Any]] = {}
+            self._account_months: Dict[str, Dict[str, Any]] = {}
+            self._circulars: set = set()
+            self._compliance_rules: Dict[Any, Dict[str, Any]] = {}
+
+    def upsert_violation(self, record: Dict[str, Any]) -> None:
+        """Same MERGE semantics as ``Neo4jClient.upsert_violation``."""
+        page = int(record['page']) if record.get('page') is not None else None
+        key = ('sl', record.get('slNo'), page)
+        with self._lock:
+            violation = self._violations.get(key)
+            if violation is None:
+                violation = self._new_violation(key, slNo=record.get('slNo'), page=page)
+                self._set_violation_type(key, violation, record.get('violationType'))
+            elif record.get('violationType') is not None:
+                self._set_violation_type(key, violation, record.get('violationType'))
+
+            if record.get('circular') is not None:
+                self._circulars.add(record['circular'])
+                violation['circulars'].add(record['circular'])
+            if record.get('penMin') is not None or record.get('penMax') is not None:
+                violation['penalties'].add((record.get('penMin'), record.get('penMax'), record.get('currency')))
+            violation['legal'].add(record.get('legal') or '')
+            violation['reasons'].add(record.get('reason') or '')
+        from .graph import notify_graph_write
+        notify_graph_write()
+
+    # -- internals ---------------------------------------------------------
+
+    def _new_violation(self, key: Tuple, **props) -> Dict[str, Any]:
+        violation = {
+            'props': dict(props),
+            'circulars': set(),
+            'penalties': set(),
+            'legal': set(),
+            'reasons': set(),
+            'persons': set(),
+        }
+        self._violations[key] = violation
+        return violation
+
+    def _set_violation_type(self, key: Tuple, violation: Dict[str, Any], vtype: Optional[str]) -> None:
+        old_type = violation['props'].get('type')
+        if old_type is not None:
+            self._violations_by_type.get(old_type, set()).discard(key)
+        violation['props']['type'] = vtype
+        if vtype is not None:
+            self._violations_by_type.setdefault(vtype, set()).add(key)
+
+    def _account(self, number: str) -> Dict[str, Any]:
+        account = self._accounts.get(number)
+        if account is None:
+            # Insertion-ordered dicts used as sets: O(1) membership, stable iteration order
+            account = {'props': {'number': number}, 'violations': {}, 'transactions': {}, 'months': set()}
+            self._accounts[number] = account
+        return account
+
+    def _matches_for_types(self, predicate, limit: int) -> List[Tuple]:
+        """Violation keys whose type satisfies ``predicate``, scanning distinct types only."""
+        keys: List[Tuple] = []
+        for vtype, type_keys in self._violations_by_type.items():
+            if predicate(vtype):
+                keys.extend(type_keys)
+                if len(keys) >= limit:
+                    break
+        return keys[:limit]
+
+    def _penalty_max(self, violation: Dict[str, Any]) -> Optional[float]:
+        values = [p[1] for p in violation['penalties'] if p[1] is not None]
+        return sum(values) if violation['penalties'] else None
+
+    # -- lookups (see graph.py for the Cypher equivalents) -----------------
+
+    def find_violations_by_type(self, violation_type_text: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = self._matches_for_types(
+                lambda vtype: _contains(vtype, violation_type_text) or _contains(violation_type_text, vtype), 10
+            )
+            results = []
+            for key in keys:
+                violation = self._violations[key]
+                for legal in sorted(violation['legal']) or ['']:
+                    results.append({
+                        'violationType': violation['props'].get('type'),
+                        'legalProvision': legal,
+                        'personName': None,
+                        'personId': None,
+                        'personEmail': None,
+                        'personPhone': None,
+                    })
+        return dedupe_matches(results[:10], ('violationType', 'legalProvision', 'personName', 'personId'))
+
+    def find_violations_by_account(self, account_number: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            account = self._accounts.get(account_number)
+            if account is None:
+                return []
+            results = []
+            for key in account['violations']:
+                violation = self._violations[key]
+                penalties = sorted(violation['penalties'], key=str) or [(None, None, None)]
+                legals = sorted(violation['legal']) or [None]
+                reasons = sorted(violation['reasons']) or [None]
+                persons = [self._persons[pid] for pid in sorted(violation['persons'])] or [{}]
+                for pen_min, pen_max, _ in penalties:
+                    for legal in legals:
+                        for reason in reasons:
+                            for person in persons:
+                                results.append({
+                                    'violationType': violation['props'].get('type'),
+                                    'legalProvision': legal,
+                                    'circular': None,
+                                    'penMin': pen_min,
+                                    'penMax': pen_max,
+                                    'reason': reason,
+                                    'personName': person.get('name'),
+                                    'personId': person.get('id'),
+                                    'personEmail': person.get('email'),
+                                    'personPhone': person.get('phone'),
+                                })
+        return dedupe_matches(results, tuple(results[0].keys())) if results else []
+
+    def find_violations_for_transaction(self, account_number: Optional[str], description: str) -> List[Dict[str, Any]]:
+        desc = description or ''
+
+        def _row(violation: Dict[str, Any], person: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+            person = person or {}
+            return {
+                'violationType': violation['props'].get('type'),
+                'personName': person.get('name'),
+                'personId': person.get('id'),
+                'personEmail': person.get('email'),
+                'personPhone': person.get('phone'),
+            }
+
+        with self._lock:
+            results = [_row(self._violations[key]) for key in self._matches_for_types(lambda t: _contains(t, desc), 5)]
+            account = self._accounts.get(account_number) if account_number else None
+            if account is not None:
+                described = any(
+                    _contains(self._transactions[tx_id]['props'].get('description'), desc)
+                    for tx_id in account['transactions']
+                )
+                linked = []
+                for key in account['violations']:
+                    violation = self._violations[key]
+                    if described or _contains(violation['props'].get('type'), desc):
+                        persons = [self._persons[pid] for pid in sorted(violation['persons'])] or [None]
+                        linked.extend(_row(violation, person) for person in persons)
+                results.extend(linked[:5])
+        return dedupe_matches(results, ('violationType', 'personName', 'personId'))
+
+    def get_fines_trend(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            totals: Dict[str, float] = {}
+            for violation in self._violations.values():
+                amount = self._penalty_max(violation)
+                if amount is None:
+                    continue
+                date = violation['props'].get('date')
+                month = date[:7] if date else UNDATED_MONTH
+                totals[month] = totals.get(month, 0.0) + float(amount)
+        return [
+            {'date': None if month == UNDATED_MONTH else month, 'amount': total}
+            for month, total in sorted(totals.items())
+        ]
+
+    def get_compliance_rules(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(self._compliance_rules[rule_id]) for rule_id in sorted(self._compliance_rules, key=str)]
+
+    def graph_stats(self) -> Dict[str, Any]:
+        """Counts in the shape returned by ``stats.collect_graph_stats``."""
+        with self._lock:
+            violations = list(self._violations.values())
+            node_counts = {
+                'Circular': len(self._circulars),
+                'Violation': len(violations),
+                'PenaltyRange': len({p for v in violations for p in v['penalties']}),
+                'LegalProvision': len({l for v in violations for l in v['legal']}),
+                'Reason': len({r for v in violations for r in v['reasons']}),
+                'ComplianceRule': len(self._compliance_rules),
+            }
+            rel_counts = {
+                'HAS_REASON': sum(len(v['reasons']) for v in violations),
+                'HAS_VIOLATION': sum(len(v['circulars']) for v in violations)
+                + sum(len(a['violations']) for a in self._accounts.values()),
+                'INVOKES': sum(len(v['legal']) for v in violations),
+                'PENALTY_IN_RANGE': sum(len(v['penalties']) for v in violations),
+                'VIOLATED_BY': sum(len(v['persons']) for v in violations),
+                'MADE_TRANSACTION': sum(len(a['transactions']) for a in self._accounts.values()),
+                'RELATED_TO_VIOLATION': sum(len(t['violations']) for t in self._transactions.values()),
+                'HAS_MONTHLY_TOTAL': len(self._account_months),
+            }
+            type_counts: Dict[Any, int] = {}
+            for v in violations:
+                type_counts[v['props'].get('type')] = type_counts.get(v['props'].get('type'), 0) + 1
+            total_fines = sum(self._penalty_max(v) or 0 for v in violations)
+        top_types = sorted(type_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            'nodes': {label: node_counts[label] for label in _STATS_NODE_LABELS},
+            'relationships': rel_counts,
+            'violation_types': [{'type': vtype, 'count': count} for vtype, count in top_types],
+            'total_fines': int(total_fines),
+            'refreshed_at': time.time(),
+        }
+
+    # -- KYC and transactions ----------------------------------------------
+
+    def process_kyc_data(self, kyc_data: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for record in kyc_data:
+                number = record.get('account_number')
+                account = self._account(number)
+                account['props'].update(name=record.get('customer_name'),
+                                        kyc_verified=record.get('kyc_verified', 'No'))
+
+                violation_id = record.get('transaction_id')
+                key = self._violation_by_id.get(violation_id)
+                if key is None:
+                    key = ('id', violation_id)
+                    self._violation_by_id[violation_id] = key
+                    violation = self._new_violation(key, id=violation_id)
+                else:
+                    violation = self._violations[key]
+                self._set_violation_type(key, violation, record.get('violation_type'))
+                violation['props'].update(date=_iso_date(record.get('date')), status='ACTIVE')
+                account['violations'][key] = None
+
+                if record.get('customer_name') is not None:
+                    person_id = f"P{number}"
+                    person = self._persons.setdefault(person_id, {'id': person_id})
+                    person['name'] = record.get('customer_name')
+                    violation['persons'].add(person_id)
+
+    def process_transaction_data(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        with self._lock:
+            for tx_data in transactions:
+                tx_id = tx_data.get('transaction_id')
+                try:
+                    amount = float(tx_data.get('amount', 0))
+                except (TypeError, ValueError) as e:
+                    logging.error(f"Error processing transaction {tx_id}: {e}")
+                    continue
+                date = _iso_date(tx_data.get('date'))
+                tx = self._transactions.setdefault(tx_id, {'props': {}, 'violations': set(), 'account_month': None})
+                tx['props'].update(transaction_id=tx_id,
+                                   amount=amount,
+                                   date=date,
+                                   description=tx_data.get('description', ''),
+                                   type=tx_data.get('transaction_type', 'UNKNOWN'))
+
+                number = tx_data.get('account_number')
+                account = self._account(number)
+                account['transactions'][tx_id] = None
+
+                for key in account['violations']:
+                    violation = self._violations[key]['props']
+                    if violation.get('status') == 'ACTIVE' and (violation.get('date') is None or
+                                                               (date is not None and date >= violation['date'])):
+                        tx['violations'].add(key)
+                        results.append({'tx_id': tx_id, 'violation_id': violation.get('id'),
+                                        'violation_type': violation.get('type')})
+
+                self._move_account_month(number, tx)
+        return results
+
+    def _move_account_month(self, number: str, tx: Dict[str, Any]) -> None:
+        """Delta-update the (account, month) running total, like ``_ACCOUNT_MONTH_UPDATE``."""
+        from .transaction_processor import account_month_key
+        previous = tx['account_month']
+        if previous is not None:
+            old_key, old_amount = previous
+            bucket = self._account_months[old_key]
+            bucket['total'] -= old_amount
+            bucket['count'] -= 1
+
+        date = tx['props'].get('date')
+        if date is None:
+            tx['account_month'] = None
+            return
+        month = date[:7]
+        key = account_month_key(number, month)
+        bucket = self._account_months.setdefault(key, {'account': number, 'month': month, 'total': 0.0, 'count': 0})
+        bucket['total'] += tx['props']['amount']
+        bucket['count'] += 1
+        self._accounts[number]['months'].add(key)
+        tx['account_month'] = (key, tx['props']['amount'])
+
+    def get_account_month_totals(self, account_number: str, month: str) -> Dict[str, Any]:
+        from .transaction_processor import account_month_key
+        with self._lock:
+            bucket = self._account_months.get(account_month_key(account_number, month))
+            if bucket is None:
+                return {'total': 0.0, 'count': 0}
+            return {'total': float(bucket['total']), 'count': int(bucket['count'])}
+
+    def rebuild_account_month_totals(self) -> int:
+        with self._lock:
+            self._account_months.clear()
+            for account in self._accounts.values():
+                account['months'].clear()
+            for number, account in self._accounts.items():
+                for tx_id in account['transactions']:
+                    tx = self._transactions[tx_id]
+                    tx['account_month'] = None
+                    self._move_account_month(number, tx)
+            return len(self._account_months)
+
+    def get_transaction_details(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            tx = self._transactions.get(transaction_id)
+            if tx is None:
+                return None
+            violation = penalty = None
+            if tx['violations']:
+                linked = self._violations[sorted(tx['violations'], key=str)[0]]
+                violation = dict(linked['props'])
+                if linked['penalties']:
+                    pen_min, pen_max, currency = sorted(linked['penalties'], key=str)[0]
+                    penalty = {'min': pen_min, 'max': pen_max, 'currency': currency}
+            return {'transaction': dict(tx['props']), 'violation': violation, 'penalty': penalty}
+
+
+_memory_graph: Optional[MemoryGraphClient] = None
+_memory_graph_lock = threading.Lock()
+
+
+def get_memory_graph() -> MemoryGraphClient:
+    """Return the process-wide in-memory graph, creating it on first use."""
+    global _memory_graph
+    with _memory_graph_lock:
+        if _memory_graph is None:
+            _memory_graph = MemoryGraphClient()
+        return _memory_graph
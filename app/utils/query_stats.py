@@ -0,0 +1,250 @@
+"""
+Instrumented Cypher runner and per-query timing statistics.
+
+Every query in the app goes through ``run_query`` (or ``run_query_async``)
+with a stable name. For each name we aggregate call count, errors, client
+wall time, rows returned and the server-reported ``result_available_after``
+/ ``result_consumed_after`` times. A configurable fraction of calls is sent
+with ``PROFILE`` to also capture database hits.
+
+Statistics live in process memory; they are served by ``/api/query-stats``
+and periodically written to a JSON file that ``flask query-report`` reads.
+Outcomes are also reported to the Neo4j circuit breaker.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Callable
+
+from .circuit_breaker import get_neo4j_breaker
+
+_DEFAULT_STATS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs', 'query_stats.json'
+)
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {
+        'calls': 0,
+        'errors': 0,
+        'rows': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'server_available_ms': 0,
+        'server_consumed_ms': 0,
+        'profiled_calls': 0,
+        'db_hits': 0,
+        'max_db_hits': 0,
+    }
+
+
+def _plan_db_hits(plan: Optional[Dict[str, Any]]) -> int:
+    """Sum ``dbHits`` over a PROFILE plan tree."""
+    if not plan:
+        return 0
+    hits = plan.get('dbHits', 0) or 0
+    for child in plan.get('children', []) or []:
+        hits += _plan_db_hits(child)
+    return hits
+
+
+class QueryStatsRegistry:
+    """Thread-safe aggregate of query timings keyed by query name."""
+
+    def __init__(self, stats_file: Optional[str] = None, dump_interval: float = 30.0):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._started_at = time.time()
+        self._stats_file = stats_file
+        self._dump_interval = dump_interval
+        self._last_dump = 0.0
+
+    def record(self, name: str, wall_ms: float, rows: int = 0, available_after: Optional[int] = None,
+               consumed_after: Optional[int] = None, db_hits: Optional[int] = None, error: bool = False) -> None:
+        with self._lock:
+            entry = self._entries.setdefault(name, _new_entry())
+            entry['calls'] += 1
+            entry['total_ms'] += wall_ms
+            entry['max_ms'] = max(entry['max_ms'], wall_ms)
+            if error:
+                entry['errors'] += 1
+            entry['rows'] += rows
+            entry['server_available_ms'] += available_after or 0
+            entry['server_consumed_ms'] += consumed_after or 0
+            if db_hits is not None:
+                entry['profiled_calls'] += 1
+                entry['db_hits'] += db_hits
+                entry['max_db_hits'] = max(entry['max_db_hits'], db_hits)
+            due = self._stats_file and (time.monotonic() - self._last_dump) >= self._dump_interval
+            if due:
+                self._last_dump = time.monotonic()
+        if due:
+            self.dump()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return aggregates per query name, slowest total time first."""
+        with self._lock:
+            entries = {name: dict(entry) for name, entry in self._entries.items()}
+        queries = []
+        for name, entry in entries.items():
+            calls = entry['calls'] or 1
+            profiled = entry['profiled_calls'] or 0
+            queries.append({
+                'name': name,
+                **entry,
+                'total_ms': round(entry['total_ms'], 3),
+                'max_ms': round(entry['max_ms'], 3),
+                'mean_ms': round(entry['total_ms'] / calls, 3),
+                'mean_rows': round(entry['rows'] / calls, 2),
+                'mean_db_hits': round(entry['db_hits'] / profiled, 1) if profiled else None,
+            })
+        queries.sort(key=lambda q: q['total_ms'], reverse=True)
+        return {
+            'since': self._started_at,
+            'generated_at': time.time(),
+            'profile_sample_rate': get_profile_sample_rate(),
+            'queries': queries,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._started_at = time.time()
+
+    def dump(self, path: Optional[str] = None) -> None:
+        """Write the current snapshot as JSON (used by ``flask query-report``)."""
+        path = path or self._stats_file
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Could not write query stats to {path}: {e}")
+
+
+_registry = QueryStatsRegistry(stats_file=os.getenv('QUERY_STATS_FILE', _DEFAULT_STATS_FILE))
+
+
+def get_query_stats() -> QueryStatsRegistry:
+    """Return the process-wide query statistics registry."""
+    return _registry
+
+
+def get_stats_file() -> str:
+    return os.getenv('QUERY_STATS_FILE', _DEFAULT_STATS_FILE)
+
+
+def get_profile_sample_rate() -> float:
+    try:
+        return min(1.0, max(0.0, float(os.getenv('NEO4J_PROFILE_SAMPLE_RATE', 0))))
+    except ValueError:
+        return 0.0
+
+
+def _should_profile(profile: bool) -> bool:
+    if not profile:
+        return False
+    rate = get_profile_sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def run_query(runner, name: str, query: str, profile: bool = True, **params) -> List[Dict[str, Any]]:
+    """Run a Cypher query through the instrumented path.
+
+    Args:
+        runner: Anything with a ``run(query, **params)`` method (session or transaction)
+        name: Stable name the timings are aggregated under
+        query: Cypher text
+        profile: Set to False for statements that cannot be profiled (schema commands)
+        **params: Query parameters
+
+    Returns:
+        List of records as dicts; the result is fully consumed
+    """
+    sampled = _should_profile(profile)
+    start = time.perf_counter()
+    try:
+        result = runner.run(('PROFILE ' + query) if sampled else query, **params)
+        records = [dict(record) for record in result]
+        summary = result.consume()
+    except Exception as e:
+        _registry.record(name, (time.perf_counter() - start) * 1000, error=True)
+        get_neo4j_breaker().record_failure(e)
+        raise
+    get_neo4j_breaker().record_success()
+    _registry.record(
+        name,
+        (time.perf_counter() - start) * 1000,
+        rows=len(records),
+        available_after=summary.result_available_after,
+        consumed_after=summary.result_consumed_after,
+        db_hits=_plan_db_hits(summary.profile) if sampled else None,
+    )
+    return records
+
+
+def execute_write(session, work: Callable, *args, **kwargs) -> Any:
+    """``session.execute_write`` that reports connection failures to the circuit breaker.
+
+    ``run_query`` only sees errors raised by the statements it runs; acquiring
+    the connection for the transaction can fail before any statement runs.
+    """
+    try:
+        return session.execute_write(work, *args, **kwargs)
+    except Exception as e:
+        get_neo4j_breaker().record_failure(e)
+        raise
+
+
+async def run_query_async(runner, name: str, query: str, profile: bool = True, **params) -> List[Dict[str, Any]]:
+    """Async counterpart of ``run_query`` for async sessions and transactions."""
+    sampled = _should_profile(profile)
+    start = time.perf_counter()
+    try:
+        result = await runner.run(('PROFILE ' + query) if sampled else query, **params)
+        records = [dict(record) async for record in result]
+        summary = await result.consume()
+    except Exception as e:
+        _registry.record(name, (time.perf_counter() - start) * 1000, error=True)
+        get_neo4j_breaker().record_failure(e)
+        raise
+    get_neo4j_breaker().record_success()
+    _registry.record(
+        name,
+        (time.perf_counter() - start) * 1000,
+        rows=len(records),
+        available_after=summary.result_available_after,
+        consumed_after=summary.result_consumed_after,
+        db_hits=_plan_db_hits(summary.profile) if sampled else None,
+    )
+    return records
+
+
+def format_report(snapshot: Dict[str, Any], sort_by: str = 'total_ms', limit: Optional[int] = None) -> str:
+    """Render a snapshot as a plain-text table for the CLI."""
+    queries = sorted(snapshot.get('queries', []), key=lambda q: q.get(sort_by) or 0, reverse=True)
+    if limit:
+        queries = queries[:limit]
+    if not queries:
+        return 'No queries recorded.'
+
+    header = f"{'query':<40} {'calls':>7} {'err':>4} {'total ms':>11} {'mean ms':>9} {'max ms':>9} " \
+             f"{'avail ms':>9} {'cons ms':>9} {'rows/call':>9} {'db hits':>9}"
+    lines = [header, '-' * len(header)]
+    for q in queries:
+        calls = q['calls'] or 1
+        db_hits = f"{q['mean_db_hits']:.0f}" if q.get('mean_db_hits') is not None else '-'
+        lines.append(
+            f"{q['name'][:40]:<40} {q['calls']:>7} {q['errors']:>4} {q['total_ms']:>11.1f} {q['mean_ms']:>9.2f} "
+            f"{q['max_ms']:>9.2f} {q['server_available_ms'] / calls:>9.2f} {q['server_consumed_ms'] / calls:>9.2f} "
+            f"{q['mean_rows']:>9.1f} {db_hits:>9}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,112 @@
+"""
+Cursor pagination and field projection for analysis results.
+
+A cursor is an opaque, URL-safe token naming the content hash and result kind
+it was issued for, the offset of the next record, and the page size and
+fields of the request that issued it. A follow-up request that sends only the
+cursor gets pages of the same shape; ``limit`` or ``fields`` sent with the
+cursor override them.
+
+A cursor is only accepted while the file and the analysis inputs (rule set,
+graph, settings) are unchanged. If any of them changes, the records behind
+the cursor would differ, and the client has to start again without a cursor.
+
+Projection (``fields``) keeps only the requested keys of each record. This
+drops e.g. the ``raw_data`` copy of the row that every transaction carries.
+"""
+from __future__ import annotations
+import os
+import json
+import base64
+from typing import Dict, Any, Optional, List, Tuple
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_MAX_PAGE_SIZE = 5000
+
+
+def get_max_page_size() -> int:
+    return max(1, int(os.getenv('EXCEL_PAGE_MAX_LIMIT', DEFAULT_MAX_PAGE_SIZE)))
+
+
+def page_size(value: Any) -> int:
+    """Requested page size, defaulted and clamped to 1..EXCEL_PAGE_MAX_LIMIT."""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit: {value!r}")
+    return min(max(1, size), get_max_page_size())
+
+
+def parse_fields(value: Any) -> Optional[List[str]]:
+    """Field names from a list or a comma-separated string; None means all fields."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        raise ValueError('fields must be a list or a comma-separated string')
+    fields = [str(name).strip() for name in value if str(name).strip()]
+    return fields or None
+
+
+def project(records: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Records reduced to ``fields`` (keys a record lacks are left out)."""
+    if fields is None:
+        return records
+    return [{name: record[name] for name in fields if name in record} for record in records]
+
+
+def encode_cursor(content_hash: str, kind: str, offset: int, limit: int,
+                  fields: Optional[List[str]] = None) -> str:
+    token = json.dumps({'h': content_hash, 'k': kind, 'o': offset, 'l': limit, 'f': fields},
+                       separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int, int, Optional[List[str]]]:
+    """
+    Decode a cursor from ``encode_cursor``.
+
+    Returns:
+        Tuple of (content hash, result kind, offset, page size, fields)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        token = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        content_hash, kind, offset = token['h'], token['k'], int(token['o'])
+        limit, fields = page_size(token['l']), parse_fields(token['f'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(content_hash, str) or not isinstance(kind, str) or offset < 0:
+        raise ValueError('Invalid cursor')
+    return content_hash, kind, offset, limit, fields
+
+
+def page(records: List[Dict[str, Any]], offset: int, limit: int, content_hash: Optional[str],
+         kind: str, fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    One page of ``records`` and its pagination block.
+
+    The next cursor carries ``limit`` and ``fields``; projecting the page is
+    left to the caller.
+
+    Returns:
+        Tuple of (records on the page, ``{offset, limit, returned, total, next_cursor}``);
+        ``next_cursor`` is None on the last page
+    """
+    items = records[offset:offset + limit]
+    end = offset + len(items)
+    next_cursor = (encode_cursor(content_hash, kind, end, limit, fields)
+                   if content_hash and end < len(records) else None)
+    return items, {
+        'offset': offset,
+        'limit': limit,
+        'returned': len(items),
+        'total': len(records),
+        'next_cursor': next_cursor,
+    }
@@ -0,0 +1,561 @@
+"""
+Column-wise evaluation of compliance rule conditions.
+
+Rule conditions are Python expressions over a transaction dict ``t``, e.g.
+``float(t.get('amount', 0)) > 900000``. ``_process_excel_file`` used to
+``eval`` each one into a lambda and call it once per row. Here each condition
+is parsed once and compiled into a function that evaluates it over a whole
+DataFrame chunk and returns a boolean mask.
+
+Numeric columns are handled with NumPy. Text columns are factorised once per
+chunk, and string operations (``lower()``, ``split()``, keyword searches, set
+membership) run once per distinct value rather than once per row; statuses,
+transaction types and times repeat heavily, so this is where the speed comes
+from.
+
+The compiled form keeps the row-wise semantics: every sub-expression carries
+an error mask marking rows where Python evaluation would have raised, ``and``
+/ ``or`` / ``not`` follow short-circuit rules, and a row whose evaluation
+errors does not match (the old code logged the error and skipped the rule).
+Conditions using constructs the compiler does not know are evaluated row by
+row with ``eval`` as before.
+
+Supported building blocks: ``t.get(field[, default])``, ``t[field]``,
+``'field' in t``, ``str``/``float``/``int``/``bool``/``len``/``isinstance``,
+``.lower()``/``.upper()``/``.strip()``/``.split(sep)``, indexing by a
+constant, comparisons (``< <= > >= == != in not in``) against constants,
+lists, sets and ``range(...)``, ``any(term in <expr> for term in [...])`` and
+the boolean operators.
+"""
+from __future__ import annotations
+import ast
+import logging
+import operator
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Field name variations rewritten before compiling (same as the old eval path)
+CONDITION_REPLACEMENTS = (
+    ('Amount', 'amount'),
+    ('Transaction_Type', 'transaction_type'),
+    ('Sender_KYC_Status', 'sender_kyc_status'),
+)
+
+# Field whose emptiness makes KYC rules not apply to a transaction
+KYC_STATUS_FIELD = 'sender_kyc_status'
+
+_ISINSTANCE_TYPES = {'int': int, 'float': float, 'str': str, 'bool': bool}
+
+_CONVERSIONS = {'str': str, 'float': float, 'int': int, 'bool': bool, 'len': len}
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_METHODS = ('lower', 'upper', 'strip', 'split')
+
+
+class UnsupportedCondition(Exception):
+    """Raised when a condition cannot be compiled column-wise."""
+
+
+class _Value:
+    """Per-row values of a sub-expression and the rows where it raised.
+
+    Exactly one representation is used: a constant (``scalar``), an array with
+    one entry per row, or ``codes`` into an array of distinct values.
+    """
+
+    __slots__ = ('is_scalar', 'scalar', 'array', 'codes', 'uniques', 'err')
+
+    def __init__(self, scalar: Any = None, array: Optional[np.ndarray] = None,
+                 codes: Optional[np.ndarray] = None, uniques: Optional[np.ndarray] = None,
+                 err: Any = False, is_scalar: bool = False):
+        self.is_scalar = is_scalar
+        self.scalar = scalar
+        self.array = array
+        self.codes = codes
+        self.uniques = uniques
+        self.err = err
+
+    @classmethod
+    def constant(cls, value: Any, err: Any = False) -> '_Value':
+        return cls(scalar=value, err=err, is_scalar=True)
+
+    @property
+    def coded(self) -> bool:
+        return self.codes is not None
+
+    @property
+    def typed_array(self) -> bool:
+        """True for a NumPy array of numbers or booleans."""
+        return not self.is_scalar and not self.coded and self.array.dtype != object
+
+    def materialize(self, n: int) -> np.ndarray:
+        if self.is_scalar:
+            return _to_objects([self.scalar] * n)
+        if self.coded:
+            return self.uniques.take(self.codes)
+        return self.array
+
+
+class _Chunk:
+    """A normalised frame plus per-column values shared by all rules."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.n = len(frame.index)
+        self._columns: Dict[Any, _Value] = {}
+
+    def column(self, name: Any) -> _Value:
+        if name not in self._columns:
+            series = self.frame[name]
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                value = _Value(array=series.to_numpy())
+            elif pd.api.types.infer_dtype(series, skipna=False) == 'string':
+                codes, uniques = pd.factorize(series.to_numpy())
+                value = _Value(codes=codes, uniques=np.asarray(uniques, dtype=object))
+            else:
+                value = _factorize_objects(series.to_numpy(dtype=object))
+            self._columns[name] = value
+        return self._columns[name]
+
+
+def _factorize_objects(array: np.ndarray) -> _Value:
+    """Factorise a mixed-type column without merging equal values of different types.
+
+    ``1``, ``1.0`` and ``True`` hash alike but ``str()`` and ``isinstance()``
+    tell them apart, so values are grouped by ``(type, value)``.
+    """
+    try:
+        value_codes, uniques = pd.factorize(array)
+    except TypeError:
+        # Unhashable cells (lists, dicts): evaluate row by row
+        return _Value(array=array)
+    type_codes, _ = pd.factorize(np.array([type(item).__name__ for item in array.tolist()], dtype=object))
+    keys = value_codes.astype(np.int64) * (type_codes.max(initial=0) + 1) + type_codes
+    codes, _ = pd.factorize(keys)
+    _, first = np.unique(codes, return_index=True)
+    return _Value(codes=codes, uniques=array[first])
+
+
+def _is_number(value: _Value) -> bool:
+    if value.is_scalar:
+        return isinstance(value.scalar, (int, float)) and not isinstance(value.scalar, bool)
+    return value.typed_array and value.array.dtype.kind in 'iuf'
+
+
+def _err_array(err: Any, n: int) -> np.ndarray:
+    if isinstance(err, np.ndarray):
+        return err
+    return np.full(n, bool(err))
+
+
+def _to_objects(items: List[Any]) -> np.ndarray:
+    out = np.empty(len(items), dtype=object)
+    out[:] = items
+    return out
+
+
+def _apply(items: List[Any], fn: Callable[[Any], Any]) -> Tuple[List[Any], np.ndarray]:
+    out: List[Any] = [None] * len(items)
+    err = np.zeros(len(items), bool)
+    for i, item in enumerate(items):
+        try:
+            out[i] = fn(item)
+        except Exception:
+            err[i] = True
+    return out, err
+
+
+def _map(value: _Value, fn: Callable[[Any], Any], n: int) -> _Value:
+    """Apply ``fn`` element by element (once per distinct value when coded)."""
+    if value.is_scalar:
+        try:
+            return _Value.constant(fn(value.scalar), value.err)
+        except Exception:
+            return _Value.constant(None, True)
+    if value.typed_array:
+        # Python scalars, so str()/int() give the same results as on a row dict;
+        # ints and booleans repeat, so factorise them first
+        if value.array.dtype.kind in 'iub':
+            codes, uniques = pd.factorize(value.array)
+            value = _Value(codes=codes, uniques=_to_objects(uniques.tolist()), err=value.err)
+        else:
+            value = _Value(array=_to_objects(value.array.tolist()), err=value.err)
+    if value.coded:
+        out, err = _apply(value.uniques.tolist(), fn)
+        return _Value(codes=value.codes, uniques=_to_objects(out), err=_err_array(value.err, n) | err[value.codes])
+    out, err = _apply(value.array.tolist(), fn)
+    return _Value(array=_to_objects(out), err=_err_array(value.err, n) | err)
+
+
+def _bool_mask(value: _Value, fn: Callable[[Any], Any], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise ``bool(fn(x))`` and error masks."""
+    mapped = _map(value, lambda item: bool(fn(item)), n)
+    if mapped.is_scalar:
+        return np.full(n, bool(mapped.scalar)), _err_array(mapped.err, n)
+    if mapped.coded:
+        truth = np.array([bool(item) for item in mapped.uniques.tolist()], dtype=bool)
+        return truth[mapped.codes], mapped.err
+    return np.array([bool(item) for item in mapped.array.tolist()], dtype=bool), mapped.err
+
+
+def _truthy(value: _Value, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise ``bool(value)`` and error masks."""
+    if value.typed_array:
+        if value.array.dtype == bool:
+            return value.array, _err_array(value.err, n)
+        arr = value.array.astype(float)
+        return (arr != 0) | np.isnan(arr), _err_array(value.err, n)
+    return _bool_mask(value, lambda item: item, n)
+
+
+def _result(truth: np.ndarray, err: np.ndarray) -> _Value:
+    return _Value(array=truth, err=err)
+
+
+class _Compiler:
+    """Turns a condition AST into a function ``chunk -> (mask, err)``."""
+
+    def compile(self, condition: str) -> Callable[[_Chunk], Tuple[np.ndarray, np.ndarray]]:
+        tree = ast.parse(condition, mode='eval')
+        expr = self._expr(tree.body)
+
+        def _evaluate(chunk: _Chunk) -> Tuple[np.ndarray, np.ndarray]:
+            return _truthy(expr(chunk), chunk.n)
+
+        return _evaluate
+
+    def _expr(self, node: ast.AST) -> Callable[[_Chunk], _Value]:
+        if isinstance(node, (ast.Constant, ast.List, ast.Tuple, ast.Set)) or (
+                isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub)):
+            value = self._constant(node)
+            return lambda chunk: _Value.constant(value)
+        if isinstance(node, ast.BoolOp):
+            return self._boolop(node)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = self._expr(node.operand)
+
+            def _not(chunk):
+                truth, err = _truthy(operand(chunk), chunk.n)
+                return _result(~truth, err)
+            return _not
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.Subscript):
+            return self._subscript(node)
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise UnsupportedCondition(ast.dump(node))
+
+    def _constant(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            items = [self._constant(elt) for elt in node.elts]
+            return {ast.List: list, ast.Tuple: tuple, ast.Set: set}[type(node)](items)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            return -node.operand.value
+        raise UnsupportedCondition(ast.dump(node))
+
+    @staticmethod
+    def _is_record(node: ast.AST) -> bool:
+        return isinstance(node, ast.Name) and node.id == 't'
+
+    def _subscript(self, node: ast.Subscript) -> Callable[[_Chunk], _Value]:
+        key = self._constant(node.slice)
+        if self._is_record(node.value):
+            def _required(chunk):
+                if key in chunk.frame.columns:
+                    return chunk.column(key)
+                # t[key] raises KeyError for every row
+                return _Value.constant(None, True)
+            return _required
+        target = self._expr(node.value)
+        return lambda chunk: _map(target(chunk), lambda item: item[key], chunk.n)
+
+    def _call(self, node: ast.Call) -> Callable[[_Chunk], _Value]:
+        if node.keywords:
+            raise UnsupportedCondition('keyword arguments')
+        func = node.func
+        # t.get(field[, default])
+        if isinstance(func, ast.Attribute) and self._is_record(func.value) and func.attr == 'get':
+            if not 1 <= len(node.args) <= 2:
+                raise UnsupportedCondition(ast.dump(node))
+            key = self._constant(node.args[0])
+            default = self._expr(node.args[1]) if len(node.args) > 1 else None
+
+            def _get(chunk):
+                if key in chunk.frame.columns:
+                    return chunk.column(key)
+                return default(chunk) if default else _Value.constant(None)
+            return _get
+        # <expr>.lower() / .upper() / .strip() / .split(sep)
+        if isinstance(func, ast.Attribute) and func.attr in _METHODS:
+            target = self._expr(func.value)
+            args = [self._constant(arg) for arg in node.args]
+            method = func.attr
+            return lambda chunk: _map(target(chunk), lambda item: getattr(item, method)(*args), chunk.n)
+        if isinstance(func, ast.Name):
+            if func.id == 'isinstance' and len(node.args) == 2:
+                types = self._types(node.args[1])
+                target = self._expr(node.args[0])
+                return lambda chunk: self._isinstance(target(chunk), types, chunk.n)
+            if func.id == 'any' and len(node.args) == 1 and isinstance(node.args[0], ast.GeneratorExp):
+                return self._any_contains(node.args[0])
+            if func.id in _CONVERSIONS and len(node.args) == 1:
+                target = self._expr(node.args[0])
+                convert = _CONVERSIONS[func.id]
+                if func.id == 'float':
+                    return lambda chunk: self._to_float(target(chunk), chunk.n)
+                return lambda chunk: _map(target(chunk), convert, chunk.n)
+            if func.id == 'range' and 1 <= len(node.args) <= 3:
+                value = range(*[self._constant(arg) for arg in node.args])
+                return lambda chunk: _Value.constant(value)
+        raise UnsupportedCondition(ast.dump(node))
+
+    def _types(self, node: ast.AST) -> tuple:
+        names = node.elts if isinstance(node, ast.Tuple) else [node]
+        types = []
+        for name in names:
+            if not isinstance(name, ast.Name) or name.id not in _ISINSTANCE_TYPES:
+                raise UnsupportedCondition(ast.dump(node))
+            types.append(_ISINSTANCE_TYPES[name.id])
+        return tuple(types)
+
+    @staticmethod
+    def _isinstance(value: _Value, types: tuple, n: int) -> _Value:
+        if value.typed_array:
+            # Numeric columns hold Python ints/floats once a row is turned into a dict
+            python_type = {'b': bool, 'i': int, 'u': int, 'f': float}.get(value.array.dtype.kind)
+            if python_type is not None:
+                return _result(np.full(n, issubclass(python_type, types)), _err_array(value.err, n))
+        truth, err = _bool_mask(value, lambda item: isinstance(item, types), n)
+        return _result(truth, err)
+
+    @staticmethod
+    def _to_float(value: _Value, n: int) -> _Value:
+        if _is_number(value) and not value.is_scalar:
+            return _Value(array=value.array.astype(float), err=value.err)
+        return _map(value, float, n)
+
+    def _compare(self, node: ast.Compare) -> Callable[[_Chunk], _Value]:
+        # 'field' in t
+        if (len(node.ops) == 1 and isinstance(node.ops[0], (ast.In, ast.NotIn))
+                and self._is_record(node.comparators[0])):
+            key = self._constant(node.left)
+            negate = isinstance(node.ops[0], ast.NotIn)
+            return lambda chunk: _Value.constant((key in chunk.frame.columns) != negate)
+
+        for op in node.ops:
+            if type(op) not in _COMPARE_OPS:
+                raise UnsupportedCondition(type(op).__name__)
+        operands = [self._expr(node.left)] + [self._expr(c) for c in node.comparators]
+        fns = [(_COMPARE_OPS[type(op)], isinstance(op, (ast.In, ast.NotIn))) for op in node.ops]
+
+        def _chain(chunk):
+            values = [operand(chunk) for operand in operands]
+            n = chunk.n
+            result = np.ones(n, bool)
+            err = np.zeros(n, bool)
+            for (fn, membership), left, right in zip(fns, values, values[1:]):
+                truth, op_err = self._compare_pair(fn, membership, left, right, n)
+                # Later comparisons in a chain only run while earlier ones hold
+                err |= result & op_err
+                result &= truth & ~op_err
+            return _result(result, err)
+        return _chain
+
+    @staticmethod
+    def _compare_pair(fn: Callable[[Any, Any], Any], membership: bool, left: _Value, right: _Value,
+                      n: int) -> Tuple[np.ndarray, np.ndarray]:
+        base_err = _err_array(left.err, n) | _err_array(right.err, n)
+        if not membership and _is_number(left) and _is_number(right):
+            a = left.scalar if left.is_scalar else left.array.astype(float)
+            b = right.scalar if right.is_scalar else right.array.astype(float)
+            return np.broadcast_to(fn(a, b), (n,)).copy(), base_err
+        if right.is_scalar:
+            other = right.scalar
+            truth, err = _bool_mask(left, lambda item: fn(item, other), n)
+            return truth, base_err | err
+        if left.is_scalar:
+            other = left.scalar
+            truth, err = _bool_mask(right, lambda item: fn(other, item), n)
+            return truth, base_err | err
+        # Two per-row operands: compare pairwise
+        lefts = left.materialize(n).tolist()
+        rights = right.materialize(n).tolist()
+        truth = np.zeros(n, bool)
+        err = base_err.copy()
+        for i in range(n):
+            if err[i]:
+                continue
+            try:
+                truth[i] = bool(fn(lefts[i], rights[i]))
+            except Exception:
+                err[i] = True
+        return truth, err
+
+    def _any_contains(self, gen: ast.GeneratorExp) -> Callable[[_Chunk], _Value]:
+        """``any(term in <expr> for term in [constants])``."""
+        if len(gen.generators) != 1:
+            raise UnsupportedCondition('nested generator')
+        comp = gen.generators[0]
+        if (comp.ifs or comp.is_async or not isinstance(comp.target, ast.Name)
+                or not isinstance(comp.iter, (ast.List, ast.Tuple))):
+            raise UnsupportedCondition(ast.dump(gen))
+        elt = gen.elt
+        if not (isinstance(elt, ast.Compare) and len(elt.ops) == 1 and isinstance(elt.ops[0], ast.In)
+                and isinstance(elt.left, ast.Name) and elt.left.id == comp.target.id):
+            raise UnsupportedCondition(ast.dump(gen))
+        terms = [self._constant(item) for item in comp.iter.elts]
+        haystack = self._expr(elt.comparators[0])
+
+        def _search(chunk):
+            truth, err = _bool_mask(haystack(chunk), lambda item: any(term in item for term in terms), chunk.n)
+            return _result(truth, err)
+        return _search
+
+    def _boolop(self, node: ast.BoolOp) -> Callable[[_Chunk], _Value]:
+        operands = [self._expr(value) for value in node.values]
+        is_and = isinstance(node.op, ast.And)
+
+        def _combine(chunk):
+            n = chunk.n
+            # Rows whose result is already decided by an earlier operand
+            decided = np.zeros(n, bool)
+            result = np.full(n, is_and)
+            err = np.zeros(n, bool)
+            for operand in operands:
+                truth, op_err = _truthy(operand(chunk), n)
+                live = ~decided & ~err
+                err |= live & op_err
+                live &= ~op_err
+                stop = live & (~truth if is_and else truth)
+                result[stop] = not is_and
+                decided |= stop
+            return _result(result, err)
+        return _combine
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Build the frame rules are evaluated on.
+
+    Mirrors the per-row dict the old code built: column names lower-cased
+    with spaces replaced by underscores (later duplicates win) and missing
+    values replaced by ``''``.
+    """
+    names = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+    frame = df.copy()
+    frame.columns = names
+    frame = frame.loc[:, ~pd.Index(names).duplicated(keep='last')]
+    for position, name in enumerate(frame.columns):
+        column = frame.iloc[:, position]
+        missing = column.isna()
+        if missing.any():
+            frame[name] = column.astype(object).where(~missing, '')
+    return frame
+
+
+class CompiledRule:
+    """A compliance rule with its condition compiled for a whole chunk."""
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.rule = rule
+        self.name = rule.get('name')
+        self.vectorized: Optional[Callable[[_Chunk], Tuple[np.ndarray, np.ndarray]]] = None
+        self.row_func: Optional[Callable[[Dict[str, Any]], Any]] = None
+        self.skip_without_kyc = bool(self.name) and 'kyc' in str(self.name).lower()
+
+        condition = rule.get('condition')
+        if callable(condition):
+            self.row_func = condition
+        elif isinstance(condition, str):
+            for old, new in CONDITION_REPLACEMENTS:
+                condition = condition.replace(old, new)
+            try:
+                self.vectorized = _Compiler().compile(condition)
+            except (UnsupportedCondition, SyntaxError, ValueError, TypeError) as e:
+                logging.info(f"Rule {rule.get('id', 'unknown')} evaluated row by row: {e}")
+                try:
+                    self.row_func = eval(f"lambda t: {condition}")
+                except Exception as compile_error:
+                    logging.error(f"Error compiling condition for rule {rule.get('id', 'unknown')}: {compile_error}")
+                    self.row_func = lambda t: False
+
+    @property
+    def active(self) -> bool:
+        """Rules without a name or usable condition never match."""
+        return self.name is not None and (self.vectorized is not None or self.row_func is not None)
+
+    def mask(self, chunk: _Chunk, records: Callable[[], List[Dict[str, Any]]]) -> np.ndarray:
+        """Boolean mask of the rows in ``chunk`` that match this rule."""
+        if not self.active:
+            return np.zeros(chunk.n, bool)
+        if self.vectorized is not None:
+            truth, err = self.vectorized(chunk)
+            matched = truth & ~err
+        else:
+            matched = np.zeros(chunk.n, bool)
+            for i, record in enumerate(records()):
+                try:
+                    matched[i] = bool(self.row_func(record))
+                except Exception as e:
+                    logging.error(f"Error applying rule {self.name}: {e}")
+        if self.skip_without_kyc:
+            if KYC_STATUS_FIELD not in chunk.frame.columns:
+                return np.zeros(chunk.n, bool)
+            has_status, status_err = _truthy(chunk.column(KYC_STATUS_FIELD), chunk.n)
+            matched = matched & has_status & ~status_err
+        return matched
+
+
+def compile_rules(rules: List[Dict[str, Any]]) -> List[CompiledRule]:
+    """Compile every rule's condition once."""
+    return [CompiledRule(rule) for rule in rules]
+
+
+def evaluate_rules(compiled: List[CompiledRule], frame: pd.DataFrame) -> np.ndarray:
+    """Boolean matrix (rows x rules) of the rules each row of a normalised frame matches."""
+    chunk = _Chunk(frame)
+    cache: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _records():
+        if 'rows' not in cache:
+            cache['rows'] = frame.to_dict('records')
+        return cache['rows']
+
+    if not compiled:
+        return np.zeros((chunk.n, 0), bool)
+    return np.column_stack([rule.mask(chunk, _records) for rule in compiled])
+
+
+def match_rules(compiled: List[CompiledRule], frame: pd.DataFrame) -> List[Tuple[Dict[str, Any], ...]]:
+    """Return, for each row of a normalised frame, the rules it matches in rule order.
+
+    Rows with the same matches share one tuple.
+    """
+    n = len(frame.index)
+    if not compiled or n == 0:
+        return [()] * n
+    masks = evaluate_rules(compiled, frame)
+    # Rows fall into a handful of match patterns; build each rule tuple once
+    if len(compiled) <= 63:
+        keys = masks.astype(np.int64) @ (np.int64(1) << np.arange(len(compiled), dtype=np.int64))
+        codes, _ = pd.factorize(keys)
+    else:
+        _, codes = np.unique(masks, axis=0, return_inverse=True)
+        codes = codes.ravel()
+    _, first = np.unique(codes, return_index=True)
+    patterns = [tuple(compiled[j].rule for j in np.flatnonzero(masks[row])) for row in first]
+    return [patterns[code] for code in codes.tolist()]
@@ -0,0 +1,206 @@
+"""
+Process-wide registry of compiled compliance rules.
+
+Rules are read from the graph and compiled (see ``rule_engine``) once, then
+shared by every request. The registry re-reads the rules at most every
+``check_interval`` seconds and only recompiles when their checksum changes,
+so uploads and the ``/upload`` page no longer open a driver, re-run the
+constraint DDL and re-``eval`` every condition on each call.
+
+Callers get a ``RuleSet``: an immutable snapshot (rules are read-only
+mappings) tagged with the checksum as its ``version``. A rule change produces
+a new ``RuleSet``; snapshots already handed out are never modified.
+"""
+from __future__ import annotations
+import os
+import time
+import logging
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Callable, Mapping, Tuple
+
+import pandas as pd
+
+from .graph import (
+    Neo4jClient, get_client_from_env, fetch_compliance_rules, compliance_rules_checksum,
+    initialize_compliance_rules,
+)
+from .rule_engine import CompiledRule, compile_rules, match_rules
+
+# Screening rules applied to uploaded transactions on top of the rules stored
+# in the graph
+ADDITIONAL_COMPLIANCE_RULES = [
+    # High-value transaction rule
+    {
+        'id': 'high_value_transaction',
+        'name': 'High Value Transaction',
+        'description': 'Transaction exceeds threshold',
+        'risk': 'HIGH',
+        'condition': "isinstance(t.get('amount', 0), (int, float)) and float(t.get('amount', 0)) > 900000"
+    },
+    # Suspicious transaction patterns
+    {
+        'id': 'suspicious_transaction_pattern',
+        'name': 'Suspicious Transaction Pattern',
+        'description': 'Transaction matches known suspicious patterns',
+        'risk': 'HIGH',
+        'condition': "any(term in str(t.get('description', '')).lower() for term in ['urgent', 'immediate', 'crypto', 'bitcoin', 'forex', 'gambling'])"
+    },
+    # Non-KYC transaction
+    {
+        'id': 'non_kyc_transaction',
+        'name': 'Non-KYC Transaction',
+        'description': 'Transaction from an account with incomplete or expired KYC',
+        'risk': 'HIGH',
+        'condition': "str(t.get('sender_kyc_status', '')).lower() in ['incomplete', 'expired', 'pending', 'rejected']"
+    },
+    # Unusual transaction time
+    {
+        'id': 'unusual_transaction_time',
+        'name': 'Unusual Transaction Time',
+        'description': 'Transaction occurred during non-business hours',
+        'risk': 'MEDIUM',
+        'condition': "'time' in t and t['time'] and isinstance(t['time'], str) and ':' in t['time'] and int(t['time'].split(':')[0]) not in range(9, 18)"
+    },
+    # High-risk transaction type
+    {
+        'id': 'high_risk_transaction_type',
+        'name': 'High-Risk Transaction Type',
+        'description': 'Transaction type is considered high-risk',
+        'risk': 'HIGH',
+        'condition': "str(t.get('transaction_type', '')).lower() in ['offshore', 'crypto', 'forex', 'gambling']"
+    }
+]
+
+
+def _freeze(rule: Dict[str, Any]) -> Mapping[str, Any]:
+    return MappingProxyType(dict(rule))
+
+
+class RuleSet:
+    """Immutable snapshot of the compliance rules and their compiled conditions."""
+
+    __slots__ = ('_version', '_stored_rules', '_rules', '_compiled', '_loaded_at')
+
+    def __init__(self, stored_rules: List[Dict[str, Any]], version: str):
+        self._version = version
+        self._stored_rules: Tuple[Mapping[str, Any], ...] = tuple(_freeze(rule) for rule in stored_rules)
+        self._rules = self._stored_rules + tuple(_freeze(rule) for rule in ADDITIONAL_COMPLIANCE_RULES)
+        self._compiled: Tuple[CompiledRule, ...] = tuple(compile_rules(list(self._rules)))
+        self._loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        """Checksum of the stored rules this set was built from."""
+        return self._version
+
+    @property
+    def stored_rules(self) -> Tuple[Mapping[str, Any], ...]:
+        """Rules read from the graph."""
+        return self._stored_rules
+
+    @property
+    def rules(self) -> Tuple[Mapping[str, Any], ...]:
+        """Stored rules followed by the screening rules, in evaluation order."""
+        return self._rules
+
+    @property
+    def loaded_at(self) -> float:
+        return self._loaded_at
+
+    def stored_rules_list(self) -> List[Dict[str, Any]]:
+        """Mutable copies of the stored rules, e.g. for JSON responses and templates."""
+        return [dict(rule) for rule in self._stored_rules]
+
+    def match(self, frame: pd.DataFrame) -> List[Tuple[Mapping[str, Any], ...]]:
+        """Rules matched by each row of a normalised frame (see ``rule_engine.normalize_frame``)."""
+        return match_rules(list(self._compiled), frame)
+
+
+class RuleRegistry:
+    """Loads, compiles and caches the compliance rules for the whole process."""
+
+    def __init__(self, client_factory: Callable[[], Neo4jClient] = get_client_from_env,
+                 check_interval: float = 30.0):
+        self._client_factory = client_factory
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._rule_set: Optional[RuleSet] = None
+        self._checked_at = 0.0
+        self._schema_ready = False
+
+    def get(self) -> RuleSet:
+        """Return the current rule set, re-checking the graph if the last check is old enough."""
+        with self._lock:
+            rule_set = self._rule_set
+            due = rule_set is None or (time.monotonic() - self._checked_at) >= self._check_interval
+        if not due:
+            return rule_set
+        if rule_set is not None and not self._refresh_lock.acquire(blocking=False):
+            # Another request is already checking; serve the current rules meanwhile
+            return rule_set
+        if rule_set is None:
+            self._refresh_lock.acquire()
+        try:
+            return self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self) -> None:
+        """Force a check against the graph on the next ``get``."""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def _refresh(self) -> RuleSet:
+        with self._lock:
+            current = self._rule_set
+            if current is not None and (time.monotonic() - self._checked_at) < self._check_interval:
+                return current
+        rules = self._load(current)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if rules is None:
+                # Database unavailable; keep serving what we have
+                if self._rule_set is None:
+                    self._rule_set = RuleSet([], compliance_rules_checksum([]))
+                return self._rule_set
+            version = compliance_rules_checksum(rules)
+            if self._rule_set is None or self._rule_set.version != version:
+                if self._rule_set is not None:
+                    logging.info(f"Compliance rules changed ({self._rule_set.version[:8]} -> {version[:8]}); recompiling")
+                if not rules:
+                    logging.warning("No compliance rules found in the database. Please add rules to the database.")
+                self._rule_set = RuleSet(rules, version)
+            return self._rule_set
+
+    def _load(self, current: Optional[RuleSet]) -> Optional[List[Dict[str, Any]]]:
+        """Read the stored rules; None when the database cannot be reached."""
+        client = self._client_factory()
+        try:
+            if not client.in_memory and (not client.enabled or not client._driver):
+                if current is None:
+                    logging.warning("No valid Neo4j connection available, using default compliance rules")
+                return None
+            if not self._schema_ready and not client.in_memory:
+                initialize_compliance_rules(client)
+                self._schema_ready = True
+            return fetch_compliance_rules(client)
+        except Exception as e:
+            logging.error(f"Error fetching compliance rules: {str(e)}")
+            return None
+        finally:
+            client.close()
+
+
+_rule_registry: Optional[RuleRegistry] = None
+_rule_registry_lock = threading.Lock()
+
+
+def get_rule_registry() -> RuleRegistry:
+    """Return the process-wide rule registry, creating it on first use."""
+    global _rule_registry
+    with _rule_registry_lock:
+        if _rule_registry is None:
+            _rule_registry = RuleRegistry(check_interval=float(os.getenv('COMPLIANCE_RULES_CHECK_INTERVAL', 30)))
+        return _rule_registry
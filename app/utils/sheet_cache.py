@@ -0,0 +1,306 @@
+"""
+Columnar cache of uploaded workbooks.
+
+Parsing ``.xlsx`` XML is the slowest part of every Excel operation, so each
+upload is converted once into a cache entry named after the SHA-256 of its
+content:
+
+    <EXCEL_CACHE_DIR>/<sha256>/manifest.pkl       sheet names, columns, row counts
+    <EXCEL_CACHE_DIR>/<sha256>/<sheet>-<part>.pkl  PART_ROWS rows per file
+
+Each part stores the sheet's cells column by column. A column whose cells
+are all plain ints, floats, bools or naive datetimes is stored as a typed
+NumPy array; any other column keeps its cell values as an object array.
+Decoding gives back the exact cell values openpyxl produced, and DataFrames
+are rebuilt from them the same way ``excel_stream`` builds them. Chunks served
+from the cache are therefore identical to parsed ones, dtypes included, for
+any chunk size.
+
+``excel_stream`` consults the cache before opening a workbook. A cache entry
+is found by hashing the file. Digests are remembered per path, size and
+modification time, so a file that changes on disk is hashed again and no
+longer matches its old entry. The least recently used entries beyond
+``EXCEL_CACHE_MAX_ENTRIES`` are removed after each conversion.
+"""
+from __future__ import annotations
+import os
+import uuid
+import pickle
+import shutil
+import logging
+import datetime
+import threading
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .excel_stream import SheetRef, get_sheet_names, iter_sheet_rows
+from .upload_store import content_digest, remember_digest
+
+_DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs', 'sheet_cache'
+)
+
+# Bump when the on-disk layout changes; older entries are then ignored
+FORMAT_VERSION = 1
+
+# Rows per part file
+PART_ROWS = 50000
+
+DEFAULT_MAX_ENTRIES = 20
+
+# Typed encodings for columns whose cells all have one exact Python type
+_TYPED = {
+    int: 'int64',
+    float: 'float64',
+    bool: 'bool',
+    datetime.datetime: 'datetime64[us]',
+}
+
+
+def cache_enabled() -> bool:
+    return os.getenv('EXCEL_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+
+def get_cache_dir() -> str:
+    return os.getenv('EXCEL_CACHE_DIR', _DEFAULT_CACHE_DIR)
+
+
+def get_max_entries() -> int:
+    return max(1, int(os.getenv('EXCEL_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)))
+
+
+def _encode_column(values: np.ndarray) -> np.ndarray:
+    """Typed array when every cell has the same plain type, else the object array itself."""
+    if not len(values):
+        return values
+    kind = type(values[0])
+    dtype = _TYPED.get(kind)
+    if dtype is None or any(type(value) is not kind for value in values):
+        return values
+    if kind is datetime.datetime and any(value.tzinfo is not None for value in values):
+        return values
+    try:
+        return np.array(values.tolist(), dtype=dtype)
+    except (OverflowError, ValueError):
+        return values
+
+
+def _decode_column(values: np.ndarray) -> np.ndarray:
+    # astype(object) yields Python ints/floats/bools and datetime.datetime for [us]
+    return values if values.dtype == object else values.astype(object)
+
+
+class CachedWorkbook:
+    """A converted workbook: sheet metadata from the manifest, rows loaded from part files on demand."""
+
+    def __init__(self, directory: str, manifest: Dict[str, Any]):
+        self.directory = directory
+        self.digest = manifest['digest']
+        self.sheets: List[Dict[str, Any]] = manifest['sheets']
+
+    def sheet_names(self) -> List[str]:
+        return [sheet['name'] for sheet in self.sheets]
+
+    def _sheet(self, sheet: SheetRef) -> Dict[str, Any]:
+        if sheet is None:
+            return self.sheets[0]
+        if isinstance(sheet, int):
+            return self.sheets[sheet]
+        for entry in self.sheets:
+            if entry['name'] == sheet:
+                return entry
+        raise KeyError(f"Worksheet {sheet} does not exist.")
+
+    def headers(self, sheet: SheetRef = None) -> List[Any]:
+        return list(self._sheet(sheet)['columns'])
+
+    def row_count(self, sheet: SheetRef = None) -> int:
+        return self._sheet(sheet)['rows']
+
+    def _part(self, entry: Dict[str, Any], index: int) -> np.ndarray:
+        """Rows of one part file as a 2-D object array."""
+        with open(os.path.join(self.directory, entry['parts'][index]), 'rb') as handle:
+            columns = pickle.load(handle)
+        width = len(entry['columns'])
+        rows = len(columns[0]) if columns else 0
+        block = np.empty((rows, width), dtype=object)
+        for position, values in enumerate(columns):
+            block[:, position] = _decode_column(values)
+        return block
+
+    def iter_chunks(self, sheet: SheetRef = None, chunk_size: int = PART_ROWS,
+                    nrows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Same chunks as ``excel_stream.iter_excel_chunks`` for the source workbook."""
+        entry = self._sheet(sheet)
+        columns = entry['columns']
+        chunk_size = max(1, chunk_size)
+        total = entry['rows'] if nrows is None else min(entry['rows'], max(0, nrows))
+        if total == 0:
+            yield _frame(np.empty((0, len(columns)), dtype=object), columns, 0)
+            return
+        loaded_index, loaded = -1, None
+        for start in range(0, total, chunk_size):
+            stop = min(start + chunk_size, total)
+            pieces = []
+            position = start
+            while position < stop:
+                index = position // PART_ROWS
+                if index != loaded_index:
+                    loaded_index, loaded = index, self._part(entry, index)
+                begin = position - index * PART_ROWS
+                end = min(stop - index * PART_ROWS, len(loaded))
+                pieces.append(loaded[begin:end])
+                position += end - begin
+            block = pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+            yield _frame(block, columns, start)
+
+
+def _frame(block: np.ndarray, columns: List[Any], offset: int) -> pd.DataFrame:
+    # from_records on the object block infers dtypes exactly as it does for row tuples
+    df = pd.DataFrame.from_records(block, columns=columns) if len(block) else pd.DataFrame.from_records([], columns=columns)
+    df.index = pd.RangeIndex(offset, offset + len(block))
+    return df
+
+
+def _write_sheet(directory: str, sheet_index: int, columns: List[Any], rows: Iterator[Tuple[Any, ...]]) -> Tuple[int, List[str]]:
+    """Write one sheet's rows as part files; returns (row count, part file names)."""
+    width = len(columns)
+    parts: List[str] = []
+    buffer: List[Tuple[Any, ...]] = []
+    count = 0
+
+    def _flush():
+        block = np.empty((len(buffer), width), dtype=object)
+        for position, row in enumerate(buffer):
+            block[position] = row
+        name = f'{sheet_index}-{len(parts)}.pkl'
+        with open(os.path.join(directory, name), 'wb') as handle:
+            pickle.dump([_encode_column(block[:, column]) for column in range(width)], handle,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        parts.append(name)
+
+    for row in rows:
+        # Same row filtering and padding as excel_stream.iter_excel_chunks
+        if all(value is None for value in row):
+            continue
+        buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+        count += 1
+        if len(buffer) >= PART_ROWS:
+            _flush()
+            buffer = []
+    if buffer:
+        _flush()
+    return count, parts
+
+
+_workbooks: Dict[str, CachedWorkbook] = {}
+_workbooks_lock = threading.Lock()
+
+
+def _entry_dir(digest: str) -> str:
+    return os.path.join(get_cache_dir(), digest)
+
+
+def _load(digest: str) -> Optional[CachedWorkbook]:
+    with _workbooks_lock:
+        workbook = _workbooks.get(digest)
+    directory = _entry_dir(digest)
+    if workbook is not None and workbook.directory == directory and os.path.isdir(directory):
+        return workbook
+    try:
+        with open(os.path.join(directory, 'manifest.pkl'), 'rb') as handle:
+            manifest = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if manifest.get('format') != FORMAT_VERSION or manifest.get('digest') != digest:
+        return None
+    workbook = CachedWorkbook(directory, manifest)
+    try:
+        # Directory mtime orders entries for pruning
+        os.utime(directory)
+    except OSError:
+        pass
+    with _workbooks_lock:
+        _workbooks[digest] = workbook
+    return workbook
+
+
+def cached_workbook(path: str) -> Optional[CachedWorkbook]:
+    """The cache entry for the current content of ``path``, or None if it has not been converted."""
+    if not cache_enabled():
+        return None
+    try:
+        return _load(content_digest(path))
+    except OSError:
+        return None
+
+
+def convert_workbook(path: str, digest: Optional[str] = None) -> Optional[CachedWorkbook]:
+    """
+    Convert every sheet of a workbook into a cache entry (no-op if it exists).
+
+    Args:
+        path: Path to the .xlsx/.xls file
+        digest: SHA-256 of the file if already known
+
+    Returns:
+        The cache entry, or None when caching is disabled or conversion failed
+    """
+    if not cache_enabled():
+        return None
+    try:
+        if digest is None:
+            digest = content_digest(path)
+        else:
+            remember_digest(path, digest)
+        existing = _load(digest)
+        if existing is not None:
+            return existing
+
+        final_dir = _entry_dir(digest)
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        work_dir = f'{final_dir}.tmp-{uuid.uuid4().hex[:8]}'
+        os.makedirs(work_dir)
+        try:
+            sheets = []
+            for index, name in enumerate(get_sheet_names(path, use_cache=False)):
+                for columns, rows in iter_sheet_rows(path, index):
+                    count, parts = _write_sheet(work_dir, index, columns, rows)
+                sheets.append({'name': name, 'columns': columns, 'rows': count, 'parts': parts})
+            manifest = {'format': FORMAT_VERSION, 'digest': digest, 'source': os.path.basename(path), 'sheets': sheets}
+            # Pickled rather than JSON so header labels keep their types (numbers, dates)
+            with open(os.path.join(work_dir, 'manifest.pkl'), 'wb') as handle:
+                pickle.dump(manifest, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            try:
+                os.replace(work_dir, final_dir)
+            except OSError:
+                # Another worker converted the same content first
+                shutil.rmtree(work_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+        logging.info(f"Cached workbook {os.path.basename(path)} ({digest[:12]}): "
+                     f"{sum(sheet['rows'] for sheet in sheets)} rows in {len(sheets)} sheets")
+        _prune(keep=digest)
+        return _load(digest)
+    except Exception as e:
+        logging.warning(f"Could not cache workbook {path}: {e}")
+        return None
+
+
+def _prune(keep: str) -> None:
+    """Remove the least recently used entries beyond EXCEL_CACHE_MAX_ENTRIES."""
+    cache_dir = get_cache_dir()
+    try:
+        entries = [name for name in os.listdir(cache_dir)
+                   if name != keep and '.tmp-' not in name and os.path.isdir(os.path.join(cache_dir, name))]
+    except OSError:
+        return
+    entries.sort(key=lambda name: os.path.getmtime(os.path.join(cache_dir, name)), reverse=True)
+    for name in entries[get_max_entries() - 1:]:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        with _workbooks_lock:
+            _workbooks.pop(name, None)
@@ -0,0 +1,186 @@
+"""
+Cached graph statistics for the dashboard and database log endpoints.
+
+Counts are read from the Neo4j count store (single-label node counts and
+single-type relationship counts), so a refresh costs the same on an empty
+graph as on a graph with millions of nodes. Results are cached for a short
+TTL and refreshed in the background; write paths call ``invalidate_graph_stats``
+so the next read picks up fresh numbers.
+"""
+from __future__ import annotations
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Callable, List
+
+from .graph import Neo4jClient, get_client_from_env
+from .query_stats import run_query
+
+# Node labels shown on the dashboard and in the database log
+DASHBOARD_NODE_LABELS = ('Circular', 'Violation', 'PenaltyRange', 'LegalProvision', 'Reason', 'ComplianceRule')
+
+# Relationship types shown on the dashboard cards
+DASHBOARD_REL_TYPES = ('HAS_REASON', 'HAS_VIOLATION', 'INVOKES', 'PENALTY_IN_RANGE')
+
+
+def _empty_snapshot() -> Dict[str, Any]:
+    return {
+        'nodes': {label: 0 for label in DASHBOARD_NODE_LABELS},
+        'relationships': {rel_type: 0 for rel_type in DASHBOARD_REL_TYPES},
+        'violation_types': [],
+        'total_fines': 0,
+        'refreshed_at': None,
+    }
+
+
+def collect_graph_stats(client: Neo4jClient) -> Dict[str, Any]:
+    """Read dashboard statistics from the database.
+
+    Node and relationship counts use one count-store lookup per label/type
+    (``MATCH (n:Label) RETURN count(n)``), which Neo4j answers without
+    touching any node or relationship records.
+
+    Args:
+        client: Neo4j client instance
+
+    Returns:
+        Dictionary with keys: nodes, relationships, violation_types,
+        total_fines, refreshed_at
+    """
+    if getattr(client, 'in_memory', False):
+        return client.graph_stats()
+    snapshot = _empty_snapshot()
+    if not client.enabled or not client._driver:
+        return snapshot
+
+    with client.get_session() as session:
+        for label in DASHBOARD_NODE_LABELS:
+            rows = run_query(session, f'stats.node_count:{label}', f"MATCH (n:`{label}`) RETURN count(n) AS count")
+            snapshot['nodes'][label] = rows[0]['count'] if rows else 0
+
+        rel_types: List[str] = [
+            r['relationshipType'] for r in run_query(session, 'stats.relationship_types', "CALL db.relationshipTypes()")
+        ]
+        for rel_type in sorted(set(rel_types) | set(DASHBOARD_REL_TYPES)):
+            rows = run_query(session, f'stats.relationship_count:{rel_type}',
+                             f"MATCH ()-[r:`{rel_type}`]->() RETURN count(r) AS count")
+            snapshot['relationships'][rel_type] = rows[0]['count'] if rows else 0
+
+        # Not a count-store query, but it runs at most once per TTL instead of per page view
+        violation_query = """
+        MATCH (v:Violation)
+        RETURN v.type as violation_type, count(*) as count
+        ORDER BY count DESC
+        LIMIT 10
+        """
+        snapshot['violation_types'] = [
+            {'type': item['violation_type'], 'count': item['count']}
+            for item in run_query(session, 'stats.violation_types', violation_query)
+        ]
+
+        fines_query = """
+        MATCH (v:Violation)-[:PENALTY_IN_RANGE]->(p:PenaltyRange)
+        RETURN sum(p.max) as total_fines
+        """
+        rows = run_query(session, 'stats.total_fines', fines_query)
+        if rows and rows[0]['total_fines'] is not None:
+            snapshot['total_fines'] = int(rows[0]['total_fines'])
+
+    snapshot['refreshed_at'] = time.time()
+    return snapshot
+
+
+class GraphStatsService:
+    """Process-wide TTL cache around ``collect_graph_stats``.
+
+    The first call loads synchronously; after that callers always get the
+    cached snapshot immediately and a stale or invalidated snapshot is
+    refreshed on a background thread (stale-while-revalidate).
+    """
+
+    def __init__(self, client_factory: Callable[[], Neo4jClient] = get_client_from_env, ttl: float = 30.0):
+        self._client_factory = client_factory
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._dirty = False
+        self._refreshing = False
+
+    def get(self) -> Dict[str, Any]:
+        """Return the current statistics snapshot."""
+        with self._lock:
+            snapshot = self._snapshot
+            stale = self._dirty or (time.monotonic() - self._loaded_at) > self._ttl
+        if snapshot is None:
+            return self.refresh()
+        if stale:
+            self._refresh_in_background()
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Mark the cached snapshot as stale so the next read triggers a refresh."""
+        with self._lock:
+            self._dirty = True
+
+    def refresh(self) -> Dict[str, Any]:
+        """Reload statistics from the database and replace the cached snapshot."""
+        with self._lock:
+            self._dirty = False
+        client = self._client_factory()
+        if not client.enabled and self._snapshot is not None:
+            # Database unavailable (or circuit breaker open); keep the last good numbers
+            with self._lock:
+                self._loaded_at = time.monotonic()
+                return self._snapshot
+        try:
+            snapshot = collect_graph_stats(client)
+        except Exception as e:
+            logging.error(f"Error refreshing graph statistics: {str(e)}")
+            with self._lock:
+                # Keep serving the previous snapshot; retry after another TTL
+                self._loaded_at = time.monotonic()
+                return self._snapshot or _empty_snapshot()
+        finally:
+            client.close()
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        return snapshot
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _worker():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_worker, name='graph-stats-refresh', daemon=True).start()
+
+
+_stats_service: Optional[GraphStatsService] = None
+_stats_service_lock = threading.Lock()
+
+
+def get_stats_service() -> GraphStatsService:
+    """Return the process-wide statistics service, creating it on first use."""
+    global _stats_service
+    with _stats_service_lock:
+        if _stats_service is None:
+            ttl = float(os.getenv('GRAPH_STATS_TTL', 30))
+            _stats_service = GraphStatsService(ttl=ttl)
+        return _stats_service
+
+
+def invalidate_graph_stats() -> None:
+    """Mark cached statistics stale; called by our own write paths."""
+    if _stats_service is not None:
+        _stats_service.invalidate()
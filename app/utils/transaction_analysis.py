@@ -2,9 +2,11 @@
 Enhanced transaction analysis for KYC and compliance rule checking.
 """
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 import re
+from .transaction_processor import get_account_month_totals
+from .query_stats import run_query
 
 class TransactionAnalyzer:
     """Analyzes transactions for KYC and compliance violations."""
@@ -63,8 +65,8 @@ class TransactionAnalyzer:
             LIMIT 1
             """
             with self.neo4j._driver.session() as session:
-                result = session.run(query, account_number=account_number)
-                record = result.single()
+                rows = run_query(session, 'analysis.kyc_violation', query, account_number=account_number)
+                record = rows[0] if rows else None
                 
                 if record:
                     # Use the stored violation details if available, otherwise use a default message
@@ -90,36 +92,19 @@ class TransactionAnalyzer:
         try:
             # Parse the transaction date
             tx_date = datetime.strptime(date_str, '%Y-%m-%d')
-            month_start = tx_date.replace(day=1).strftime('%Y-%m-%d')
-            month_end = (tx_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-            month_end = month_end.strftime('%Y-%m-%d')
             
-            # Get total transactions for the month
-            query = """
-            MATCH (t:Transaction)-[:MADE_BY]->(a:Account {number: $account_number})
-            WHERE t.date >= date($month_start) AND t.date <= date($month_end)
-            RETURN COALESCE(SUM(toFloat(t.amount)), 0) as monthly_total,
-                   COUNT(t) as transaction_count
-            """
+            # Running total and count for the month, maintained at ingestion time
+            record = get_account_month_totals(self.neo4j, account_number, tx_date.strftime('%Y-%m'))
             
-            with self.neo4j._driver.session() as session:
-                result = session.run(
-                    query, 
-                    account_number=account_number,
-                    month_start=month_start,
-                    month_end=month_end
-                )
-                record = result.single()
-                
-                if record and record["monthly_total"] > self.monthly_threshold:
-                    return {
-                        "transaction_id": None,
-                        "violation_type": "Monthly Threshold Exceeded",
-                        "status": "Violation",
-                        "severity": "HIGH",
-                        "explanation": f"Monthly transaction limit of ₹{self.monthly_threshold:,.2f} exceeded (Current: ₹{record['monthly_total']:,.2f} across {record['transaction_count']} transactions)",
-                        "rule": "Monthly Transaction Limit"
-                    }
+            if record["total"] > self.monthly_threshold:
+                return {
+                    "transaction_id": None,
+                    "violation_type": "Monthly Threshold Exceeded",
+                    "status": "Violation",
+                    "severity": "HIGH",
+                    "explanation": f"Monthly transaction limit of ₹{self.monthly_threshold:,.2f} exceeded (Current: ₹{record['total']:,.2f} across {record['count']} transactions)",
+                    "rule": "Monthly Transaction Limit"
+                }
                     
         except Exception as e:
             logging.error(f"Error checking monthly threshold: {str(e)}")
@@ -188,7 +173,7 @@ class TransactionAnalyzer:
         """Get recent transaction history for an account."""
         try:
             query = """
-            MATCH (t:Transaction)-[:MADE_BY]->(a:Account {number: $account_number})
+            MATCH (a:Account {number: $account_number})-[:MADE_TRANSACTION]->(t:Transaction)
             WHERE t.date >= date() - duration('P' + $days + 'D')
             RETURN t.transaction_id as transaction_id,
                    t.amount as amount,
@@ -199,8 +184,8 @@ class TransactionAnalyzer:
             """
             
             with self.neo4j._driver.session() as session:
-                result = session.run(query, account_number=account_number, days=str(days))
-                return [dict(record) for record in result]
+                return run_query(session, 'analysis.transaction_history', query,
+                                 account_number=account_number, days=str(days))
                 
         except Exception as e:
             logging.error(f"Error fetching transaction history: {str(e)}")
@@ -215,8 +200,8 @@ class TransactionAnalyzer:
             RETURN count(v) > 0 as is_high_risk
             """
             with self.neo4j._driver.session() as session:
-                result = session.run(query, account_number=account_number)
-                return result.single()["is_high_risk"]
+                rows = run_query(session, 'analysis.high_risk_customer', query, account_number=account_number)
+                return rows[0]["is_high_risk"]
                 
         except Exception as e:
             logging.error(f"Error checking customer risk: {str(e)}")
@@ -4,7 +4,8 @@ Transaction processing module for handling transaction data and linking to viola
 from typing import Dict, Any, List, Optional, Union
 import pandas as pd
 import logging
-from .graph import Neo4jClient
+from .graph import Neo4jClient, notify_graph_write, content_fingerprint, find_unchanged
+from .query_stats import run_query, execute_write
 
 def process_transaction_data(client: Neo4jClient, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Process transaction data and link with existing violations.
@@ -22,20 +23,79 @@ def process_transaction_data(client: Neo4jClient, transactions: List[Dict[str, A
     Returns:
         List of dictionaries with matching results
     """
+    if getattr(client, 'in_memory', False):
+        results = client.process_transaction_data(transactions)
+        notify_graph_write()
+        return results
     if not client.enabled or not hasattr(client, '_driver') or not client._driver:
         return []
 
     results = []
     with client._driver.session(database=getattr(client, '_database', None)) as session:
-        for tx_data in transactions:
+        # Skip transactions already stored with the same content and no new violations to link
+        rows: Dict[int, Dict[str, Any]] = {}
+        for idx, tx_data in enumerate(transactions):
             try:
-                result = session.write_transaction(_process_single_transaction, tx_data)
+                rows[idx] = dict(_transaction_params(tx_data), idx=idx)
+            except Exception as e:
+                # Malformed rows (e.g. a non-numeric amount) are logged and skipped, not the whole batch
+                logging.error(f"Error processing transaction {tx_data.get('transaction_id')}: {e}")
+        unchanged = find_unchanged(session, 'transactions.unchanged', _TRANSACTIONS_UNCHANGED, list(rows.values()))
+        if unchanged:
+            logging.info(f"Skipping {len(unchanged)} unchanged transaction(s)")
+            results.extend(run_query(session, 'transactions.existing_links', _EXISTING_LINKS,
+                                     ids=[rows[idx]['transaction_id'] for idx in unchanged]))
+        for idx, tx_data in enumerate(transactions):
+            if idx not in rows or idx in unchanged:
+                continue
+            try:
+                result = execute_write(session, _process_single_transaction, tx_data)
                 if result:
                     results.extend(result)
             except Exception as e:
                 logging.error(f"Error processing transaction {tx_data.get('transaction_id')}: {e}")
+    notify_graph_write()
     return results
 
+# Fields that make up a transaction's fingerprint
+TRANSACTION_FINGERPRINT_FIELDS = ('transaction_id', 'account_number', 'amount', 'date', 'description',
+                                  'transaction_type')
+
+def _transaction_params(tx_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalised query parameters for a transaction, including its fingerprint."""
+    params = {
+        'transaction_id': tx_data.get('transaction_id'),
+        'account_number': tx_data.get('account_number'),
+        'amount': float(tx_data.get('amount', 0)),
+        'date': tx_data.get('date'),
+        'description': tx_data.get('description', ''),
+        'transaction_type': tx_data.get('transaction_type', 'UNKNOWN'),
+    }
+    params['fingerprint'] = content_fingerprint(params, TRANSACTION_FINGERPRINT_FIELDS)
+    return params
+
+# A transaction is unchanged when its stored fingerprint matches and every
+# violation it would be linked to is already linked
+_TRANSACTIONS_UNCHANGED = """
+UNWIND $rows AS row
+MATCH (a:Account {number: row.account_number})-[:MADE_TRANSACTION]->(t:Transaction {transaction_id: row.transaction_id})
+WHERE t.fingerprint = row.fingerprint
+  AND NOT EXISTS {
+      MATCH (a)-[:HAS_VIOLATION]->(v:Violation)
+      WHERE v.status = 'ACTIVE' AND (v.date IS NULL OR t.date >= v.date)
+        AND NOT (t)-[:RELATED_TO_VIOLATION]->(v)
+  }
+RETURN row.idx AS idx
+"""
+
+_EXISTING_LINKS = """
+UNWIND $ids AS id
+MATCH (t:Transaction {transaction_id: id})-[:RELATED_TO_VIOLATION]->(v:Violation)
+RETURN t.transaction_id as tx_id,
+       v.id as violation_id,
+       v.type as violation_type
+"""
+
 def _process_single_transaction(tx, tx_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Process a single transaction and link it to any matching violations.
     
@@ -53,6 +113,7 @@ def _process_single_transaction(tx, tx_data: Dict[str, Any]) -> List[Dict[str, A
         t.date = date($date),
         t.description = $description,
         t.type = $transaction_type,
+        t.fingerprint = $fingerprint,
         t.last_updated = datetime()
     
     // Find or create the account
@@ -79,15 +140,109 @@ def _process_single_transaction(tx, tx_data: Dict[str, Any]) -> List[Dict[str, A
            v.type as violation_type
     """
     
-    result = tx.run(query,
-                   transaction_id=tx_data.get('transaction_id'),
-                   account_number=tx_data.get('account_number'),
-                   amount=float(tx_data.get('amount', 0)),
-                   date=tx_data.get('date'),
-                   description=tx_data.get('description', ''),
-                   transaction_type=tx_data.get('transaction_type', 'UNKNOWN'))
+    matches = run_query(tx, 'transactions.process_single', query, **_transaction_params(tx_data))
+    
+    run_query(tx, 'transactions.account_month_update', _ACCOUNT_MONTH_UPDATE,
+              transaction_id=tx_data.get('transaction_id'),
+              account_number=tx_data.get('account_number'))
+    
+    return matches
+
+# Moves the transaction's amount into its (account, month) running total. The
+# bucket and amount it last contributed are remembered on the transaction, so
+# re-ingesting it (or changing its date/amount) adjusts by the difference.
+_ACCOUNT_MONTH_UPDATE = """
+MATCH (a:Account {number: $account_number})-[:MADE_TRANSACTION]->(t:Transaction {transaction_id: $transaction_id})
+WITH a, t,
+     substring(toString(t.date), 0, 7) AS month,
+     coalesce(t.amount, 0.0) AS amount,
+     t.account_month AS old_key,
+     coalesce(t.account_month_amount, 0.0) AS old_amount
+WITH a, t, month, amount, old_key, old_amount, a.number + '|' + month AS key
+CALL {
+    WITH old_key, old_amount
+    MATCH (m:AccountMonth {key: old_key})
+    SET m.total = m.total - old_amount,
+        m.count = m.count - 1
+}
+CALL {
+    WITH a, key, month, amount
+    WITH a, key, month, amount WHERE key IS NOT NULL
+    MERGE (m:AccountMonth {key: key})
+      ON CREATE SET m.account = a.number, m.month = month, m.total = 0.0, m.count = 0
+    SET m.total = m.total + amount,
+        m.count = m.count + 1
+    MERGE (a)-[:HAS_MONTHLY_TOTAL]->(m)
+}
+SET t.account_month = key,
+    t.account_month_amount = CASE WHEN key IS NULL THEN null ELSE amount END
+"""
+
+def account_month_key(account_number: str, month: str) -> str:
+    """Key of the AccountMonth aggregate for an account and a ``YYYY-MM`` month."""
+    return f"{account_number}|{month}"
+
+def get_account_month_totals(client: Neo4jClient, account_number: str, month: str) -> Dict[str, Any]:
+    """Read the running total and count of an account's transactions in a month.
+    
+    This is a single lookup on the unique AccountMonth key, independent of how
+    many transactions the account has.
+    
+    Args:
+        client: Neo4j client instance
+        account_number: The account number
+        month: Month in ``YYYY-MM`` format
+        
+    Returns:
+        Dictionary with keys total (float) and count (int); zeros when the
+        account has no transactions in that month
+    """
+    if getattr(client, 'in_memory', False):
+        return client.get_account_month_totals(account_number, month)
+    if not client.enabled or not hasattr(client, '_driver') or not client._driver:
+        return {'total': 0.0, 'count': 0}
+    
+    query = """
+    MATCH (m:AccountMonth {key: $key})
+    RETURN m.total AS total, m.count AS count
+    """
+    with client._driver.session(database=getattr(client, '_database', None)) as session:
+        rows = run_query(session, 'transactions.account_month_totals', query,
+                         key=account_month_key(account_number, month))
+    if not rows:
+        return {'total': 0.0, 'count': 0}
+    record = rows[0]
+    return {'total': float(record['total'] or 0), 'count': int(record['count'] or 0)}
+
+def rebuild_account_month_totals(client: Neo4jClient) -> int:
+    """Recompute every AccountMonth aggregate from the stored transactions.
+    
+    Used to backfill aggregates for transactions ingested before they existed.
+    
+    Returns:
+        Number of (account, month) aggregates written
+    """
+    if getattr(client, 'in_memory', False):
+        return client.rebuild_account_month_totals()
+    if not client.enabled or not hasattr(client, '_driver') or not client._driver:
+        return 0
     
-    return [dict(record) for record in result]
+    with client._driver.session(database=getattr(client, '_database', None)) as session:
+        run_query(session, 'transactions.account_month_clear', "MATCH (m:AccountMonth) DETACH DELETE m")
+        rows = run_query(session, 'transactions.account_month_rebuild', """
+        MATCH (a:Account)-[:MADE_TRANSACTION]->(t:Transaction)
+        WHERE t.date IS NOT NULL
+        WITH a, t, substring(toString(t.date), 0, 7) AS month, coalesce(t.amount, 0.0) AS amount
+        SET t.account_month = a.number + '|' + month,
+            t.account_month_amount = amount
+        WITH a, month, sum(amount) AS total, count(t) AS count
+        MERGE (m:AccountMonth {key: a.number + '|' + month})
+        SET m.account = a.number, m.month = month, m.total = total, m.count = count
+        MERGE (a)-[:HAS_MONTHLY_TOTAL]->(m)
+        RETURN count(m) AS aggregates
+        """)
+    notify_graph_write()
+    return rows[0]['aggregates'] if rows else 0
 
 def get_transaction_details(client: Neo4jClient, transaction_id: str) -> Optional[Dict[str, Any]]:
     """Get detailed information about a specific transaction and its related violations.
@@ -99,6 +254,8 @@ def get_transaction_details(client: Neo4jClient, transaction_id: str) -> Optiona
     Returns:
         Dictionary with transaction and related violation details, or None if not found
     """
+    if getattr(client, 'in_memory', False):
+        return client.get_transaction_details(transaction_id)
     if not client.enabled or not hasattr(client, '_driver') or not client._driver:
         return None
 
@@ -110,8 +267,8 @@ def get_transaction_details(client: Neo4jClient, transaction_id: str) -> Optiona
     """
     
     with client._driver.session(database=getattr(client, '_database', None)) as session:
-        result = session.run(query, transaction_id=transaction_id)
-        record = result.single()
+        rows = run_query(session, 'transactions.details', query, transaction_id=transaction_id)
+        record = rows[0] if rows else None
         
         if not record or not record['transaction']:
             return None
@@ -0,0 +1,268 @@
+"""
+Content-addressed storage for uploaded files.
+
+Uploads are written once per distinct content, under the SHA-256 of their
+bytes. The hash is computed while the request body is streamed to disk, so
+the file is never read a second time:
+
+    <UPLOAD_FOLDER>/.store/objects/<sha[:2]>/<sha><ext>    the content
+    <UPLOAD_FOLDER>/.store/aliases.json                    filename -> sha256
+    <UPLOAD_FOLDER>/.store/results/<kind>-<sha>.pkl        cached results
+
+The upload's own name in ``UPLOAD_FOLDER`` is a hard link to the stored
+object (a copy where links are not supported), so code that opens uploads by
+filename keeps working. Re-uploading a name repoints the link; the previous
+content stays in the store under its own hash.
+
+Processing results (PDF extractions, Excel analyses) are saved by content
+hash. Uploading the same bytes again, under any name, finds them straight
+away instead of reprocessing the file. The few most recently used results
+stay in memory as well, so clients paging through one result do not load it
+from disk for every page.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import uuid
+import pickle
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, BinaryIO, Tuple
+
+_STORE_DIR = '.store'
+
+# Result kinds cached per content hash
+PDF_EXTRACTION = 'pdf-extraction'
+
+# Bytes read from the request stream per step
+_BLOCK = 1 << 20
+
+# Results kept in memory after they are loaded or saved
+RECENT_RESULTS = 4
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content, read in blocks."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(_BLOCK), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+_digests: Dict[str, Tuple[int, int, str]] = {}
+_digests_lock = threading.Lock()
+
+
+def content_digest(path: str) -> str:
+    """SHA-256 of ``path``, recomputed only when its size or modification time changes."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _digests_lock:
+        known = _digests.get(path)
+    if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+        return known[2]
+    digest = file_digest(path)
+    remember_digest(path, digest, stat)
+    return digest
+
+
+def remember_digest(path: str, digest: str, stat: Optional[os.stat_result] = None) -> None:
+    """Record the digest of a file whose content was hashed elsewhere (e.g. while it was written)."""
+    path = os.path.abspath(path)
+    stat = stat or os.stat(path)
+    with _digests_lock:
+        _digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+
+
+class StoredUpload:
+    """Outcome of saving an upload."""
+
+    def __init__(self, filename: str, path: str, digest: str, size: int, duplicate: bool):
+        self.filename = filename
+        self.path = path
+        self.digest = digest
+        self.size = size
+        self.duplicate = duplicate
+
+
+class UploadStore:
+    """Content-addressed uploads with a filename alias table and per-hash result cache."""
+
+    def __init__(self, upload_folder: str):
+        self.upload_folder = upload_folder
+        self.root = os.path.join(upload_folder, _STORE_DIR)
+        self._aliases_file = os.path.join(self.root, 'aliases.json')
+        self._lock = threading.Lock()
+        self._aliases: Dict[str, Dict[str, Any]] = {}
+        # (kind, digest) -> (result, saved_at)
+        self._recent: 'OrderedDict[Tuple[str, str], Tuple[Any, float]]' = OrderedDict()
+        os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'results'), exist_ok=True)
+        try:
+            with open(self._aliases_file, encoding='utf-8') as handle:
+                self._aliases = json.load(handle)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Upload alias table unreadable, starting empty: {e}")
+
+    def _object_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest + extension.lower())
+
+    def _temp_path(self) -> str:
+        return os.path.join(self.root, f'.incoming-{uuid.uuid4().hex}')
+
+    def save(self, stream: BinaryIO, filename: str) -> StoredUpload:
+        """
+        Store an upload and point ``filename`` at it.
+
+        Args:
+            stream: Readable binary stream (e.g. ``FileStorage.stream``)
+            filename: Sanitised name the upload is known by
+
+        Returns:
+            StoredUpload; ``duplicate`` is True when the content was already stored
+        """
+        sha = hashlib.sha256()
+        size = 0
+        temp = self._temp_path()
+        try:
+            with open(temp, 'wb') as out:
+                for block in iter(lambda: stream.read(_BLOCK), b''):
+                    sha.update(block)
+                    out.write(block)
+                    size += len(block)
+            digest = sha.hexdigest()
+            target = self._object_path(digest, os.path.splitext(filename)[1])
+            duplicate = os.path.exists(target)
+            if duplicate:
+                os.remove(temp)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp, target)
+        except Exception:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+        path = os.path.join(self.upload_folder, filename)
+        self._link(target, path)
+        remember_digest(path, digest)
+        with self._lock:
+            self._aliases[filename] = {'sha256': digest, 'size': size, 'uploaded_at': time.time()}
+            self._write_aliases()
+        logging.info(f"Stored upload {filename} as {digest[:12]} ({size} bytes{', duplicate' if duplicate else ''})")
+        return StoredUpload(filename, path, digest, size, duplicate)
+
+    def _link(self, target: str, path: str) -> None:
+        """Make ``path`` a hard link to ``target`` (copy if linking fails), replacing any old file."""
+        temp = self._temp_path()
+        try:
+            os.link(target, temp)
+        except OSError:
+            shutil.copyfile(target, temp)
+        os.replace(temp, path)
+
+    def _write_aliases(self) -> None:
+        temp = self._temp_path()
+        with open(temp, 'w', encoding='utf-8') as handle:
+            json.dump(self._aliases, handle)
+        os.replace(temp, self._aliases_file)
+
+    def digest_for(self, filename: str) -> Optional[str]:
+        """Content hash of the upload called ``filename``, or None if there is no such file.
+
+        A name that is still linked to the object its alias points at needs no
+        hashing; anything else (copies, files placed by hand) is hashed once
+        per size/modification time.
+        """
+        path = os.path.join(self.upload_folder, filename)
+        with self._lock:
+            entry = self._aliases.get(filename)
+        if entry:
+            target = self._object_path(entry['sha256'], os.path.splitext(filename)[1])
+            try:
+                if os.path.samefile(path, target):
+                    return entry['sha256']
+            except OSError:
+                pass
+        try:
+            return content_digest(path)
+        except OSError:
+            return None
+
+    def _result_path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.root, 'results', f'{kind}-{digest}.pkl')
+
+    def load_result(self, kind: str, digest: Optional[str], max_age: Optional[float] = None) -> Optional[Any]:
+        """Result of type ``kind`` cached for ``digest``, or None.
+
+        Args:
+            kind: Result kind
+            digest: Content hash
+            max_age: Ignore results saved more than this many seconds ago
+        """
+        if not digest:
+            return None
+        with self._lock:
+            entry = self._recent.get((kind, digest))
+            if entry is not None:
+                self._recent.move_to_end((kind, digest))
+        if entry is not None:
+            result, saved_at = entry
+        else:
+            path = self._result_path(kind, digest)
+            try:
+                saved_at = os.path.getmtime(path)
+                with open(path, 'rb') as handle:
+                    result = pickle.load(handle)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable cached {kind} result for {digest[:12]}: {e}")
+                return None
+            self._remember(kind, digest, result, saved_at)
+        if max_age is not None and time.time() - saved_at > max_age:
+            return None
+        return result
+
+    def _remember(self, kind: str, digest: str, result: Any, saved_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._recent[(kind, digest)] = (result, time.time() if saved_at is None else saved_at)
+            self._recent.move_to_end((kind, digest))
+            while len(self._recent) > RECENT_RESULTS:
+                self._recent.popitem(last=False)
+
+    def save_result(self, kind: str, digest: Optional[str], result: Any) -> None:
+        """Cache ``result`` of type ``kind`` for ``digest``; failures are logged, not raised."""
+        if not digest:
+            return
+        temp = self._temp_path()
+        try:
+            with open(temp, 'wb') as handle:
+                pickle.dump(result, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self._result_path(kind, digest))
+            self._remember(kind, digest, result)
+        except Exception as e:
+            logging.warning(f"Could not cache {kind} result for {digest[:12]}: {e}")
+            if os.path.exists(temp):
+                os.remove(temp)
+
+
+_stores: Dict[str, UploadStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_upload_store(upload_folder: str) -> UploadStore:
+    """Return the process-wide store for ``upload_folder``."""
+    key = os.path.abspath(upload_folder)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = UploadStore(upload_folder)
+        return store
@@ -0,0 +1,186 @@
+"""
+Persistent cache of Gemini compliance verdicts.
+
+Statements repeat the same kind of transaction many times: one description
+template, one transaction mode, one KYC status, amounts in the same band.
+Those rows get the same answer from Gemini, so the answer is stored under a
+canonical feature tuple (see ``verdict_features``) and reused instead of
+making another API call.
+
+Verdicts live in a local SQLite file with a TTL. Every entry is tagged with
+the version of the rule catalogue that produced it; opening the cache with a
+different version drops the old verdicts, so editing the rules or the prompt
+never serves stale answers.
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import bisect
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Tuple, Iterable
+
+_DEFAULT_CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs', 'verdict_cache.sqlite3'
+)
+
+# Verdicts older than this are ignored and eventually purged (seconds)
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Upper bounds of the amount bands (₹). The ₹9,00,000 high-value threshold is
+# a band edge so rows on either side of it never share a verdict.
+AMOUNT_BANDS = [0, 1000, 10000, 50000, 100000, 200000, 500000, 900000, 1000000, 5000000, 10000000]
+
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)*')
+_SPACE = re.compile(r'\s+')
+
+
+def cache_enabled() -> bool:
+    return os.getenv('VERDICT_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+
+def get_cache_file() -> str:
+    return os.getenv('VERDICT_CACHE_FILE', _DEFAULT_CACHE_FILE)
+
+
+def get_cache_ttl() -> float:
+    return float(os.getenv('VERDICT_CACHE_TTL', DEFAULT_TTL))
+
+
+def _text(value: Any) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return _SPACE.sub(' ', str(value)).strip().lower()
+
+
+def normalize_description(value: Any) -> str:
+    """Description template: lower-cased, whitespace collapsed, numbers masked."""
+    return _NUMBER.sub('#', _text(value))
+
+
+def amount_bucket(value: Any) -> str:
+    """Name of the amount band ``value`` falls in, e.g. ``'100000-200000'``."""
+    try:
+        amount = float(value)
+    except (ValueError, TypeError):
+        return 'invalid'
+    if amount != amount:
+        return 'invalid'
+    if amount <= 0:
+        return '<=0'
+    i = bisect.bisect_left(AMOUNT_BANDS, amount)
+    if i == len(AMOUNT_BANDS):
+        return f'>{AMOUNT_BANDS[-1]}'
+    return f'{AMOUNT_BANDS[i - 1]}-{AMOUNT_BANDS[i]}'
+
+
+def verdict_features(transaction_row: Dict[str, Any]) -> Tuple[str, str, str, str, str]:
+    """Canonical feature tuple of a transaction row (original Excel column names)."""
+    return (
+        normalize_description(transaction_row.get('Description')),
+        _text(transaction_row.get('Sender_KYC_Status')),
+        _text(transaction_row.get('Transaction_Mode')),
+        _text(transaction_row.get('Channel')),
+        amount_bucket(transaction_row.get('Amount')),
+    )
+
+
+def verdict_key(transaction_row: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(verdict_features(transaction_row)).encode('utf-8')).hexdigest()
+
+
+class VerdictCache:
+    """SQLite-backed verdict store for one rule catalogue version."""
+
+    def __init__(self, path: str, version: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.version = version
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS verdicts ('
+                ' key TEXT PRIMARY KEY, version TEXT NOT NULL, features TEXT NOT NULL,'
+                ' verdict TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != version:
+                if row is not None:
+                    logging.info(f"Rule catalogue changed ({row[0][:8]} -> {version[:8]}); clearing verdict cache")
+                self._conn.execute('DELETE FROM verdicts')
+                self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+            self._conn.execute('DELETE FROM verdicts WHERE created_at < ?', (time.time() - ttl,))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Unexpired verdicts for the given keys; missing keys are left out."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, verdict FROM verdicts WHERE version = ? AND created_at >= ? "
+                    f"AND key IN ({','.join('?' * len(part))})",
+                    [self.version, cutoff, *part]
+                ).fetchall()
+                for key, verdict in rows:
+                    found[key] = json.loads(verdict)
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, Tuple[str, ...], Dict[str, Any]]]) -> None:
+        """Store ``(key, features, verdict)`` entries."""
+        now = time.time()
+        rows = [(key, self.version, json.dumps(features), json.dumps(verdict), now)
+                for key, features, verdict in entries]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO verdicts (key, version, features, verdict, created_at) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+            return {'entries': size, 'hits': self._hits, 'misses': self._misses, 'version': self.version}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_verdict_cache: Optional[VerdictCache] = None
+_verdict_cache_lock = threading.Lock()
+
+
+def get_verdict_cache(version: str) -> Optional[VerdictCache]:
+    """Return the process-wide verdict cache for ``version``, or None when disabled or unavailable."""
+    global _verdict_cache
+    if not cache_enabled():
+        return None
+    with _verdict_cache_lock:
+        if _verdict_cache is not None and _verdict_cache.version == version:
+            return _verdict_cache
+        try:
+            cache = VerdictCache(get_cache_file(), version, ttl=get_cache_ttl())
+        except Exception as e:
+            logging.warning(f"Verdict cache unavailable: {e}")
+            return None
+        if _verdict_cache is not None:
+            _verdict_cache.close()
+        _verdict_cache = cache
+        return cache
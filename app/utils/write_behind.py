@@ -0,0 +1,387 @@
+"""
+Write-behind buffer that takes Neo4j writes off the request path.
+
+Request handlers ``put`` records into a bounded in-process queue and return
+immediately; a background thread writes them in batches. Records are
+coalesced by ``(kind, key)`` so repeating an identical upsert before a
+flush costs one write. Violation upserts are additive (each record merges
+its own circular, provision, reason and penalty relationships), so their key
+covers the whole payload: different records for the same violation are all
+written, in order, as the unbuffered path would. A batch is flushed when the queue
+reaches ``batch_size`` records or its oldest record has waited
+``flush_interval`` seconds. Transient driver errors are retried with
+exponential backoff; a batch that still fails is logged and dropped. Any
+other error is taken to come from a bad record: the batch is split in half
+and each half written on its own, so only the failing records are dropped.
+Violations without an ``slNo`` or page are rejected before they are queued.
+
+While the Neo4j circuit breaker is open the client comes up disabled, so
+records are put back at the head of the queue and retried every
+``unavailable_retry`` seconds until the database is back. The client is
+rebuilt on every flush while disabled. Without connection settings at all,
+records are counted as dropped; they are never reported as written.
+
+``flush()`` drains the queue synchronously and is called at interpreter exit.
+"""
+from __future__ import annotations
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
+
+from .circuit_breaker import get_neo4j_breaker
+from .graph import (Neo4jClient, get_client_from_env, upsert_violations, content_fingerprint,
+                    VIOLATION_FINGERPRINT_FIELDS)
+
+# Errors worth retrying; anything else fails the batch immediately
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+# kind -> function writing a batch of records of that kind
+WRITE_HANDLERS: Dict[str, Callable[[Neo4jClient, List[Dict[str, Any]]], None]] = {
+    'violation': upsert_violations,
+}
+
+
+def violation_key(record: Dict[str, Any]) -> Tuple:
+    """Coalescing key for violation upserts: the MERGE key in graph.py plus the written fields.
+
+    Only identical upserts may be coalesced; dropping a different record for
+    the same violation would lose the relationships it merges.
+    """
+    page = record.get('page')
+    try:
+        page = int(page) if page is not None else None
+    except (TypeError, ValueError):
+        pass
+    return record.get('slNo'), page, content_fingerprint(record, VIOLATION_FINGERPRINT_FIELDS)
+
+
+class WriteBehindBuffer:
+    """Bounded, coalescing queue of graph writes drained by a flush thread."""
+
+    def __init__(self, client_factory: Callable[[], Neo4jClient] = get_client_from_env,
+                 max_pending: int = 10000, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_retries: int = 5, retry_backoff: float = 0.5, unavailable_retry: float = 5.0):
+        self._client_factory = client_factory
+        self._client: Optional[Neo4jClient] = None
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.unavailable_retry = unavailable_retry
+        # No flush attempts before this time (monotonic) while Neo4j is unavailable
+        self._paused_until = 0.0
+
+        # (kind, key) -> (record, enqueued_at); insertion order is flush order
+        self._pending: 'OrderedDict[Tuple[str, Any], Tuple[Dict[str, Any], float]]' = OrderedDict()
+        self._cond = threading.Condition()
+        # Held while a batch is being written so flush() can wait for in-flight work
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._metrics = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'written': 0,
+            'batches': 0,
+            'retries': 0,
+            'failed_batches': 0,
+            'dropped': 0,
+            'requeued': 0,
+            'splits': 0,
+            'rejected': 0,
+            'last_flush_at': None,
+            'last_flush_ms': None,
+            'last_error': None,
+        }
+
+    # -- producer side -----------------------------------------------------
+
+    def put(self, kind: str, key: Any, record: Dict[str, Any]) -> None:
+        """Queue a write; blocks while the queue is full.
+
+        Args:
+            kind: Write handler name (see ``WRITE_HANDLERS``)
+            key: Identity of the write; a later record with the same key replaces the queued one,
+                so the key must cover everything the write depends on
+            record: Payload passed to the handler
+        """
+        if kind not in WRITE_HANDLERS:
+            raise ValueError(f"Unknown write kind: {kind}")
+        self._ensure_started()
+        with self._cond:
+            slot = (kind, key)
+            if slot in self._pending:
+                # Keep the original enqueue time so lag reflects the oldest unwritten change;
+                # move to the back so the write keeps its place after any record queued since
+                _, enqueued_at = self._pending[slot]
+                self._pending[slot] = (record, enqueued_at)
+                self._pending.move_to_end(slot)
+                self._metrics['coalesced'] += 1
+            else:
+                while len(self._pending) >= self.max_pending and not self._stopping:
+                    self._cond.notify_all()
+                    self._cond.wait(0.1)
+                self._pending[slot] = (record, time.monotonic())
+            self._metrics['enqueued'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    # -- metrics -----------------------------------------------------------
+
+    def count_rejected(self, count: int = 1) -> None:
+        """Count records refused before they were queued."""
+        with self._cond:
+            self._metrics['rejected'] += count
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def lag(self) -> float:
+        """Seconds the oldest queued record has been waiting (0 when empty)."""
+        with self._cond:
+            if not self._pending:
+                return 0.0
+            _, enqueued_at = next(iter(self._pending.values()))
+            return time.monotonic() - enqueued_at
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            metrics = dict(self._metrics)
+        metrics.update(depth=self.depth(), lag_seconds=round(self.lag(), 3), max_pending=self.max_pending,
+                       running=bool(self._thread and self._thread.is_alive()))
+        return metrics
+
+    # -- flushing ----------------------------------------------------------
+
+    def flush(self) -> None:
+        """Write everything queued so far and wait for it to finish.
+
+        Returns early, leaving the records queued, while Neo4j is unavailable.
+        """
+        with self._write_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch or not self._write_batch(batch):
+                    return
+
+    def stop(self) -> None:
+        """Drain the queue and stop the flush thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=30)
+        self.flush()
+        left = self.depth()
+        if left:
+            logging.error(f"Write-behind stopped with {left} record(s) unwritten; Neo4j unavailable")
+        if self._client:
+            self._client.close()
+            self._client = None
+
+    def _ensure_started(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='graph-write-behind', daemon=True)
+            self._thread.start()
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if self._stopping:
+            return True
+        if time.monotonic() < self._paused_until:
+            return False
+        if len(self._pending) >= self.batch_size:
+            return True
+        _, enqueued_at = next(iter(self._pending.values()))
+        return time.monotonic() - enqueued_at >= self.flush_interval
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due() and not self._stopping:
+                    self._cond.wait(self.flush_interval / 4 or 0.05)
+                if self._stopping and not self._pending:
+                    return
+            with self._write_lock:
+                batch = self._take_batch()
+                if batch and not self._write_batch(batch) and self._stopping:
+                    # Neo4j unavailable at shutdown; stop() reports what is left
+                    return
+            with self._cond:
+                # Wake producers blocked on a full queue
+                self._cond.notify_all()
+
+    def _take_batch(self) -> List[Tuple[str, Any, Dict[str, Any], float]]:
+        """Oldest queued entries as (kind, key, record, enqueued_at)."""
+        with self._cond:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                (kind, key), (record, enqueued_at) = self._pending.popitem(last=False)
+                batch.append((kind, key, record, enqueued_at))
+            self._cond.notify_all()
+            return batch
+
+    def _requeue(self, entries: List[Tuple[str, Any, Dict[str, Any], float]]) -> None:
+        """Put entries back at the head of the queue and pause flushing for ``unavailable_retry``."""
+        with self._cond:
+            # An identical record queued meanwhile keeps its later place
+            pending = OrderedDict(((kind, key), (record, enqueued_at)) for kind, key, record, enqueued_at in entries
+                                  if (kind, key) not in self._pending)
+            pending.update(self._pending)
+            self._pending = pending
+            self._metrics['requeued'] += len(entries)
+            self._paused_until = time.monotonic() + self.unavailable_retry
+
+    def _get_client(self) -> Neo4jClient:
+        """The cached client; rebuilt while disabled or while the breaker is open.
+
+        A client created with the breaker open stays disabled, and one created
+        before it opened would wait on connection timeouts; a rebuilt client
+        reflects the breaker's current state.
+        """
+        if self._client is not None and (not self._client.enabled or not get_neo4j_breaker().allow()):
+            self._client.close()
+            self._client = None
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def _write_batch(self, batch: List[Tuple[str, Any, Dict[str, Any], float]]) -> bool:
+        """Write one batch; False when Neo4j is unavailable and the batch was requeued."""
+        client = self._get_client()
+        if not client.enabled:
+            if getattr(client, 'configured', False):
+                logging.warning(f"Neo4j unavailable; keeping {len(batch)} write-behind record(s) queued")
+                self._requeue(batch)
+                return False
+            for kind in dict.fromkeys(kind for kind, _, _, _ in batch):
+                self._record_failure(kind, [record for k, _, record, _ in batch if k == kind],
+                                     RuntimeError('Neo4j not configured'))
+            return True
+
+        by_kind: Dict[str, List[Tuple[str, Any, Dict[str, Any], float]]] = {}
+        for entry in batch:
+            by_kind.setdefault(entry[0], []).append(entry)
+
+        start = time.perf_counter()
+        requeued = False
+        for kind, entries in by_kind.items():
+            requeued = not self._write_entries(client, kind, entries) or requeued
+
+        with self._cond:
+            self._metrics['batches'] += 1
+            self._metrics['last_flush_at'] = time.time()
+            self._metrics['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return not requeued
+
+    def _write_entries(self, client: Neo4jClient, kind: str,
+                       entries: List[Tuple[str, Any, Dict[str, Any], float]]) -> bool:
+        """Write entries of one kind with retries; False when Neo4j became unavailable and they were requeued.
+
+        A non-retryable error (usually a bad record) splits the entries in
+        half and writes each half on its own, so only the records that fail
+        by themselves are dropped.
+        """
+        records = [record for _, _, record, _ in entries]
+        attempt = 0
+        while True:
+            try:
+                WRITE_HANDLERS[kind](client, records)
+                with self._cond:
+                    self._metrics['written'] += len(records)
+                return True
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                if not get_neo4j_breaker().allow():
+                    # The failures opened the breaker; keep the records for when it closes
+                    logging.warning(f"Neo4j unavailable ({e}); keeping {len(records)} {kind} record(s) queued")
+                    self._requeue(entries)
+                    return False
+                if attempt > self.max_retries:
+                    self._record_failure(kind, records, e)
+                    return True
+                delay = self.retry_backoff * (2 ** (attempt - 1))
+                logging.warning(f"Write-behind {kind} batch failed ({e}); retry {attempt} in {delay:.1f}s")
+                with self._cond:
+                    self._metrics['retries'] += 1
+                time.sleep(delay)
+            except Exception as e:
+                if len(entries) == 1:
+                    self._record_failure(kind, records, e)
+                    return True
+                logging.warning(f"Write-behind {kind} batch of {len(entries)} failed ({e}); splitting it")
+                with self._cond:
+                    self._metrics['splits'] += 1
+                middle = len(entries) // 2
+                first = self._write_entries(client, kind, entries[:middle])
+                if not first:
+                    self._requeue(entries[middle:])
+                    return False
+                return self._write_entries(client, kind, entries[middle:])
+
+    def _record_failure(self, kind: str, records: List[Dict[str, Any]], error: Exception) -> None:
+        logging.error(f"Write-behind dropped {len(records)} {kind} record(s): {error}")
+        with self._cond:
+            self._metrics['failed_batches'] += 1
+            self._metrics['dropped'] += len(records)
+            self._metrics['last_error'] = str(error)
+
+
+_write_behind: Optional[WriteBehindBuffer] = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindBuffer:
+    """Return the process-wide write-behind buffer, creating it on first use."""
+    global _write_behind
+    with _write_behind_lock:
+        if _write_behind is None:
+            _write_behind = WriteBehindBuffer(
+                max_pending=int(os.getenv('WRITE_BEHIND_MAX_PENDING', 10000)),
+                batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500)),
+                flush_interval=float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)),
+                max_retries=int(os.getenv('WRITE_BEHIND_MAX_RETRIES', 5)),
+            )
+            atexit.register(_write_behind.stop)
+        return _write_behind
+
+
+def _page_number(page: Any) -> Optional[int]:
+    try:
+        return int(float(page))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def queue_violation_upsert(record: Dict[str, Any]) -> bool:
+    """Queue a violation upsert (the record shape of ``Neo4jClient.upsert_violation``).
+
+    Records without an ``slNo`` or a numeric ``page`` cannot be merged (the
+    violation is keyed on both) and are rejected here instead of failing a
+    whole batch later.
+
+    Returns:
+        True if the record was queued
+    """
+    buffer = get_write_behind()
+    if record.get('slNo') is None or _page_number(record.get('page')) is None:
+        logging.warning(f"Not queueing violation without slNo/page: slNo={record.get('slNo')!r}, "
+                        f"page={record.get('page')!r}")
+        buffer.count_rejected()
+        return False
+    buffer.put('violation', violation_key(record), record)
+    return True
@@ -0,0 +1,50 @@
+"""
+Benchmark the deposit window engine (``app.utils.deposit_windows``).
+
+Generates ``--rows`` transactions over ``--accounts`` integer account ids and
+a year of dates, then times ``find_limit_breaches`` for calendar months and
+for a rolling ``--days``-day window.
+
+    python benchmarks/bench_deposit_windows.py --rows 20000000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.deposit_windows import MONTH, find_limit_breaches  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000_000)
+    parser.add_argument('--accounts', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--limit', type=float, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    start = time.perf_counter()
+    accounts = rng.integers(0, args.accounts, args.rows)
+    dates = np.datetime64('2024-01-01') + rng.integers(0, 365, args.rows).astype('timedelta64[D]')
+    amounts = rng.lognormal(mean=9, sigma=1.5, size=args.rows).round(2)
+    print(f'Generated {args.rows:,} transactions over {args.accounts:,} accounts in {time.perf_counter() - start:.2f}s')
+
+    for window in (MONTH, args.days):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            breaches = find_limit_breaches(accounts, dates, amounts, args.limit, window)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        label = 'calendar month' if window == MONTH else f'rolling {window}-day'
+        print(f'{label:>16}: {len(breaches):,} breaching windows, best {best:.2f}s ({args.rows / best:,.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main()
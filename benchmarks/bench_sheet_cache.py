@@ -0,0 +1,79 @@
+"""
+Benchmark reading a workbook through ``excel_stream`` with and without the sheet cache.
+
+Writes a ``--rows``-row transaction workbook, then times a full chunked read
+parsed from the XML, the one-off conversion (``sheet_cache.convert_workbook``)
+and the same read served from the cache.
+
+    python benchmarks/bench_sheet_cache.py --rows 200000
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import excel_stream, sheet_cache  # noqa: E402
+
+
+def write_workbook(path: str, rows: int, seed: int = 3) -> None:
+    from openpyxl import Workbook
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Transactions')
+    sheet.append(['Transaction ID', 'Date', 'Sender Account', 'Receiver Account', 'Amount', 'Transaction Type'])
+    start = datetime.datetime(2024, 1, 1)
+    days = rng.integers(0, 365, rows).tolist()
+    senders = rng.integers(0, 50000, rows).tolist()
+    receivers = rng.integers(0, 50000, rows).tolist()
+    amounts = rng.lognormal(mean=10, sigma=1.6, size=rows).round(2).tolist()
+    kinds = rng.choice(['NEFT', 'RTGS', 'UPI', 'IMPS'], rows).tolist()
+    for i in range(rows):
+        sheet.append([f'TXN{i:08d}', start + datetime.timedelta(days=days[i]), f'ACC{senders[i]:06d}',
+                      f'ACC{receivers[i]:06d}', amounts[i], kinds[i]])
+    workbook.save(path)
+
+
+def read_all(path: str, chunk_size: int) -> int:
+    return sum(len(chunk) for chunk in excel_stream.iter_excel_chunks(path, chunk_size=chunk_size))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['EXCEL_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    try:
+        path = os.path.join(workdir, 'transactions.xlsx')
+        start = time.perf_counter()
+        write_workbook(path, args.rows)
+        print(f'Wrote {args.rows:,} rows ({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s')
+
+        os.environ['EXCEL_CACHE_ENABLED'] = '0'
+        start = time.perf_counter()
+        rows = read_all(path, args.chunk_size)
+        print(f'   parsed read: {rows:,} rows in {time.perf_counter() - start:.2f}s')
+
+        os.environ['EXCEL_CACHE_ENABLED'] = '1'
+        start = time.perf_counter()
+        sheet_cache.convert_workbook(path)
+        print(f'    conversion: {time.perf_counter() - start:.2f}s')
+
+        start = time.perf_counter()
+        rows = read_all(path, args.chunk_size)
+        print(f'   cached read: {rows:,} rows in {time.perf_counter() - start:.2f}s')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
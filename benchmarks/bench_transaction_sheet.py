@@ -0,0 +1,85 @@
+"""
+Benchmark ``_process_transaction_sheet`` on a synthetic transaction sheet.
+
+Builds a sheet of ``--rows`` transactions spread over ``--accounts`` sender
+accounts, with amounts stored as a mix of numbers and ``₹1,23,456``-style
+strings, flags ``--kyc-share`` of the accounts in the KYC data and times the
+whole call (graph lookups disabled).
+
+    python benchmarks/bench_transaction_sheet.py --rows 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes import _process_transaction_sheet  # noqa: E402
+
+
+class _NoGraph:
+    enabled = False
+
+
+def build_sheet(rows: int, accounts: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amounts = rng.lognormal(mean=10, sigma=1.6, size=rows).round(2)
+    amount_cells = amounts.astype(object)
+    as_text = rng.random(rows) < 0.3
+    amount_cells[as_text] = [f'₹{value:,.2f}' for value in amounts[as_text]]
+    return pd.DataFrame({
+        'Transaction ID': [f'TXN{i:08d}' for i in range(rows)],
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'Sender Account': [f'ACC{n:06d}' for n in rng.integers(0, accounts, rows)],
+        'Receiver Account': [f'ACC{n:06d}' for n in rng.integers(0, accounts, rows)],
+        'Amount': amount_cells,
+        'Transaction Type': rng.choice(['NEFT', 'RTGS', 'UPI', 'IMPS'], rows),
+    })
+
+
+def build_kyc_data(accounts: int, share: float, seed: int = 11) -> dict:
+    rng = np.random.default_rng(seed)
+    flagged = rng.choice(accounts, size=max(1, int(accounts * share)), replace=False)
+    return {
+        f'ACC{n:06d}': {
+            'violation_type': 'KYC Expired',
+            'violation_details': [{'violation_type': 'KYC Expired', 'reason': 'KYC documents expired'}],
+            'has_violation': True
+        }
+        for n in flagged
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--accounts', type=int, default=50_000)
+    parser.add_argument('--kyc-share', type=float, default=0.02)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = build_sheet(args.rows, args.accounts)
+    kyc_data = build_kyc_data(args.accounts, args.kyc_share)
+    print(f'Built {len(df):,} rows, {len(kyc_data):,} flagged accounts in {time.perf_counter() - start:.2f}s')
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = _process_transaction_sheet(df, _NoGraph(), 'transactions', dict(kyc_data))
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f'Reported {len(result["data"]):,} transactions, {result["summary"]["violations_found"]:,} with violations')
+    print(f'best {best:.2f}s of {args.repeat} ({args.rows / best:,.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main()
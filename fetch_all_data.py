@@ -2,9 +2,32 @@
 """
 Script to fetch and display all data from the Neo4j database.
 This script will help diagnose data availability issues.
+
+It can also export the whole graph for offline analysis:
+
+    python fetch_all_data.py export ./graph_export --workers 4 --key Account=number
+
+Each label and relationship type is split into internal-id ranges, and each
+range is streamed by a single query ordered by id (``id()`` has no index, so
+paging with one query per page would rescan the label for every page). Labels
+given a unique, indexed key property with --key are paged through that key
+instead. Rows are written to gzip-compressed JSONL shards; only one page per
+worker is held in memory, and progress is saved to manifest.json after every
+page so an interrupted export resumes where it stopped when the same command
+is run again.
+
+A node with several labels is written once, under the first of its labels
+that is being exported.
 """
 import os
+import sys
 import json
+import gzip
+import time
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 
@@ -36,22 +59,31 @@ class Neo4jExplorer:
             return False
 
     def get_node_counts(self):
-        """Get count of nodes by label"""
-        query = """
-        MATCH (n)
-        RETURN labels(n) AS labels, count(*) AS count
-        ORDER BY count DESC
-        """
-        return self._run_query(query)
+        """Get count of nodes by label (one count-store lookup per label)"""
+        labels = self._run_query("CALL db.labels() YIELD label RETURN label")
+        if isinstance(labels, dict):
+            return labels
+        counts = []
+        for row in labels:
+            result = self._run_query(f"MATCH (n:`{row['label']}`) RETURN count(n) AS count")
+            if isinstance(result, dict):
+                return result
+            counts.append({'labels': [row['label']], 'count': result[0]['count']})
+        return sorted(counts, key=lambda item: item['count'], reverse=True)
 
     def get_relationship_counts(self):
-        """Get count of relationships by type"""
-        query = """
-        MATCH ()-[r]->()
-        RETURN type(r) AS type, count(*) AS count
-        ORDER BY count DESC
-        """
-        return self._run_query(query)
+        """Get count of relationships by type (one count-store lookup per type)"""
+        types = self._run_query("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType")
+        if isinstance(types, dict):
+            return types
+        counts = []
+        for row in types:
+            rel_type = row['relationshipType']
+            result = self._run_query(f"MATCH ()-[r:`{rel_type}`]->() RETURN count(r) AS count")
+            if isinstance(result, dict):
+                return result
+            counts.append({'type': rel_type, 'count': result[0]['count']})
+        return sorted(counts, key=lambda item: item['count'], reverse=True)
 
     def get_sample_nodes(self, label=None, limit=5):
         """Get sample nodes (optionally filtered by label)"""
@@ -94,6 +126,221 @@ class Neo4jExplorer:
             self.driver.close()
             print("\nDatabase connection closed.")
 
+class GraphExporter:
+    """Streams every node and relationship into gzip JSONL shards.
+
+    A shard covers one label (or relationship type) and, when ordered by
+    internal id, one slice of that label's id range so several workers can
+    export a large label in parallel. Id shards are read by one streaming
+    query; keyed shards by one index-backed query per page. Shards are
+    appended one page at a time; after each page the shard's last key and
+    file size are saved to the manifest, and on resume the file is truncated
+    back to that size so a page that was written but not recorded is not
+    duplicated.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, driver, database, out_dir, page_size=10000, workers=4, keys=None):
+        self.driver = driver
+        self.database = database
+        self.out_dir = out_dir
+        self.page_size = page_size
+        self.workers = max(1, workers)
+        self.keys = keys or {}
+        self._lock = threading.Lock()
+        self.manifest = None
+
+    # -- planning -------------------------------------------------------
+
+    def _single(self, query, **params):
+        with self.driver.session(database=self.database) as session:
+            return session.run(query, **params).single()
+
+    def _values(self, query, field):
+        with self.driver.session(database=self.database) as session:
+            return [record[field] for record in session.run(query)]
+
+    def _id_shards(self, kind, name, pattern, var):
+        """Split a label/type into contiguous id ranges, one per worker."""
+        record = self._single(f"MATCH {pattern} RETURN min(id({var})) AS lo, max(id({var})) AS hi")
+        if record is None or record['lo'] is None:
+            return []
+        lo, hi = record['lo'], record['hi']
+        step = max(1, (hi - lo + self.workers) // self.workers)
+        shards = []
+        for part, start in enumerate(range(lo, hi + 1, step)):
+            shards.append({
+                'kind': kind,
+                'name': name,
+                'key': None,
+                'after': start - 1,
+                'upto': min(start + step - 1, hi),
+                'file': os.path.join(kind, f"{name}.part{part}.jsonl.gz"),
+                'bytes': 0,
+                'rows': 0,
+                'done': False,
+            })
+        return shards
+
+    def plan(self, labels, rel_types=None):
+        """Build the shard list for the requested labels and relationship types."""
+        if rel_types is None:
+            rel_types = self._values(
+                "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType", 'relationshipType'
+            )
+
+        shards = []
+        for label in labels:
+            if label in self.keys:
+                # Key ranges can't be split without sampling, so keyed labels get one worker
+                shards.append({
+                    'kind': 'nodes',
+                    'name': label,
+                    'key': self.keys[label],
+                    'after': None,
+                    'upto': None,
+                    'file': os.path.join('nodes', f"{label}.part0.jsonl.gz"),
+                    'bytes': 0,
+                    'rows': 0,
+                    'done': False,
+                })
+            else:
+                shards.extend(self._id_shards('nodes', label, f"(n:`{label}`)", 'n'))
+        for rel_type in rel_types:
+            shards.extend(self._id_shards('relationships', rel_type, f"()-[r:`{rel_type}`]->()", 'r'))
+        return shards
+
+    # -- manifest -------------------------------------------------------
+
+    def _manifest_path(self):
+        return os.path.join(self.out_dir, self.MANIFEST)
+
+    def _save_manifest(self):
+        path = self._manifest_path()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _load_or_plan(self, labels, rel_types, restart):
+        path = self._manifest_path()
+        if os.path.exists(path) and not restart:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            print(f"Resuming export from {path}")
+            return
+        if labels is None:
+            labels = self._values("CALL db.labels() YIELD label RETURN label", 'label')
+        self.manifest = {
+            'database': self.database,
+            'page_size': self.page_size,
+            'keys': self.keys,
+            # Nodes are written under the first of their labels in this list
+            'labels': labels,
+            'started_at': time.time(),
+            'completed_at': None,
+            'shards': self.plan(labels, rel_types),
+        }
+        self._save_manifest()
+
+    # -- paging ---------------------------------------------------------
+
+    def _page_query(self, shard):
+        name, key = shard['name'], shard['key']
+        if shard['kind'] == 'relationships':
+            return f"""
+            MATCH (s)-[r:`{name}`]->(e)
+            WHERE id(r) > $after AND id(r) <= $upto
+            RETURN id(r) AS _key, id(r) AS id, type(r) AS type, id(s) AS start, id(e) AS end,
+                   properties(r) AS properties
+            ORDER BY id(r)
+            """
+        # Write each node once, under the first of its labels being exported
+        # (manifests from before the label list was recorded use its first label)
+        first_label = ("head([l IN labels(n) WHERE l IN $labels])"
+                       if self.manifest.get('labels') is not None else "head(labels(n))")
+        if key:
+            return f"""
+            MATCH (n:`{name}`)
+            WHERE n.`{key}` IS NOT NULL AND ($after IS NULL OR n.`{key}` > $after)
+              AND {first_label} = $label
+            RETURN n.`{key}` AS _key, id(n) AS id, labels(n) AS labels, properties(n) AS properties
+            ORDER BY n.`{key}`
+            LIMIT $limit
+            """
+        return f"""
+        MATCH (n:`{name}`)
+        WHERE id(n) > $after AND id(n) <= $upto AND {first_label} = $label
+        RETURN id(n) AS _key, id(n) AS id, labels(n) AS labels, properties(n) AS properties
+        ORDER BY id(n)
+        """
+
+    def _write_page(self, shard, path, records):
+        """Append one page of records to the shard file and checkpoint it; returns the row count."""
+        page_rows = 0
+        last_key = shard['after']
+        with gzip.open(path, 'at', encoding='utf-8') as out:
+            for record in records:
+                row = dict(record)
+                last_key = row.pop('_key')
+                out.write(json.dumps(row, default=str) + '\n')
+                page_rows += 1
+
+        with self._lock:
+            shard['after'] = last_key
+            shard['rows'] += page_rows
+            shard['bytes'] = os.path.getsize(path)
+            shard['done'] = page_rows < self.page_size
+            self._save_manifest()
+        return page_rows
+
+    def export_shard(self, shard):
+        """Export one shard page by page, resuming from its saved position."""
+        if shard['done']:
+            return shard['rows']
+        path = os.path.join(self.out_dir, shard['file'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            # Drop anything written after the last page recorded in the manifest
+            with open(path, 'r+b') as f:
+                f.truncate(shard['bytes'])
+
+        query = self._page_query(shard)
+        params = {'label': shard['name'], 'labels': self.manifest.get('labels')}
+        with self.driver.session(database=self.database) as session:
+            if shard['key']:
+                # The key is indexed, so each page is a seek
+                while not shard['done']:
+                    self._write_page(shard, path, session.run(query, after=shard['after'],
+                                                              limit=self.page_size, **params))
+            else:
+                # id() has no index: stream the whole range with one query,
+                # checkpointing every page; a resumed export restarts after the last id
+                result = session.run(query, after=shard['after'], upto=shard['upto'], **params)
+                while not shard['done']:
+                    self._write_page(shard, path, itertools.islice(result, self.page_size))
+        return shard['rows']
+
+    def run(self, labels=None, rel_types=None, restart=False):
+        """Export everything; returns the manifest."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._load_or_plan(labels, rel_types, restart)
+        shards = self.manifest['shards']
+        pending = [shard for shard in shards if not shard['done']]
+        print(f"Exporting {len(pending)} of {len(shards)} shard(s) with {self.workers} worker(s)...")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.export_shard, shard): shard for shard in pending}
+            for future, shard in futures.items():
+                rows = future.result()
+                print(f"  {shard['kind']}/{shard['name']} -> {shard['file']}: {rows} rows")
+
+        self.manifest['completed_at'] = time.time()
+        self._save_manifest()
+        return self.manifest
+
+
 def print_section(title, data):
     """Print a section with formatted output"""
     print(f"\n{'='*50}")
@@ -141,5 +388,47 @@ def main():
     finally:
         explorer.close()
 
+def export_main(argv):
+    parser = argparse.ArgumentParser(description="Export the graph to compressed JSONL shards")
+    parser.add_argument('out_dir', help="Directory for the shards and manifest.json")
+    parser.add_argument('--page-size', type=int, default=10000, help="Records per page (default: 10000)")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel workers (default: 4)")
+    parser.add_argument('--labels', help="Comma-separated labels to export (default: all)")
+    parser.add_argument('--types', help="Comma-separated relationship types to export (default: all)")
+    parser.add_argument('--key', action='append', default=[], metavar='LABEL=PROPERTY',
+                        help="Page a label by a unique, indexed property instead of internal id")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing manifest and start over")
+    args = parser.parse_args(argv)
+
+    keys = {}
+    for item in args.key:
+        label, _, prop = item.partition('=')
+        if not label or not prop:
+            parser.error(f"--key expects LABEL=PROPERTY, got {item!r}")
+        keys[label] = prop
+
+    explorer = Neo4jExplorer()
+    if not explorer.connect():
+        print("Failed to connect to the database. Please check your connection settings.")
+        return 1
+
+    try:
+        exporter = GraphExporter(explorer.driver, explorer.database, args.out_dir,
+                                 page_size=args.page_size, workers=args.workers, keys=keys)
+        exporter.run(
+            labels=args.labels.split(',') if args.labels else None,
+            rel_types=args.types.split(',') if args.types else None,
+            restart=args.restart,
+        )
+        print(f"\n✅ Export complete: {os.path.join(args.out_dir, GraphExporter.MANIFEST)}")
+        return 0
+    except KeyboardInterrupt:
+        print("\nExport interrupted; run the same command again to resume.")
+        return 1
+    finally:
+        explorer.close()
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'export':
+        sys.exit(export_main(sys.argv[2:]))
     main()